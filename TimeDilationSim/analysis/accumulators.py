@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+accumulators.py
+Mergeable running statistics for processing event tables in chunks
+
+Each accumulator takes one chunk at a time through add() and combines the
+partial results, so a table can be processed whole or streamed piece by
+piece from disk. Counts are identical either way; means and variances are
+combined with the pairwise update of Chan et al. and agree to rounding.
+
+The accumulators work on NumPy arrays only; pandas is imported just to
+return results as DataFrames, so numeric-only scripts never load it.
+"""
+
+import numpy as np
+
+# Rows per bincount pass (bounds the size of temporary key arrays)
+BLOCK_SIZE = 1 << 22
+
+# Largest value range coded directly as an offset; wider ranges use np.unique
+MAX_DENSE_RANGE = 1 << 16
+
+def _dense_codes(values):
+    """Code integer values as 0..K-1, returning (encode, labels)
+
+    encode(block_slice) gives the codes of a block of `values`. Narrow value
+    ranges are coded by offset, so no full-length code array is built.
+    """
+    v_min, v_max = int(values.min()), int(values.max())
+    if v_max - v_min < MAX_DENSE_RANGE:
+        return (lambda block: values[block].astype(np.int64) - v_min), np.arange(v_min, v_max + 1)
+    labels, codes = np.unique(values, return_inverse=True)
+    return (lambda block: codes[block]), labels
+
+def grouped_sum_arrays(a, b, weights=None, names=('a', 'b')):
+    """grouped_sums() as {column: array}"""
+    a = np.asarray(a)
+    b = np.asarray(b)
+    weights = {name: np.asarray(w) for name, w in (weights or {}).items()}
+
+    if len(a) == 0:
+        empty = {name: np.zeros(0, dtype=np.int64) for name in list(names) + ['N']}
+        empty.update({name: np.zeros(0) for name in weights})
+        return empty
+
+    a_codes, a_labels = _dense_codes(a)
+    b_codes, b_labels = _dense_codes(b)
+    n_bins = len(a_labels) * len(b_labels)
+
+    n = np.zeros(n_bins, dtype=np.int64)
+    sums = {name: np.zeros(n_bins) for name in weights}
+
+    for start in range(0, len(a), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        key = a_codes(block) * len(b_labels) + b_codes(block)
+        n += np.bincount(key, minlength=n_bins)
+        for name, w in weights.items():
+            sums[name] += np.bincount(key, weights=w[block], minlength=n_bins)
+
+    present = np.flatnonzero(n)
+    table = {
+        names[0]: a_labels[present // len(b_labels)],
+        names[1]: b_labels[present % len(b_labels)],
+        'N': n[present],
+    }
+    for name in weights:
+        table[name] = sums[name][present]
+    return table
+
+def grouped_sums(a, b, weights=None, names=('a', 'b')):
+    """Event count and weight sums for each (a, b) integer pair present
+
+    Uses one np.bincount per quantity over a combined pair key. Returns a
+    DataFrame with columns names[0], names[1], 'N' and one column per entry
+    of `weights` ({column name: array}), ordered by a then b.
+    """
+    import pandas as pd
+    return pd.DataFrame(grouped_sum_arrays(a, b, weights, names))
+
+def _merge_grouped(first, second, names):
+    """Sum two grouped_sum_arrays() results over their (a, b) pairs"""
+    pairs = np.stack([np.concatenate([first[name], second[name]]) for name in names], axis=1)
+    labels, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    merged = {names[0]: labels[:, 0], names[1]: labels[:, 1]}
+    for name in first:
+        if name in names:
+            continue
+        values = np.concatenate([first[name], second[name]])
+        total = np.bincount(inverse, weights=values, minlength=len(labels))
+        merged[name] = total.astype(values.dtype) if values.dtype.kind in 'iu' else total
+    return merged
+
+class GroupedCounts:
+    """Running grouped_sums() over chunks"""
+
+    def __init__(self, names=('a', 'b')):
+        self.names = list(names)
+        self._arrays = None
+
+    def add(self, a, b, weights=None):
+        """Accumulate one chunk"""
+        part = grouped_sum_arrays(a, b, weights, self.names)
+        if self._arrays is None:
+            self._arrays = part
+        else:
+            self._arrays = _merge_grouped(self._arrays, part, self.names)
+
+    def arrays(self):
+        """Totals so far as {column: array}, one entry per (a, b) pair"""
+        if self._arrays is None:
+            return grouped_sum_arrays([], [], names=self.names)
+        return {name: values.copy() for name, values in self._arrays.items()}
+
+    def table(self):
+        """Totals so far as a DataFrame, one row per (a, b) pair"""
+        import pandas as pd
+        return pd.DataFrame(self.arrays())
+
+    def count(self, a, b):
+        """Number of events with the pair (a, b)"""
+        if self._arrays is None:
+            return 0
+        match = (self._arrays[self.names[0]] == a) & (self._arrays[self.names[1]] == b)
+        return int(self._arrays['N'][match].sum())
+
+    def totals(self, name):
+        """{value: number of events} over one of the two grouping columns"""
+        arrays = self.arrays()
+        labels, inverse = np.unique(arrays[name], return_inverse=True)
+        counts = np.bincount(inverse.reshape(-1), weights=arrays['N'], minlength=len(labels))
+        return {label: int(count) for label, count in zip(labels.tolist(), counts)}
+
+class GroupedMoments:
+    """Running count, mean and variance of a value per integer group"""
+
+    def __init__(self):
+        self._n = {}
+        self._mean = {}
+        self._m2 = {}
+
+    def add(self, groups, values):
+        """Accumulate one chunk of (group, value) pairs"""
+        groups = np.asarray(groups)
+        values = np.asarray(values, dtype=float)
+        if len(groups) == 0:
+            return
+
+        labels, codes = np.unique(groups, return_inverse=True)
+        n = np.bincount(codes, minlength=len(labels))
+        mean = np.bincount(codes, weights=values, minlength=len(labels)) / n
+        m2 = np.bincount(codes, weights=(values - mean[codes])**2, minlength=len(labels))
+
+        for label, n_b, mean_b, m2_b in zip(labels.tolist(), n, mean, m2):
+            self._merge(label, int(n_b), mean_b, m2_b)
+
+    def _merge(self, group, n_b, mean_b, m2_b):
+        n_a = self._n.get(group, 0)
+        if n_a == 0:
+            self._n[group], self._mean[group], self._m2[group] = n_b, mean_b, m2_b
+            return
+
+        mean_a, m2_a = self._mean[group], self._m2[group]
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self._n[group] = n
+        self._mean[group] = mean_a + delta * n_b / n
+        self._m2[group] = m2_a + m2_b + delta**2 * n_a * n_b / n
+
+    def count(self, group):
+        return self._n.get(group, 0)
+
+    def mean(self, group):
+        return self._mean.get(group, np.nan)
+
+    def std(self, group, ddof=0):
+        """Standard deviation (population by default, like np.std)"""
+        n = self._n.get(group, 0)
+        if n - ddof <= 0:
+            return np.nan
+        return np.sqrt(self._m2[group] / (n - ddof))
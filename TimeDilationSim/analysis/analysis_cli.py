@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+analysis_cli.py
+One entry point for the analysis commands, quick to start
+
+Each subcommand imports its module only when it runs, and this file
+imports nothing but the standard library at the top, so the summary
+commands never load matplotlib, SciPy or ROOT.
+
+The text reports (survival, validate, compare) are also cached. The
+output of a run is stored in the dataset cache, keyed by the command
+line, a content hash of its input files and the state of the analysis
+sources. Repeating a command on unchanged data prints the stored report
+and checks that the files it wrote are still in place, without importing
+pandas or reading any events. --no-cache always recomputes; survival and
+validate then read the events as NumPy arrays (run_io.read_arrays), so
+they do not import pandas either, except for --bootstrap.
+
+Usage:
+  python analysis_cli.py survival [--chunksize N] [--bootstrap N]
+  python analysis_cli.py validate ../output/TimeDilation_Run3.csv 15
+  python analysis_cli.py compare
+  python analysis_cli.py root-survival --position 0 5 10 15
+  python analysis_cli.py figures --workers 4
+  python analysis_cli.py bench --repeat 10      # start-up time of the commands
+  python analysis_cli.py bench '--no-cache survival'
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+ANALYSIS_DIR = Path(__file__).resolve().parent
+
+# Sources whose state is part of every report key
+SOURCE_FILES = [ANALYSIS_DIR.parent / 'compare_results.py']
+
+# inputs: what the report depends on ('dataset': the runs in --input-dir,
+# 'file': the run file given as first argument, None: not cached).
+# uncached: options that make a run non-repeatable (random replicas).
+Command = namedtuple('Command', ['module', 'help', 'inputs', 'default_input_dir', 'outputs',
+                                 'uncached'])
+
+COMMANDS = {
+    'survival': Command('analyze_decay_csv', 'Survival fractions of runs 0-3 (run files)',
+                        'dataset', '../output', ('survival_data.npz', 'survival_summary.csv'),
+                        ('--bootstrap',)),
+    'validate': Command('validate_physics', 'Check one run file against the proposal',
+                        'file', None, (), ()),
+    'compare': Command('compare_results', 'Compare all runs with the proposal predictions',
+                       'dataset', str(ANALYSIS_DIR.parent / 'output'), (), ()),
+    'root-survival': Command('analyze_decay', 'Survival fractions from Geant4 ROOT files',
+                             None, None, (), ()),
+    'events': Command('event_store', 'Index the events and print some of them',
+                      None, None, (), ()),
+    'figures': Command('figure_runner', 'Render the analysis figures in parallel',
+                       None, None, (), ()),
+}
+
+# Modules a numeric-only command should never import
+HEAVY_MODULES = ('pandas', 'scipy', 'matplotlib', 'mpl_toolkits', 'ROOT', 'uproot')
+
+def _import_command(command):
+    if str(ANALYSIS_DIR.parent) not in sys.path:
+        sys.path.append(str(ANALYSIS_DIR.parent))
+    return importlib.import_module(command.module)
+
+# --- Report cache ------------------------------------------------------------
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def source_state():
+    """Hash of the size and mtime of every analysis source file"""
+    digest = hashlib.sha1()
+    paths = sorted(ANALYSIS_DIR.glob('*.py')) + SOURCE_FILES
+    for path in paths:
+        digest.update(f'{path.name}:{_stamp(path)}'.encode())
+    return digest.hexdigest()
+
+def _input_location(command, argv):
+    """(cache data directory, content hash of the inputs) of a command line"""
+    import dataset
+
+    parser = argparse.ArgumentParser(add_help=False)
+    if command.inputs == 'file':
+        parser.add_argument('filepath', nargs='?')
+        args, _ = parser.parse_known_args(argv)
+        if args.filepath is None or not os.path.exists(args.filepath):
+            return None, None
+        return Path(args.filepath).parent, dataset.content_hash(args.filepath)
+
+    parser.add_argument('--input-dir', default=command.default_input_dir)
+    args, _ = parser.parse_known_args(argv)
+    key, sources, _ = dataset.dataset_key(args.input_dir)
+    if not sources:
+        return None, None
+    return Path(args.input_dir), key
+
+def report_path(name, argv):
+    """Cache file of a command line's report, or None if it cannot be cached"""
+    command = COMMANDS[name]
+    if command.inputs is None or any(arg.split('=')[0] in command.uncached + ('-h', '--help')
+                                     for arg in argv):
+        return None
+
+    import dataset
+    data_dir, input_hash = _input_location(command, argv)
+    if data_dir is None:
+        return None
+    key = hashlib.sha1(json.dumps([name, list(argv), os.getcwd(), input_hash,
+                                   source_state()]).encode()).hexdigest()
+    return dataset.cache_dir(data_dir) / 'reports' / f'{name}_{key[:16]}.json'
+
+def cached_report(path):
+    """Stored report text, or None if missing or any file it wrote changed"""
+    try:
+        with open(path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if any(_stamp(out) != stamp for out, stamp in record['outputs'].items()):
+        return None
+    return record['report']
+
+def store_report(path, report, outputs):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {'report': report, 'outputs': {str(Path(out).resolve()): _stamp(out)
+                                            for out in outputs}}
+    tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(record, f)
+    os.replace(tmp, path)
+
+class _Tee(io.TextIOBase):
+    """Write to several text streams at once"""
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+def run_command(name, argv, use_cache=True):
+    """Run a subcommand, serving its report from the cache when possible"""
+    command = COMMANDS[name]
+    path = report_path(name, argv) if use_cache else None
+    if path is not None:
+        report = cached_report(path)
+        if report is not None:
+            sys.stdout.write(report)
+            return
+
+    module = _import_command(command)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(_Tee(sys.stdout, log)):
+        module.main(argv)
+    if path is not None:
+        store_report(path, log.getvalue(), command.outputs)
+
+# --- Start-up benchmark ------------------------------------------------------
+
+def _imported_heavy_modules(cmd):
+    """Heavy top-level packages a command line imports (from -X importtime)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + cmd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imported = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            imported.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return [module for module in HEAVY_MODULES if module in imported]
+
+def _time_command(cmd, repeat):
+    """(first, median of the repeats) wall time of a command line, in s"""
+    times = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable] + cmd, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} exited with {result.returncode}")
+    return times[0], statistics.median(times[1:])
+
+def bench(argv):
+    """Time fresh interpreter start-ups of the CLI commands"""
+    from run_io import find_run_file
+
+    parser = argparse.ArgumentParser(prog='analysis_cli.py bench',
+                                     description="Start-up time of the analysis commands")
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per command')
+    parser.add_argument('commands', nargs='*', metavar='COMMAND',
+                        help="Quoted command lines to time, e.g. '--no-cache survival'")
+    args = parser.parse_args(argv)
+
+    cli = str(Path(__file__).resolve())
+    command_lines = [shlex.split(line) for line in args.commands]
+    if not command_lines:
+        command_lines = [['--help'], ['survival'], ['--no-cache', 'survival']]
+        run_file = find_run_file(3)
+        if run_file is not None:
+            command_lines += [['validate', str(run_file), '15'],
+                              ['--no-cache', 'validate', str(run_file), '15']]
+
+    print(f"{'command':<50s} {'first':>8s} {'median':>8s}  heavy imports")
+    print("-"*80)
+    first, median = _time_command(['-c', 'pass'], args.repeat)
+    print(f"{'python -c pass':<50s} {first:7.3f}s {median:7.3f}s")
+    for cmd in command_lines:
+        try:
+            first, median = _time_command([cli] + cmd, args.repeat)
+        except RuntimeError as e:
+            print(f"{' '.join(cmd):<50s} FAILED ({e})")
+            continue
+        heavy = ', '.join(_imported_heavy_modules([cli] + cmd)) or '-'
+        print(f"{' '.join(cmd):<50s} {first:7.3f}s {median:7.3f}s  {heavy}")
+    print(f"\nfirst: may rebuild caches; median of {args.repeat} repeats after it")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="TimeDilation analysis commands",
+        epilog="Options after the command go to it; '<command> --help' lists them.")
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always recompute reports instead of reusing stored ones')
+    parser.add_argument('command', choices=sorted(COMMANDS) + ['bench'],
+                        help='; '.join(f'{name}: {command.help}' for name, command in COMMANDS.items())
+                             + '; bench: start-up time of the commands')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        bench(args.args)
+    else:
+        run_command(args.command, args.args, use_cache=not args.no_cache)
+
+if __name__ == '__main__':
+    main()
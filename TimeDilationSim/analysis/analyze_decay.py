@@ -4,68 +4,42 @@ analyze_decay.py
 Extract survival curves from GEANT4 ROOT output files
 """
 
-import ROOT
 import numpy as np
 import argparse
 from pathlib import Path
 
-# PDG codes
-PDG_PION = 211
-PDG_KAON = 321
-PDG_MUON = -13
-
-# Physical constants (match proposal)
-C_LIGHT = 299792458  # m/s
-PION_MASS = 0.13957  # GeV
-KAON_MASS = 0.49368  # GeV
-MUON_MASS = 0.10566  # GeV
-PION_LIFETIME = 26.03e-9  # s
-KAON_LIFETIME = 12.38e-9  # s
-
-def calculate_decay_length(momentum, mass, lifetime):
-    """Calculate expected decay length λ = βcγτ₀"""
-    energy = np.sqrt(momentum**2 + mass**2)
-    gamma = energy / mass
-    beta = momentum / energy
-    return beta * C_LIGHT * gamma * lifetime
+from kinematics import (KAON_LIFETIME, KAON_MASS, PDG_KAON, PDG_MUON, PDG_PION,
+                        PION_LIFETIME, PION_MASS, decay_length)
+from root_io import read_branches
+from survival import survival_table
 
 def load_data(filename):
-    """Load ROOT file and return TTree"""
+    """Load the branches needed for survival counting from a ROOT file"""
     print(f"Loading {filename}...")
-    rootfile = ROOT.TFile.Open(filename)
-    if not rootfile or rootfile.IsZombie():
-        raise FileNotFoundError(f"Cannot open {filename}")
-    
-    tree = rootfile.Get("TimeDilation")
-    if not tree:
-        raise ValueError(f"Tree 'TimeDilation' not found in {filename}")
-    
-    return tree
+    return read_branches(filename, ['PrimaryPDG', 'Survived'])
 
-def extract_survival(tree, pdg_code, position_name):
+def extract_survival(data, pdg_code, position_name):
     """Extract survived particle counts for given species"""
     # Count particles that:
     # 1. Are identified as this species (PrimaryPDG)
     # 2. Either survived to Station 2 or decayed before it
     
-    total = tree.GetEntries(f"PrimaryPDG == {pdg_code}")
-    survived = tree.GetEntries(f"PrimaryPDG == {pdg_code} && Survived == 1")
-    
-    if total == 0:
-        return 0, 0, 0
+    table = survival_table(data, species=[pdg_code], by_run=False)
     
-    survival_fraction = survived / total
-    # Poisson error
-    error = np.sqrt(survived) / total if survived > 0 else 0
+    # No events at all give an empty table; absent species a row of zeros
+    if len(table) == 0 or table['N_total'].iloc[0] == 0:
+        return 0, 0, 0, 0
+    row = table.iloc[0]
     
-    return total, survived, survival_fraction, error
+    # Binomial error (as analyze_decay_csv.py and validate_physics.py)
+    return int(row['N_total']), int(row['N_survived']), row['S'], row['S_err_binomial']
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Analyze pion/kaon decay data")
     parser.add_argument('--position', nargs='+', type=int, default=[0, 5, 10, 15],
                         help='Station2 positions in meters')
     parser.add_argument('--input-dir', default='../output', help='Directory with ROOT files')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     positions = np.array(args.position, dtype=float)
     input_dir = Path(args.input_dir)
@@ -81,24 +55,24 @@ def main():
     # Process each position
     for i, pos in enumerate(positions):
         filename = input_dir / f"TimeDilation_Run{i}.root"
-        tree = load_data(str(filename))
+        data = load_data(str(filename))
         
         # Pions
-        ntot, nsurv, S, err = extract_survival(tree, PDG_PION, f"x={pos}m")
+        ntot, nsurv, S, err = extract_survival(data, PDG_PION, f"x={pos}m")
         results['pion']['N_total'].append(ntot)
         results['pion']['N_survived'].append(nsurv)
         results['pion']['S'].append(S)
         results['pion']['S_err'].append(err)
         
         # Kaons
-        ntot, nsurv, S, err = extract_survival(tree, PDG_KAON, f"x={pos}m")
+        ntot, nsurv, S, err = extract_survival(data, PDG_KAON, f"x={pos}m")
         results['kaon']['N_total'].append(ntot)
         results['kaon']['N_survived'].append(nsurv)
         results['kaon']['S'].append(S)
         results['kaon']['S_err'].append(err)
         
         # Muons (calibration check)
-        ntot, nsurv, S, err = extract_survival(tree, PDG_MUON, f"x={pos}m")
+        ntot, nsurv, S, err = extract_survival(data, PDG_MUON, f"x={pos}m")
         results['muon']['N_total'].append(ntot)
         results['muon']['N_survived'].append(nsurv)
         results['muon']['S'].append(S)
@@ -133,8 +107,8 @@ def main():
     
     # Calculate expected decay lengths
     p_beam = 8.0  # GeV/c
-    lambda_pi = calculate_decay_length(p_beam, PION_MASS, PION_LIFETIME)
-    lambda_K = calculate_decay_length(p_beam, KAON_MASS, KAON_LIFETIME)
+    lambda_pi = decay_length(p_beam, PION_MASS, PION_LIFETIME)
+    lambda_K = decay_length(p_beam, KAON_MASS, KAON_LIFETIME)
     
     print(f"\nTheoretical decay lengths @ 8 GeV/c:")
     print(f"  Pions: λ_π = {lambda_pi:.1f} m")
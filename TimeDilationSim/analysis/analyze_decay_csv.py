@@ -2,51 +2,64 @@
 """
 analyze_decay_csv.py
 Extract survival curves from CSV simulation output
+
+Usage:
+  python analyze_decay_csv.py                        # in memory (cached dataset)
+  python analyze_decay_csv.py --chunksize 1000000    # out of core, streams run files
 """
 
-import pandas as pd
+import argparse
+import csv
 import numpy as np
 from pathlib import Path
 
-# PDG codes
-PDG_PION = 211
-PDG_KAON = 321
-
-# Physical constants (match proposal)
-C_LIGHT = 299792458  # m/s
-PION_MASS = 0.13957  # GeV
-KAON_MASS = 0.49368  # GeV
-PION_LIFETIME = 26.03e-9  # s
-KAON_LIFETIME = 12.38e-9  # s
-
-def calculate_decay_length(momentum, mass, lifetime):
-    """Calculate expected decay length λ = βcγτ₀"""
-    energy = np.sqrt(momentum**2 + mass**2)
-    gamma = energy / mass
-    beta = momentum / energy
-    return beta * C_LIGHT * gamma * lifetime
+from dataset import dataset_columns, load_arrays
+from kinematics import (KAON_LIFETIME, KAON_MASS, PDG_KAON, PDG_PION, PION_LIFETIME,
+                        PION_MASS, decay_length)
+from run_io import WEIGHT_COLUMN, find_run_file, iter_arrays, read_table, table_columns, tag_run
+from survival import SurvivalAccumulator, lookup, survival_table
 
-def load_csv_data(filename):
-    """Load CSV file"""
+def load_csv_data(filename, columns=None):
+    """Load a run file (CSV, Parquet or Feather)"""
     print(f"Loading {filename}...")
-    return pd.read_csv(filename)
+    return read_table(filename, columns)
 
 def extract_survival(df, pdg_code):
     """Extract survived particle counts for given species"""
-    total = (df['PrimaryPDG'] == pdg_code).sum()
-    survived = ((df['PrimaryPDG'] == pdg_code) & (df['Survived'] == 1)).sum()
+    table = survival_table(df, by_run=False)
+    row = table[table['PrimaryPDG'] == pdg_code]
     
-    if total == 0:
+    if len(row) == 0:
         return 0, 0, 0, 0
     
-    survival_fraction = survived / total
-    error = np.sqrt(survived) / total if survived > 0 else 0
-    
-    return total, survived, survival_fraction, error
+    return tuple(row[col].iloc[0] for col in ['N_total', 'N_survived', 'S', 'S_err_binomial'])
+
+def stream_survival(input_dir, run_ids, chunk_size, species=None):
+    """Survival table ({column: array}) of the given runs, streamed from disk in chunks"""
+    accumulator = SurvivalAccumulator()
+    for run_id in run_ids:
+        filename = find_run_file(run_id, input_dir)
+        if filename is None:
+            raise FileNotFoundError(f"No file for run {run_id} in {input_dir}")
+        print(f"Streaming {filename} in chunks of {chunk_size}...")
+        columns = ['RunNumber', 'PrimaryPDG', 'Survived']
+        if WEIGHT_COLUMN in table_columns(filename):
+            columns.append(WEIGHT_COLUMN)
+        for chunk in iter_arrays(filename, chunk_size, columns):
+            accumulator.add(tag_run(chunk, run_id, filename))
+    return accumulator.arrays(species)
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract survival curves from run files")
+    parser.add_argument('--input-dir', default='../output', help='Directory with run files')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Stream the runs in chunks of this many rows (out of core)')
+    parser.add_argument('--bootstrap', type=int, default=None, metavar='N_REPLICAS',
+                        help='Use bootstrap errors from this many replicas')
+    args = parser.parse_args(argv)
+    
     positions = np.array([0, 5, 10, 15], dtype=float)  # meters
-    input_dir = Path('../output')
+    input_dir = Path(args.input_dir)
     
     # Storage for results
     results = {
@@ -55,24 +68,42 @@ def main():
         'kaon': {'N_total': [], 'N_survived': [], 'S': [], 'S_err': []}
     }
     
-    # Process each position
+    # Count every (run, species) pair in one pass
+    if args.chunksize:
+        table = stream_survival(input_dir, range(len(positions)), args.chunksize,
+                                species=[PDG_PION, PDG_KAON])
+    else:
+        available = dataset_columns(input_dir)
+        if available is None:
+            raise FileNotFoundError(f"No run files in {input_dir}")
+        columns = ['RunNumber', 'PrimaryPDG', 'Survived']
+        if WEIGHT_COLUMN in available:
+            columns.append(WEIGHT_COLUMN)
+        accumulator = SurvivalAccumulator()
+        accumulator.add(load_arrays(input_dir, columns=columns))
+        table = accumulator.arrays(species=[PDG_PION, PDG_KAON])
+    
+    error_column = 'S_err_binomial'
+    if args.bootstrap:
+        import pandas as pd
+        from bootstrap import bootstrap_survival_table
+        try:
+            table = bootstrap_survival_table(pd.DataFrame(table), args.bootstrap)
+        except ValueError as e:
+            parser.error(str(e))
+        error_column = 'S_err_bootstrap'
+        print(f"Errors from {args.bootstrap} bootstrap replicas")
+    
+    # Process each position (run i, the i-th run file, is at positions[i])
     for i, pos in enumerate(positions):
-        filename = input_dir / f"TimeDilation_Run{i}.csv"
-        df = load_csv_data(str(filename))
-        
-        # Pions
-        ntot, nsurv, S, err = extract_survival(df, PDG_PION)
-        results['pion']['N_total'].append(ntot)
-        results['pion']['N_survived'].append(nsurv)
-        results['pion']['S'].append(S)
-        results['pion']['S_err'].append(err)
-        
-        # Kaons
-        ntot, nsurv, S, err = extract_survival(df, PDG_KAON)
-        results['kaon']['N_total'].append(ntot)
-        results['kaon']['N_survived'].append(nsurv)
-        results['kaon']['S'].append(S)
-        results['kaon']['S_err'].append(err)
+        for name, pdg in [('pion', PDG_PION), ('kaon', PDG_KAON)]:
+            row = lookup(table, i, pdg)
+            if row is None:
+                raise FileNotFoundError(f"No file for run {i} in {input_dir}")
+            results[name]['N_total'].append(row['N_total'])
+            results[name]['N_survived'].append(row['N_survived'])
+            results[name]['S'].append(row['S'])
+            results[name]['S_err'].append(row[error_column])
     
     # Print results
     print("\n" + "="*70)
@@ -99,8 +130,8 @@ def main():
     
     # Calculate expected decay lengths
     p_beam = 8.0  # GeV/c
-    lambda_pi = calculate_decay_length(p_beam, PION_MASS, PION_LIFETIME)
-    lambda_K = calculate_decay_length(p_beam, KAON_MASS, KAON_LIFETIME)
+    lambda_pi = decay_length(p_beam, PION_MASS, PION_LIFETIME)
+    lambda_K = decay_length(p_beam, KAON_MASS, KAON_LIFETIME)
     
     print(f"\nTheoretical decay lengths @ 8 GeV/c:")
     print(f"  Pions: λ_π = {lambda_pi:.1f} m")
@@ -119,14 +150,12 @@ def main():
     print("\nData saved to survival_data.npz")
     
     # Also save as CSV
-    summary_df = pd.DataFrame({
-        'Position_m': positions,
-        'Pion_S': results['pion']['S'],
-        'Pion_S_err': results['pion']['S_err'],
-        'Kaon_S': results['kaon']['S'],
-        'Kaon_S_err': results['kaon']['S_err']
-    })
-    summary_df.to_csv('survival_summary.csv', index=False)
+    with open('survival_summary.csv', 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['Position_m', 'Pion_S', 'Pion_S_err', 'Kaon_S', 'Kaon_S_err'])
+        for i, pos in enumerate(positions):
+            writer.writerow([float(pos)] + [float(results[name][key][i])
+                                            for name in ('pion', 'kaon') for key in ('S', 'S_err')])
     print("Summary saved to survival_summary.csv")
 
 if __name__ == '__main__':
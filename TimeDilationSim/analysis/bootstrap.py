@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+bootstrap.py
+Bootstrap confidence intervals for survival fractions, fitted decay
+lengths and PID efficiency/purity
+
+No event table is ever resampled. Every statistic here depends on the
+events only through counts in cells (run × species × survived, true ×
+reconstructed PDG, species × decayed × flight bin), and under the Poisson
+bootstrap (every event weighted by an independent Poisson(1) draw) the
+replica count of a cell holding n events is exactly Poisson(n). So a
+replica costs one draw per non-empty cell, however many events there are.
+method='multinomial' keeps the total number of events fixed instead
+(classic resampling with replacement), again drawn per cell.
+
+Decay-length replicas bin each species' flight distances into n_bins
+bins and use the mean flight per bin; only the within-bin spread is lost,
+a relative variance of order 1/n_bins².
+
+Intervals are percentile intervals at `confidence` (1σ by default); the
+_err_bootstrap columns are the replica standard deviations.
+
+Usage:
+  from bootstrap import bootstrap_lifetime, bootstrap_pid, bootstrap_survival
+  table = bootstrap_survival(df, n_replicas=2000, species=[211, 321])
+  fits = bootstrap_lifetime(df, n_replicas=2000)
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from lifetime_fit import STATION_POSITIONS_M, fit_lifetime, observed_flight
+from pid import pid_metrics
+from survival import survival_table
+
+# 1σ two-sided
+CONFIDENCE = 0.6827
+
+# Replicas drawn at once (bounds the replica-count array)
+REPLICA_BLOCK = 256
+
+# Flight-distance bins per species for decay-length replicas
+FLIGHT_BINS = 1024
+
+METHODS = ('poisson', 'multinomial')
+
+def replica_counts(counts, n_replicas, method='poisson', rng=None):
+    """Bootstrap replicas of cell counts, shape (n_replicas,) + counts.shape"""
+    return np.concatenate(list(iter_replica_counts(counts, n_replicas, method, rng)))
+
+def iter_replica_counts(counts, n_replicas, method='poisson', rng=None, block=REPLICA_BLOCK):
+    """Yield blocks of at most `block` replicas of cell counts"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown bootstrap method '{method}' (choose from {', '.join(METHODS)})")
+    rng = np.random.default_rng() if rng is None else rng
+    counts = np.asarray(counts)
+    n_events = counts.sum()
+    for first in range(0, n_replicas, block):
+        n_block = min(block, n_replicas - first)
+        if method == 'poisson':
+            yield rng.poisson(counts, size=(n_block,) + counts.shape)
+        else:
+            flat = rng.multinomial(n_events, counts.ravel() / n_events, size=n_block)
+            yield flat.reshape((n_block,) + counts.shape)
+
+def _interval(replicas, confidence):
+    """(standard deviation, low, high) over axis 0 of the replica statistics"""
+    tail = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # Cells without events give all-NaN replicas
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanquantile(replicas, [tail, 1 - tail], axis=0)
+        return np.nanstd(replicas, axis=0), low, high
+
+def bootstrap_survival_table(table, n_replicas=1000, method='poisson', confidence=CONFIDENCE,
+                             rng=None):
+    """Add S_err_bootstrap, S_low and S_high to an unweighted survival table
+
+    Works on the counts alone, so tables accumulated out of core
+    (SurvivalAccumulator) are bootstrapped the same way.
+    """
+    n_survived = table['N_survived'].to_numpy()
+    if not np.issubdtype(n_survived.dtype, np.integer):
+        raise ValueError("Bootstrap of weighted runs is not supported; use S_err_binomial")
+    cells = np.stack([n_survived, table['N_total'].to_numpy() - n_survived])
+    replicas = []
+    for block in iter_replica_counts(cells, n_replicas, method, rng):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            replicas.append(block[:, 0] / (block[:, 0] + block[:, 1]))
+    err, low, high = _interval(np.concatenate(replicas), confidence)
+    return table.assign(S_err_bootstrap=err, S_low=low, S_high=high)
+
+def bootstrap_survival(data, n_replicas=1000, species=None, by_run=True, method='poisson',
+                       confidence=CONFIDENCE, rng=None):
+    """survival_table() plus bootstrap errors and intervals of S
+
+    Weighted runs (SurvivalWeight) are not supported: their errors
+    already come from the spread of the weights.
+    """
+    table = survival_table(data, species, by_run)
+    return bootstrap_survival_table(table, n_replicas, method, confidence, rng)
+
+def bootstrap_lifetime(data, n_replicas=1000, species=(211, 321),
+                       station_positions=STATION_POSITIONS_M, method='poisson',
+                       confidence=CONFIDENCE, n_bins=FLIGHT_BINS, rng=None):
+    """fit_lifetime() plus bootstrap errors and intervals of λ
+
+    Adds lambda_m_err_bootstrap, lambda_m_low and lambda_m_high.
+    """
+    fits = fit_lifetime(data, species, station_positions)
+
+    pdg = np.asarray(data['PrimaryPDG'])
+    decayed = np.asarray(data['Survived']) == 0
+    flight = observed_flight(data, station_positions)
+
+    # Cell of every event: (species, decayed, flight bin); other species dropped
+    species = list(species)
+    index = np.full(len(pdg), -1, dtype=np.intp)
+    for i, code in enumerate(species):
+        index[pdg == code] = i
+    fitted = index >= 0
+    flight = flight[fitted]
+    if len(flight) == 0:
+        return fits.assign(lambda_m_err_bootstrap=np.nan, lambda_m_low=np.nan,
+                           lambda_m_high=np.nan)
+    lo, hi = flight.min(), flight.max()
+    width = (hi - lo) / n_bins if hi > lo else 1.0
+    flight_bin = np.minimum(((flight - lo) / width).astype(np.intp), n_bins - 1)
+    key = (index[fitted] * 2 + decayed[fitted]) * n_bins + flight_bin
+
+    n_cells = len(species) * 2 * n_bins
+    counts = np.bincount(key, minlength=n_cells)
+    flight_sums = np.bincount(key, flight, minlength=n_cells)
+
+    # Non-empty cells and their contribution to each species' sums
+    occupied = np.flatnonzero(counts)
+    counts = counts[occupied]
+    mean_flight = flight_sums[occupied] / counts
+    cell_species = occupied // (2 * n_bins)
+    cell_decayed = (occupied // n_bins) % 2
+    onehot = np.zeros((len(occupied), len(species)))
+    onehot[np.arange(len(occupied)), cell_species] = 1.0
+    flight_weights = onehot * mean_flight[:, None]
+    decay_weights = onehot * cell_decayed[:, None]
+
+    replicas = []
+    for block in iter_replica_counts(counts, n_replicas, method, rng):
+        block = block.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            replicas.append((block @ flight_weights) / (block @ decay_weights))
+    err, low, high = _interval(np.concatenate(replicas), confidence)
+    return fits.assign(lambda_m_err_bootstrap=err, lambda_m_low=low, lambda_m_high=high)
+
+def bootstrap_matrix(matrix, n_replicas=1000, normalize='true', method='poisson',
+                     confidence=CONFIDENCE, rng=None):
+    """Bootstrap intervals of a confusion matrix normalized per row or column
+
+    normalize='true' divides by the true-species totals (rows: efficiency
+    and mis-ID rates), 'reco' by the reconstructed totals (columns:
+    purity and contamination). Returns (fraction, low, high) DataFrames
+    shaped like `matrix`.
+    """
+    axis = {'true': 1, 'reco': 0}[normalize]
+    counts = matrix.to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = counts / counts.sum(axis=axis, keepdims=True)
+        replicas = np.concatenate([
+            block / block.sum(axis=axis + 1, keepdims=True)
+            for block in iter_replica_counts(counts, n_replicas, method, rng)
+        ])
+    _, low, high = _interval(replicas, confidence)
+
+    def frame(values):
+        return pd.DataFrame(values, index=matrix.index, columns=matrix.columns)
+    return frame(fraction), frame(low), frame(high)
+
+def bootstrap_pid(matrix, n_replicas=1000, method='poisson', confidence=CONFIDENCE, rng=None):
+    """pid_metrics() of a confusion matrix plus bootstrap intervals
+
+    Adds Efficiency_err_bootstrap/_low/_high and Purity_err_bootstrap/_low/_high.
+    """
+    metrics = pid_metrics(matrix)
+    if len(metrics) == 0:
+        return metrics
+    rows = [matrix.index.get_loc(pdg) for pdg in metrics['PDG']]
+    cols = [matrix.columns.get_loc(pdg) for pdg in metrics['PDG']]
+
+    efficiency, purity = [], []
+    for block in iter_replica_counts(matrix.to_numpy(), n_replicas, method, rng):
+        correct = block[:, rows, cols]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            efficiency.append(correct / block.sum(axis=2)[:, rows])
+            purity.append(correct / block.sum(axis=1)[:, cols])
+
+    for name, replicas in [('Efficiency', efficiency), ('Purity', purity)]:
+        err, low, high = _interval(np.concatenate(replicas), confidence)
+        metrics[f'{name}_err_bootstrap'] = err
+        metrics[f'{name}_low'] = low
+        metrics[f'{name}_high'] = high
+    return metrics
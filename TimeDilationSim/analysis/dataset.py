@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+dataset.py
+Cached access to the combined TimeDilation run tables
+
+load_dataset() concatenates the run files once and stores the result as a
+snapshot with one .npy file per column under <data_dir>/.cache/. The
+snapshot is keyed by a hash of the source files' contents, so it is
+rebuilt only when a run file changes. Every later load memory-maps the
+snapshot instead of parsing CSV text again, and processes loading the
+same snapshot share its pages through the OS page cache.
+
+RunNumber holds the index of the file each row came from (see
+run_io.tag_run), whatever number the file itself recorded. Snapshots of
+run tables are built with run_io.read_arrays, so neither building nor
+loading one imports pandas; only load_dataset() does.
+
+Usage:
+  from dataset import load_dataset
+  df = load_dataset()                                  # all runs, all columns
+  df = load_dataset(columns=['PrimaryPDG', 'Survived'])
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from g4_ntuple import find_thread_files, is_thread_file, read_ntuple
+from run_io import COLUMN_TYPES, find_run_file, read_arrays, tag_run
+
+CACHE_DIR_NAME = '.cache'
+
+# Bump when the snapshot layout changes, to invalidate old snapshots
+SNAPSHOT_VERSION = 4
+
+# Snapshots already opened by this process, keyed by snapshot directory
+_open_snapshots = {}
+
+# Whether load_dataset() copies the mapped columns by default. Worker
+# processes that only read the data set this to False to share the pages.
+COPY_BY_DEFAULT = True
+
+def cache_dir(data_dir='../output'):
+    """Directory holding the snapshots of a data directory"""
+    return Path(data_dir) / CACHE_DIR_NAME
+
+def file_hash(path, hash_index=None):
+    """SHA-1 of a file's contents
+
+    hash_index maps a path to (size, mtime_ns, digest); a file whose size
+    and mtime are unchanged is not read again.
+    """
+    path = Path(path)
+    stat = path.stat()
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    key = str(path.resolve())
+
+    if hash_index is not None and key in hash_index and hash_index[key][:2] == stamp:
+        return hash_index[key][2]
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest = digest.hexdigest()
+
+    if hash_index is not None:
+        hash_index[key] = stamp + [digest]
+    return digest
+
+def _write_json_atomic(path, payload):
+    """Write JSON via a temporary file so concurrent readers never see half a file"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp, path)
+
+def _load_hash_index(cache):
+    index_file = cache / 'hashes.json'
+    if index_file.exists():
+        try:
+            with open(index_file) as f:
+                return json.load(f)
+        except ValueError:
+            pass
+    return {}
+
+def content_hash(path):
+    """SHA-1 of any file, remembered in the cache of its directory
+
+    The file is only read again when its size or mtime changes.
+    """
+    cache = cache_dir(Path(path).parent)
+    cache.mkdir(parents=True, exist_ok=True)
+    hash_index = _load_hash_index(cache)
+    digest = file_hash(path, hash_index)
+    _write_json_atomic(cache / 'hashes.json', hash_index)
+    return digest
+
+def source_files(data_dir='../output', run_ids=range(4)):
+    """(run_id, [paths]) of every available run
+
+    A run is one table file (binary preferred) or, failing that, the
+    Geant4 per-thread ntuple files.
+    """
+    sources = []
+    for run_id in run_ids:
+        path = find_run_file(run_id, data_dir)
+        paths = [path] if path is not None else find_thread_files(run_id, data_dir)
+        if paths:
+            sources.append((run_id, paths))
+    return sources
+
+def read_source(paths, run_id):
+    """Read one run from its table file or its thread files, as {column: array}"""
+    if is_thread_file(paths[0]):
+        df = read_ntuple(paths)
+        data = {col: df[col].to_numpy() for col in df.columns}
+    else:
+        data = read_arrays(paths[0])
+    return tag_run(data, run_id, paths[0])
+
+def concat_sources(parts):
+    """Concatenate per-run {column: array} into one table
+
+    Columns appear in order of first appearance. Like pd.concat, a column
+    missing from some runs is NaN there and is not cast to its schema type.
+    """
+    columns = list(dict.fromkeys(col for part in parts for col in part))
+    combined = {}
+    for col in columns:
+        pieces = [part[col] if col in part else np.full(len(next(iter(part.values()))), np.nan)
+                  for part in parts]
+        values = np.concatenate(pieces)
+        if col in COLUMN_TYPES and all(col in part for part in parts):
+            values = values.astype(COLUMN_TYPES[col], copy=False)
+        combined[col] = values
+    return combined
+
+def dataset_key(data_dir='../output', run_ids=range(4)):
+    """Content hash identifying the snapshot of the given runs, and its sources"""
+    cache = cache_dir(data_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    hash_index = _load_hash_index(cache)
+
+    sources = source_files(data_dir, run_ids)
+    digest = hashlib.sha1(f'snapshot-v{SNAPSHOT_VERSION}'.encode())
+    source_hashes = {}
+    for run_id, paths in sources:
+        for path in paths:
+            source_hashes[path.name] = file_hash(path, hash_index)
+            digest.update(f'{run_id}:{path.name}:{source_hashes[path.name]}'.encode())
+
+    _write_json_atomic(cache / 'hashes.json', hash_index)
+    return digest.hexdigest(), sources, source_hashes
+
+def _snapshot_prefix(run_ids):
+    return 'runs' + '-'.join(str(run_id) for run_id in run_ids) + '_'
+
+def build_snapshot(snapshot, sources, source_hashes):
+    """Parse the sources once and write them as one .npy file per column"""
+    data = concat_sources([read_source(paths, run_id) for run_id, paths in sources])
+
+    # Build next to the final location, then rename into place
+    tmp = Path(tempfile.mkdtemp(dir=snapshot.parent, prefix=snapshot.name + '.tmp'))
+    column_hashes = {}
+    for col, values in data.items():
+        values = np.ascontiguousarray(values)
+        np.save(tmp / f'{col}.npy', values)
+        column_hashes[col] = hashlib.sha1(str(values.dtype).encode() + values.tobytes()).hexdigest()
+    _write_json_atomic(tmp / 'meta.json', {
+        'columns': list(data),
+        'n_events': len(next(iter(data.values()), [])),
+        'sources': source_hashes,
+        'column_hashes': column_hashes,
+    })
+    try:
+        os.replace(tmp, snapshot)
+    except OSError:
+        # Another process finished the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _remove_stale_snapshots(snapshot, prefix):
+    for old in snapshot.parent.glob(prefix + '*'):
+        if old != snapshot and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+
+def snapshot_path(data_dir='../output', run_ids=range(4)):
+    """Up-to-date snapshot directory of the given runs (built if needed), or None"""
+    run_ids = tuple(run_ids)
+    key, sources, source_hashes = dataset_key(data_dir, run_ids)
+    if not sources:
+        return None
+
+    prefix = _snapshot_prefix(run_ids)
+    snapshot = cache_dir(data_dir) / (prefix + key[:16])
+    if not (snapshot / 'meta.json').exists():
+        print(f"Building dataset cache from {len(sources)} run(s)...")
+        build_snapshot(snapshot, sources, source_hashes)
+        _remove_stale_snapshots(snapshot, prefix)
+    return snapshot
+
+def snapshot_meta(snapshot):
+    """Contents of a snapshot's meta.json"""
+    with open(Path(snapshot) / 'meta.json') as f:
+        return json.load(f)
+
+def dataset_columns(data_dir='../output', run_ids=range(4)):
+    """Column names of the combined runs, or None if no data"""
+    snapshot = snapshot_path(data_dir, run_ids)
+    if snapshot is None:
+        return None
+    return snapshot_meta(snapshot)['columns']
+
+def column_hashes(data_dir='../output', run_ids=range(4)):
+    """Content hash of every column of the combined runs, or None if no data
+
+    Lets callers tell which columns changed when a run file is replaced.
+    """
+    snapshot = snapshot_path(data_dir, run_ids)
+    if snapshot is None:
+        return None
+    return snapshot_meta(snapshot)['column_hashes']
+
+def open_snapshot(snapshot):
+    """Memory-map every column of a snapshot as {column: array}"""
+    snapshot = Path(snapshot)
+    if snapshot not in _open_snapshots:
+        meta = snapshot_meta(snapshot)
+        _open_snapshots[snapshot] = {
+            col: np.load(snapshot / f'{col}.npy', mmap_mode='r') for col in meta['columns']
+        }
+    return _open_snapshots[snapshot]
+
+def load_arrays(data_dir='../output', run_ids=range(4), columns=None):
+    """Columns of the combined runs as memory-mapped arrays, or None if no data"""
+    snapshot = snapshot_path(data_dir, run_ids)
+    if snapshot is None:
+        return None
+    arrays = open_snapshot(snapshot)
+    if columns is None:
+        return dict(arrays)
+    return {col: arrays[col] for col in columns}
+
+def load_dataset(data_dir='../output', run_ids=range(4), columns=None, copy=None):
+    """Combined runs as a DataFrame, served from the on-disk cache, or None
+
+    With copy=False the columns stay backed by the read-only memory maps,
+    so processes share one physical copy (in-place edits then raise).
+    The frame remembers where it came from (see dataset_source).
+    """
+    import pandas as pd
+    arrays = load_arrays(data_dir, run_ids, columns)
+    if arrays is None:
+        return None
+    df = pd.DataFrame(arrays, copy=COPY_BY_DEFAULT if copy is None else copy)
+    df.attrs['data_dir'] = str(data_dir)
+    df.attrs['run_ids'] = list(run_ids)
+    return df
+
+def dataset_source(df, data_dir='../output', run_ids=range(4)):
+    """(data_dir, run_ids) a load_dataset() frame was read from
+
+    Lets code handed only the frame load derived data (histograms, the
+    event store) of the same runs; the defaults apply to other frames.
+    """
+    return df.attrs.get('data_dir', data_dir), df.attrs.get('run_ids', run_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the dataset cache")
+    parser.add_argument('--input-dir', default='../output', help='Directory with run files')
+    parser.add_argument('--runs', nargs='+', type=int, default=[0, 1, 2, 3],
+                        help='Run numbers to include')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = snapshot_path(args.input_dir, args.runs)
+    if snapshot is None:
+        print(f"ERROR: No run files in {args.input_dir}")
+        return
+    arrays = open_snapshot(snapshot)
+    n_events = len(next(iter(arrays.values())))
+    print(f"✓ {snapshot}: {n_events} events, {len(arrays)} columns "
+          f"({time.perf_counter() - start:.2f} s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+density_plot.py
+Scatter plots that stay fast and small at any number of events
+
+Below max_points a species is drawn as an ordinary scatter. Above it the
+plane is split into a grid of cells: cells holding at least min_count
+events are drawn as one rasterized 2D histogram (shades of the species
+colour, log scale), and the events of all sparser cells are drawn as
+points on top. No event is dropped: the tails and the rare mis-identified
+events stay visible as individual points, while the number of points (and
+so the drawing time and file size) is bounded by min_count × cells.
+
+Usage:
+  from density_plot import density_scatter
+  density_scatter(ax, beta, eop, 'red', label='π⁺', range=[[0.99, 1.01], [0, 1.5]])
+"""
+
+import numpy as np
+from matplotlib.colors import LinearSegmentedColormap, LogNorm, to_rgba
+
+# Events per species above which the density rendering is used
+MAX_SCATTER_POINTS = 20000
+
+# Grid cells per axis
+DENSITY_BINS = 200
+
+# Cells with fewer events are drawn as individual points
+MIN_CELL_COUNT = 5
+
+def _species_cmap(color, alpha):
+    """Colormap from the point opacity to the full species colour"""
+    return LinearSegmentedColormap.from_list('density', [to_rgba(color, alpha), to_rgba(color, 1.0)])
+
+def density_scatter(ax, x, y, color, label=None, range=None, bins=DENSITY_BINS,
+                    min_count=MIN_CELL_COUNT, max_points=MAX_SCATTER_POINTS,
+                    alpha=0.3, s=10, **kwargs):
+    """Scatter of (x, y), rendered as density plus sparse points for large samples
+
+    range is [[xmin, xmax], [ymin, ymax]] (default: the data extent);
+    events outside it are not drawn. alpha, s and kwargs style the points.
+    Returns the point collection (carries the legend label).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    if len(x) <= max_points:
+        return ax.scatter(x, y, c=color, alpha=alpha, s=s, label=label, **kwargs)
+
+    if range is None:
+        range = [[x.min(), x.max()], [y.min(), y.max()]]
+    (x0, x1), (y0, y1) = range
+    inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+    x, y = x[inside], y[inside]
+
+    # Cell of every event and events per cell
+    ix = np.minimum(((x - x0) * (bins / (x1 - x0))).astype(np.intp), bins - 1)
+    iy = np.minimum(((y - y0) * (bins / (y1 - y0))).astype(np.intp), bins - 1)
+    cell = ix * bins + iy
+    counts = np.bincount(cell, minlength=bins * bins).reshape(bins, bins)
+
+    dense = np.ma.masked_less(counts, min_count)
+    if dense.count():
+        ax.pcolormesh(np.linspace(x0, x1, bins + 1), np.linspace(y0, y1, bins + 1), dense.T,
+                      cmap=_species_cmap(color, alpha), norm=LogNorm(min_count, max(dense.max(), min_count + 1)),
+                      shading='flat', rasterized=True)
+
+    sparse = counts.ravel()[cell] < min_count
+    return ax.scatter(x[sparse], y[sparse], c=color, alpha=alpha, s=s, label=label, **kwargs)
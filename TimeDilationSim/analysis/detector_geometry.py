@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+detector_geometry.py
+One description of the detector stations for every detector display
+
+Positions and sizes follow src/DetectorConstruction.cc: each station is
+a set of boxes placed at fixed offsets from the station position (SC at
+-0.5 cm, RICH at +50 cm, DWC at +120 cm, calorimeter at +200 cm), and
+Station 2 sits `station2_distance` downstream of Station 1. Displays put
+Station 1 at z = 0.5 m.
+
+The faces of a configuration are built once per (distance, units, style)
+and cached; draw_detector() adds them to an axis as a single
+Poly3DCollection. draw_cross_section() draws the same boxes as
+rectangles in a 2D side view.
+
+RUN_STATION2_DISTANCES is the Station 2 distance of each run file's
+configuration (the run_x*.mac macros), used by the analysis as well
+(lifetime_fit); matplotlib is only imported by the drawing functions.
+simulate_physics.py records the position it simulated in every event
+(STATION2_COLUMN), and event_station2_distance() prefers that record, so
+runs made with other --positions are not measured against this table.
+
+Usage:
+  from detector_geometry import draw_cross_section, draw_detector
+  draw_detector(ax, 10)                          # Station 2 at 10 m
+  draw_detector(ax, 15, station1_z=0, units='cm', labels=None)
+  draw_cross_section(ax2d, 15, axis=0)           # XZ side view
+"""
+
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+# Station 1 position in display coordinates (m)
+STATION1_Z = 0.5
+
+# Station 2 distance (m) of the configuration of each run file
+RUN_STATION2_DISTANCES = {0: 0.0, 1: 5.0, 2: 10.0, 3: 15.0}
+
+# The same distances in run order
+STATION2_DISTANCES = tuple(RUN_STATION2_DISTANCES[run] for run in sorted(RUN_STATION2_DISTANCES))
+
+# Per-event Station 2 position (cm) written by simulate_physics.py
+STATION2_COLUMN = 'Station2PosZ'
+
+# Metres per display unit
+UNITS = {'m': 1.0, 'cm': 0.01}
+
+Component = namedtuple('Component', ['name', 'kind', 'center', 'size'])
+
+# (name, kind, station, z offset from the station, size), in m
+STATION_LAYOUT = (
+    ('SC1', 'scint', 1, -0.005, (0.10, 0.10, 0.01)),
+    ('RICH1', 'rich', 1, 0.50, (0.30, 0.30, 1.00)),
+    ('DWC1', 'dwc', 1, 1.20, (0.30, 0.30, 0.20)),
+    ('SC2', 'scint', 2, -0.005, (0.10, 0.10, 0.01)),
+    ('RICH2', 'rich', 2, 0.50, (0.30, 0.30, 1.00)),
+    ('DWC2', 'dwc', 2, 1.20, (0.30, 0.30, 0.20)),
+    ('Calo', 'calo', 2, 2.00, (0.30, 0.30, 0.14)),    # 20 × (2 mm Pb + 5 mm scintillator)
+)
+
+# kind: (colour, alpha)
+DEFAULT_STYLES = {
+    'scint': ('lime', 0.8),
+    'rich': ('lightblue', 0.3),
+    'dwc': ('yellow', 0.5),
+    'calo': ('orange', 0.6),
+}
+
+# Vertex indices of the six faces of a box
+_BOX_FACES = np.array([[0, 1, 5, 4], [7, 6, 2, 3], [0, 3, 7, 4],
+                       [1, 2, 6, 5], [0, 1, 2, 3], [4, 5, 6, 7]])
+
+def run_station2_distance(run, distances=RUN_STATION2_DISTANCES):
+    """Station 2 distance (m) of a run number, or of every entry of an array of them
+
+    distances maps run number to distance; a run without an entry raises
+    ValueError instead of silently taking another run's position.
+    """
+    runs = np.asarray(run)
+    labels, inverse = np.unique(runs, return_inverse=True)
+    unknown = [int(label) for label in labels if int(label) not in distances]
+    if unknown:
+        raise ValueError(f"No station 2 distance for run(s) {unknown} "
+                         f"(known runs: {sorted(distances)})")
+    values = np.array([distances[int(label)] for label in labels], dtype=float)
+    if runs.ndim == 0:
+        return float(values[0])
+    return values[inverse].reshape(runs.shape)
+
+def event_station2_distance(data, distances=RUN_STATION2_DISTANCES):
+    """Station 2 distance (m) of every event of a table
+
+    Uses the recorded STATION2_COLUMN where it is present and finite, and
+    the event's run in `distances` otherwise (Geant4 runs, which do not
+    record it); such a run missing from `distances` raises ValueError.
+    """
+    n_events = len(np.asarray(data['RunNumber']))
+    if STATION2_COLUMN in data:
+        distance = np.asarray(data[STATION2_COLUMN], dtype=float) / 100
+    else:
+        distance = np.full(n_events, np.nan)
+    missing = ~np.isfinite(distance)
+    if missing.any():
+        distance = distance.copy()
+        distance[missing] = run_station2_distance(np.asarray(data['RunNumber'])[missing], distances)
+    return distance
+
+def station2_z(station2_distance, station1_z=STATION1_Z):
+    return station1_z + station2_distance
+
+def detector_components(station2_distance, station1_z=STATION1_Z, units='m'):
+    """Boxes of one configuration, positions and sizes in `units`"""
+    scale = 1 / UNITS[units]
+    station_z = {1: station1_z, 2: station2_z(station2_distance, station1_z)}
+    return [Component(name, kind, (0.0, 0.0, (station_z[station] + offset) * scale),
+                      tuple(s * scale for s in size))
+            for name, kind, station, offset, size in STATION_LAYOUT]
+
+def box_faces(center, size):
+    """(6, 4, 3) face vertices of an axis-aligned box"""
+    corner = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+                       [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]]) / 2
+    vertices = np.asarray(center) + corner * np.asarray(size)
+    return vertices[_BOX_FACES]
+
+@functools.lru_cache(maxsize=None)
+def _detector_mesh(station2_distance, station1_z, units, names, styles):
+    """(faces, face colours, components) of a configuration; styles is a tuple of items"""
+    from matplotlib.colors import to_rgba
+
+    styles = dict(styles)
+    components = [c for c in detector_components(station2_distance, station1_z, units)
+                  if names is None or c.name in names]
+    faces = np.concatenate([box_faces(c.center, c.size) for c in components])
+    colors = np.repeat([to_rgba(*styles[c.kind]) for c in components], len(_BOX_FACES), axis=0)
+    faces.setflags(write=False)
+    colors.setflags(write=False)
+    return faces, colors, components
+
+def draw_detector(ax, station2_distance, station1_z=STATION1_Z, units='m', names=None,
+                  styles=None, labels='center', fontsize=9, edgecolor='black', linewidth=0.5):
+    """Add the detector boxes of one configuration to a 3D axis
+
+    names restricts the drawing to some components, styles overrides
+    DEFAULT_STYLES per kind. labels is 'center' (name at the box centre),
+    'boxed' (above the box, framed in its colour) or None.
+    Returns the Poly3DCollection.
+    """
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+    styles = {**DEFAULT_STYLES, **(styles or {})}
+    faces, colors, components = _detector_mesh(
+        float(station2_distance), float(station1_z), units,
+        None if names is None else tuple(names), tuple(sorted(styles.items())))
+
+    mesh = Poly3DCollection(faces, facecolors=colors, edgecolor=edgecolor, linewidth=linewidth)
+    ax.add_collection3d(mesh)
+
+    for c in components:
+        x, y, z = c.center
+        if labels == 'center':
+            ax.text(x, y, z, c.name, fontsize=fontsize, ha='center', weight='bold')
+        elif labels == 'boxed':
+            margin = 0.05 / UNITS[units]
+            ax.text(x, y + c.size[1] / 2 + margin, z + c.size[2] / 2, c.name, fontsize=fontsize,
+                    fontweight='bold', ha='center', va='bottom',
+                    bbox=dict(boxstyle='round,pad=0.2', facecolor='white',
+                              edgecolor=styles[c.kind][0], alpha=0.9))
+    return mesh
+
+def draw_cross_section(ax, station2_distance, axis=0, station1_z=STATION1_Z, units='m',
+                       names=None, styles=None, edgecolor='black'):
+    """Side view of one configuration: transverse axis (0: x, 1: y) against z"""
+    from matplotlib.patches import Rectangle
+
+    styles = {**DEFAULT_STYLES, **(styles or {})}
+    for c in detector_components(station2_distance, station1_z, units):
+        if names is not None and c.name not in names:
+            continue
+        color, alpha = styles[c.kind]
+        ax.add_patch(Rectangle((c.center[axis] - c.size[axis] / 2, c.center[2] - c.size[2] / 2),
+                               c.size[axis], c.size[2], fc=color, ec=edgecolor, alpha=alpha))
@@ -12,14 +12,13 @@ from matplotlib.colors import LinearSegmentedColormap
 import sys
 import os
 
+from dataset import load_dataset
+from event_display import TRACKS_PER_PANEL, decay_z, draw_tracks, track_polylines
+
 OUTPUT_DIR = '../geant4-result/figures/python-analysis'
 
 def load_data():
-    df = pd.concat([
-        pd.read_csv(f'../output/TimeDilation_Run{i}.csv') 
-        for i in range(4) 
-        if os.path.exists(f'../output/TimeDilation_Run{i}.csv')
-    ])
+    df = load_dataset()
     return df
 
 def create_custom_colormap():
@@ -44,9 +43,9 @@ def fig1_enhanced(df):
     
     cmaps = create_custom_colormap()
     
-    pions = df[df['PrimaryPDG'] == 211].head(40)
-    kaons = df[df['PrimaryPDG'] == 321].head(40)
-    muons = df[df['PrimaryPDG'] == -13].head(10) if len(df[df['PrimaryPDG'] == -13]) > 0 else pd.DataFrame()
+    pions = df[df['PrimaryPDG'] == 211].head(TRACKS_PER_PANEL)
+    kaons = df[df['PrimaryPDG'] == 321].head(TRACKS_PER_PANEL)
+    muons = df[df['PrimaryPDG'] == -13].head(TRACKS_PER_PANEL) if len(df[df['PrimaryPDG'] == -13]) > 0 else pd.DataFrame()
     
     for idx, (data, cmap, name, main_color) in enumerate([
         (pions, cmaps[0], 'Pions (π⁺)', '#e74c3c'),
@@ -58,37 +57,18 @@ def fig1_enhanced(df):
         ax.set_title(f'{name} - 3D Trajectories', fontsize=13, fontweight='bold', pad=15)
         
         if len(data) > 0:
-            for i, (_, event) in enumerate(data.iterrows()):
-                z_start = max(event['PrimaryPosZ'] / 100, -0.5)
-                z_end = 15.5
-                
-                n_pts = 100
-                z_path = np.linspace(z_start, z_end, n_pts)
-                
-                x_start = event['PrimaryPosX'] / 100
-                y_start = event['PrimaryPosY'] / 100
-                
-                theta = np.random.normal(0, 0.001)
-                phi = np.random.uniform(0, 2*np.pi)
-                
-                x_path = x_start + np.tan(theta) * np.cos(phi) * (z_path - z_start)
-                y_path = y_start + np.tan(theta) * np.sin(phi) * (z_path - z_start)
-                
-                survived = event['Survived'] == 1
-                
-                # Gradient effect along track
-                for j in range(n_pts-1):
-                    alpha = 0.7 if survived else 0.3
-                    color_val = cmap(j / n_pts)
-                    ax.plot(x_path[j:j+2], y_path[j:j+2], z_path[j:j+2], 
-                           color=color_val, linewidth=1.5, alpha=alpha)
-                
-                # Mark decay point with glow effect
-                if event['Decayed'] == 1 and event['DecayPosZ'] > 0:
-                    dz = event['DecayPosZ'] / 100
-                    if 0 < dz < 16:
-                        ax.scatter([0], [0], [dz], c='black', marker='X', 
-                                 s=100, alpha=0.8, edgecolors='white', linewidths=2)
+            tracks = track_polylines(data, z_end=15.5, n_points=100, z_min=-0.5, divergence=0.001)
+            survived = data['Survived'].to_numpy() == 1
+            
+            # Gradient effect along track
+            draw_tracks(ax, tracks[survived], cmap=cmap, linewidth=1.5, alpha=0.7)
+            draw_tracks(ax, tracks[~survived], cmap=cmap, linewidth=1.5, alpha=0.3)
+            
+            # Mark decay points with glow effect
+            dz = decay_z(data)
+            dz = dz[(dz > 0) & (dz < 16)]
+            ax.scatter(np.zeros_like(dz), np.zeros_like(dz), dz, c='black', marker='X', 
+                       s=100, alpha=0.8, edgecolors='white', linewidths=2)
         
         # Styling
         ax.set_xlabel('X (m)', fontsize=10, labelpad=8)
@@ -8,12 +8,15 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection, Line3DCollection
 from matplotlib.patches import FancyBboxPatch, Circle
 import matplotlib.colors as mcolors
 from matplotlib import cm
 import os
 
+from detector_geometry import STATION1_Z, draw_detector, station2_z
+from event_display import TRACKS_PER_PANEL, decayed, draw_tracks, track_polylines
+from event_store import load_event_store
+
 # Publication-quality settings
 plt.rcParams.update({
     'font.size': 11,
@@ -41,36 +44,13 @@ COLORS = {
     'beam': '#9B59B6',      # Purple
 }
 
-def draw_detector_3d(ax, pos, size, color, alpha, label, style='box'):
-    """Draw enhanced 3D detector component"""
-    x, y, z = pos
-    sx, sy, sz = size
-    
-    vertices = np.array([
-        [x-sx/2, y-sy/2, z-sz/2], [x+sx/2, y-sy/2, z-sz/2],
-        [x+sx/2, y+sy/2, z-sz/2], [x-sx/2, y+sy/2, z-sz/2],
-        [x-sx/2, y-sy/2, z+sz/2], [x+sx/2, y-sy/2, z+sz/2],
-        [x+sx/2, y+sy/2, z+sz/2], [x-sx/2, y+sy/2, z+sz/2]
-    ])
-    
-    faces = [
-        [vertices[0], vertices[1], vertices[5], vertices[4]],
-        [vertices[7], vertices[6], vertices[2], vertices[3]],
-        [vertices[0], vertices[3], vertices[7], vertices[4]],
-        [vertices[1], vertices[2], vertices[6], vertices[5]],
-        [vertices[0], vertices[1], vertices[2], vertices[3]],
-        [vertices[4], vertices[5], vertices[6], vertices[7]]
-    ]
-    
-    poly = Poly3DCollection(faces, alpha=alpha, facecolor=color, 
-                           edgecolor='black', linewidth=0.8)
-    ax.add_collection3d(poly)
-    
-    # Enhanced label with background
-    ax.text(x, y + sy/2 + 0.05, z + sz/2, label, fontsize=9, 
-           fontweight='bold', ha='center', va='bottom',
-           bbox=dict(boxstyle='round,pad=0.2', facecolor='white', 
-                    edgecolor=color, alpha=0.9))
+# Detector colours of these figures (detector_geometry kinds)
+DETECTOR_STYLES = {
+    'scint': (COLORS['scint'], 0.8),
+    'rich': (COLORS['rich'], 0.4),
+    'dwc': (COLORS['dwc'], 0.6),
+    'calo': (COLORS['calo'], 0.7),
+}
 
 def create_enhanced_detector_vis():
     """Create stunning 4-panel detector configuration visualization"""
@@ -87,18 +67,10 @@ def create_enhanced_detector_vis():
         ax = fig.add_subplot(2, 2, idx+1, projection='3d')
         ax.set_title(f'Configuration {idx+1}: {title}', fontsize=12, fontweight='bold', pad=10)
         
-        # Station 1 (fixed at z=0.5m)
-        z1 = 0.5
-        draw_detector_3d(ax, (0, 0, z1-0.01), (0.12, 0.12, 0.02), COLORS['scint'], 0.8, 'SC1')
-        draw_detector_3d(ax, (0, 0, z1+0.6), (0.35, 0.35, 1.0), COLORS['rich'], 0.4, 'RICH1')
-        draw_detector_3d(ax, (0, 0, z1+1.4), (0.35, 0.35, 0.25), COLORS['dwc'], 0.6, 'DWC1')
-        
-        # Station 2 (variable position)
-        z2 = z1 + dist + 2
-        draw_detector_3d(ax, (0, 0, z2-0.01), (0.12, 0.12, 0.02), COLORS['scint'], 0.8, 'SC2')
-        draw_detector_3d(ax, (0, 0, z2+0.6), (0.35, 0.35, 1.0), COLORS['rich'], 0.4, 'RICH2')
-        draw_detector_3d(ax, (0, 0, z2+1.4), (0.35, 0.35, 0.25), COLORS['dwc'], 0.6, 'DWC2')
-        draw_detector_3d(ax, (0, 0, z2+2.2), (0.4, 0.4, 0.2), COLORS['calo'], 0.7, 'Calorimeter')
+        # Station 1 (fixed) and Station 2 (variable position)
+        z1 = STATION1_Z
+        z2 = station2_z(dist)
+        draw_detector(ax, dist, styles=DETECTOR_STYLES, labels='boxed', linewidth=0.8)
         
         # Beam pipe
         z_beam = np.linspace(-0.3, z2+2.8, 100)
@@ -159,7 +131,7 @@ def create_particle_trajectory_vis():
     """Create enhanced particle trajectory visualization"""
     print('[VIS 2/4] Creating particle trajectory visualization...')
     
-    df = pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    store = load_event_store()
     
     fig = plt.figure(figsize=(18, 12), facecolor='white')
     fig.suptitle('Particle Trajectories in T9 Beamline\n8 GeV/c Mixed Hadron Beam', 
@@ -177,30 +149,20 @@ def create_particle_trajectory_vis():
         ax1.set_title(f'{name}\nλ = {decay_len} m, {decay_frac*100:.1f}% decay @ 15m', 
                      fontsize=11, fontweight='bold', color=color)
         
-        data = df[df['PrimaryPDG'] == pdg].head(30)
+        data = store.sample(pdg, n=TRACKS_PER_PANEL)
         
-        for _, event in data.iterrows():
-            survived = event['Survived'] == 1
-            
-            # Trajectory
-            z_end = 17 if survived else event['DecayPosZ'] / 100  # cm to m
-            z_path = np.linspace(event['PrimaryPosZ']/100, z_end, 60)
-            
-            # Add slight curvature for realism
-            curve = 0.001 * np.sin(np.linspace(0, np.pi, 60))
-            x_path = event['PrimaryPosX']/100 + curve * np.random.randn()
-            y_path = event['PrimaryPosY']/100 + curve * np.random.randn()
-            
-            # Color intensity based on survival
-            alpha = 0.8 if survived else 0.4
-            lw = 1.5 if survived else 0.8
-            
-            ax1.plot(x_path, y_path, z_path, color=color, linewidth=lw, alpha=alpha)
-            
-            # Decay marker
-            if not survived:
-                ax1.scatter([x_path[-1]], [y_path[-1]], [z_path[-1]], 
-                           c='red', marker='*', s=80, alpha=0.9, edgecolors='black')
+        # Trajectories to the decay vertex, with slight curvature for realism
+        tracks = track_polylines(data, z_end=17, n_points=60, stop_at_decay=True, wiggle=0.001)
+        survived = data['Survived'].to_numpy() == 1
+        
+        # Color intensity based on survival
+        draw_tracks(ax1, tracks[survived], color=color, linewidth=1.5, alpha=0.8)
+        draw_tracks(ax1, tracks[~survived], color=color, linewidth=0.8, alpha=0.4)
+        
+        # Decay markers
+        ends = tracks[decayed(data), -1]
+        ax1.scatter(ends[:, 0], ends[:, 1], ends[:, 2], 
+                    c='red', marker='*', s=80, alpha=0.9, edgecolors='black')
         
         # Detector hints
         for z_det in [0.5, 5, 10, 15]:
@@ -248,15 +210,15 @@ def create_decay_event_vis():
     """Visualize individual decay events"""
     print('[VIS 3/4] Creating decay event visualization...')
     
-    df = pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    store = load_event_store()
     
     fig = plt.figure(figsize=(16, 10), facecolor='white')
     fig.suptitle('Decay-in-Flight Event Topology\nTime Dilation Effect Visualization', 
                 fontsize=15, fontweight='bold', y=0.98)
     
     # Get decayed events
-    pion_decay = df[(df['PrimaryPDG']==211) & (df['Decayed']==1)].head(15)
-    kaon_decay = df[(df['PrimaryPDG']==321) & (df['Decayed']==1)].head(15)
+    pion_decay = store.sample(211, decayed=True, n=15)
+    kaon_decay = store.sample(321, decayed=True, n=15)
     
     # Pion decay visualization
     ax1 = fig.add_subplot(121, projection='3d')
@@ -343,17 +305,8 @@ def create_full_beamline_vis():
     ax.plot([0]*200, [0]*200, z_beam, color=COLORS['beam'], linewidth=4, 
            linestyle='-', alpha=0.4, label='Beam axis')
     
-    # Station 1 (always at z=0.5)
-    draw_detector_3d(ax, (0, 0, 0.48), (0.15, 0.15, 0.02), COLORS['scint'], 0.9, 'SC1')
-    draw_detector_3d(ax, (0, 0, 1.0), (0.4, 0.4, 1.0), COLORS['rich'], 0.5, 'RICH1')
-    draw_detector_3d(ax, (0, 0, 2.2), (0.4, 0.4, 0.3), COLORS['dwc'], 0.7, 'DWC1')
-    
-    # Show Station 2 at maximum position (15m)
-    z2 = 17.5
-    draw_detector_3d(ax, (0, 0, z2-0.02), (0.15, 0.15, 0.02), COLORS['scint'], 0.9, 'SC2')
-    draw_detector_3d(ax, (0, 0, z2+0.5), (0.4, 0.4, 1.0), COLORS['rich'], 0.5, 'RICH2')
-    draw_detector_3d(ax, (0, 0, z2+1.7), (0.4, 0.4, 0.3), COLORS['dwc'], 0.7, 'DWC2')
-    draw_detector_3d(ax, (0, 0, z2+2.5), (0.5, 0.5, 0.25), COLORS['calo'], 0.8, 'Calorimeter')
+    # Station 1 and Station 2 at its maximum position (15m)
+    draw_detector(ax, 15, styles=DETECTOR_STYLES, labels='boxed', linewidth=0.8)
     
     # Sample particle fan
     np.random.seed(123)
@@ -372,9 +325,9 @@ def create_full_beamline_vis():
     # Distance markers
     for z_mark in [0, 5, 10, 15]:
         theta = np.linspace(0, 2*np.pi, 50)
-        ax.plot(0.3*np.cos(theta), 0.3*np.sin(theta), np.full(50, z_mark+2.5), 
+        ax.plot(0.3*np.cos(theta), 0.3*np.sin(theta), np.full(50, station2_z(z_mark)), 
                'gray', linestyle=':', alpha=0.5)
-        ax.text(0.35, 0.35, z_mark+2.5, f'{z_mark}m', fontsize=10, color='gray')
+        ax.text(0.35, 0.35, station2_z(z_mark), f'{z_mark}m', fontsize=10, color='gray')
     
     ax.set_xlabel('X (m)', fontsize=12, labelpad=10)
     ax.set_ylabel('Y (m)', fontsize=12, labelpad=10)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+event_store.py
+Random access to single events and event categories of the dataset
+
+The event store sits on the memory-mapped dataset snapshot and adds two
+indexes, built in one pass and kept as events_index_v<N>.npz inside the
+snapshot directory (so they follow the data exactly):
+
+- the EventIDs of each run in sorted order, next to their row numbers.
+  An event is found by binary search within its run, or directly by
+  offset when the run's EventIDs are consecutive (the usual case). The
+  index takes two integers per event, however sparse or large the
+  EventIDs are (merged thread files, runs with gaps);
+- the rows grouped by category (species × decayed × run), in file order:
+  the rows of a category are one contiguous slice of a single array.
+
+Categories split events on the Decayed flag. In the Python simulation
+Survived is its complement, so this is the survived/decayed split. In a
+Geant4 run a particle can decay after reaching Station 2, so
+decayed=False selects events with no recorded decay, a subset of the
+survivors.
+
+Nothing is scanned and no run file is reopened to fetch an event or the
+first n events of a category; only the rows asked for are read from the
+memory maps.
+
+Usage:
+  from event_store import load_event_store
+  store = load_event_store()
+  event = store.event(run=3, event_id=12)              # {column: value}
+  kaons = store.sample(321, decayed=True, n=5)         # DataFrame, first 5
+  pions = store.sample(211, n=300, rng=np.random.default_rng(1))
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dataset
+
+# Bump when the index layout changes
+INDEX_VERSION = 2
+
+INDEX_COLUMNS = ['RunNumber', 'EventID', 'PrimaryPDG', 'Decayed']
+
+def index_path(snapshot):
+    return Path(snapshot) / f'events_index_v{INDEX_VERSION}.npz'
+
+def build_index(arrays):
+    """EventID lookup and category grouping of a dataset, as {name: array}"""
+    run = np.asarray(arrays['RunNumber'])
+    event_id = np.asarray(arrays['EventID'], dtype=np.int64)
+    pdg = np.asarray(arrays['PrimaryPDG'])
+    decayed = np.asarray(arrays['Decayed']) == 1
+
+    runs, run_index = np.unique(run, return_inverse=True)
+    species, species_index = np.unique(pdg, return_inverse=True)
+
+    # EventID lookup: rows sorted by (run, EventID); lexsort is stable, so a
+    # repeated EventID resolves to its first row in file order
+    id_rows = np.lexsort((event_id, run_index))
+    event_ids = event_id[id_rows]
+    run_starts = np.concatenate([[0], np.cumsum(np.bincount(run_index, minlength=len(runs)))])
+    consecutive = np.array([bool(np.all(np.diff(event_ids[start:stop]) == 1))
+                            for start, stop in zip(run_starts[:-1], run_starts[1:])])
+
+    # Category code (species, decayed, run); stable sort keeps file order within a category
+    n_categories = len(species) * 2 * len(runs)
+    code = (species_index * 2 + decayed) * len(runs) + run_index
+    order = np.argsort(code, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(np.bincount(code, minlength=n_categories))])
+
+    return {'runs': runs, 'run_starts': run_starts, 'event_ids': event_ids, 'id_rows': id_rows,
+            'consecutive': consecutive, 'species': species, 'order': order, 'starts': starts}
+
+def save_index(index, path):
+    """Write an index to one .npz file (atomically)"""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.npz')
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, **index)
+    os.replace(tmp, path)
+
+def load_index(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+class EventStore:
+    """Events of a dataset snapshot, addressed by (run, EventID) or by category"""
+
+    def __init__(self, arrays, index):
+        self.arrays = arrays
+        self.index = index
+        self.runs = index['runs']
+        self.species = index['species']
+        self._run_slot = {int(run): i for i, run in enumerate(self.runs)}
+        self._species_slot = {int(pdg): i for i, pdg in enumerate(self.species)}
+
+    def __len__(self):
+        return len(self.index['order'])
+
+    @property
+    def columns(self):
+        return list(self.arrays)
+
+    def row(self, run, event_id):
+        """Row number of an event, or None if it is not in the dataset"""
+        slot = self._run_slot.get(int(run))
+        if slot is None:
+            return None
+        event_id = int(event_id)
+        start, stop = self.index['run_starts'][slot:slot + 2]
+        event_ids = self.index['event_ids']
+        if self.index['consecutive'][slot]:
+            position = start + event_id - int(event_ids[start])
+        else:
+            position = start + int(np.searchsorted(event_ids[start:stop], event_id))
+        if not start <= position < stop or event_ids[position] != event_id:
+            return None
+        return int(self.index['id_rows'][position])
+
+    def event(self, run, event_id, columns=None):
+        """One event as {column: value}; KeyError if it is not in the dataset"""
+        row = self.row(run, event_id)
+        if row is None:
+            raise KeyError(f"Event {event_id} of run {run} not in the dataset")
+        return {col: self.arrays[col][row].item() for col in (columns or self.arrays)}
+
+    def category_rows(self, pdg, decayed=None, run=None):
+        """Row numbers of a category in file order; None for decayed or run means any"""
+        species_slot = self._species_slot.get(int(pdg))
+        if species_slot is None:
+            return np.empty(0, dtype=np.int64)
+        statuses = (False, True) if decayed is None else (bool(decayed),)
+        if run is None:
+            run_slots = range(len(self.runs))
+        elif int(run) in self._run_slot:
+            run_slots = (self._run_slot[int(run)],)
+        else:
+            return np.empty(0, dtype=np.int64)
+
+        order, starts = self.index['order'], self.index['starts']
+        slices = []
+        for status in statuses:
+            for run_slot in run_slots:
+                code = (species_slot * 2 + status) * len(self.runs) + run_slot
+                slices.append(order[starts[code]:starts[code + 1]])
+        if len(slices) == 1:
+            return slices[0]
+        return np.sort(np.concatenate(slices))
+
+    def category_size(self, pdg, decayed=None, run=None):
+        return len(self.category_rows(pdg, decayed, run))
+
+    def rows(self, rows, columns=None):
+        """DataFrame of the given row numbers"""
+        rows = np.asarray(rows, dtype=np.int64)
+        return pd.DataFrame({col: self.arrays[col][rows] for col in (columns or self.arrays)})
+
+    def sample(self, pdg, decayed=None, run=None, n=5, rng=None, columns=None):
+        """Up to n events of a category as a DataFrame
+
+        Without rng these are the first n in file order (like head(n));
+        with a NumPy Generator, n drawn at random without replacement.
+        """
+        rows = self.category_rows(pdg, decayed, run)
+        if rng is None:
+            rows = rows[:n]
+        elif len(rows) > n:
+            rows = np.sort(rng.choice(rows, n, replace=False))
+        return self.rows(rows, columns)
+
+def event_store_from_arrays(arrays):
+    """EventStore of columns already in memory (e.g. a ROOT file read with root_io)"""
+    return EventStore(arrays, build_index({col: arrays[col] for col in INDEX_COLUMNS}))
+
+def load_event_store(data_dir='../output', run_ids=range(4)):
+    """EventStore of the combined runs, indexed on first use, or None if no data"""
+    snapshot = dataset.snapshot_path(data_dir, run_ids)
+    if snapshot is None:
+        return None
+    arrays = dataset.open_snapshot(snapshot)
+    path = index_path(snapshot)
+    if not path.exists():
+        print("Indexing events...")
+        save_index(build_index({col: arrays[col] for col in INDEX_COLUMNS}), path)
+    return EventStore(arrays, load_index(path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the dataset events and look some up")
+    parser.add_argument('--input-dir', default='../output', help='Directory with run files')
+    parser.add_argument('--runs', nargs='+', type=int, default=[0, 1, 2, 3],
+                        help='Run numbers to include')
+    parser.add_argument('--event', nargs=2, type=int, action='append', default=[],
+                        metavar=('RUN', 'EVENT_ID'), help='Print one event (repeatable)')
+    parser.add_argument('--category', type=int, metavar='PDG',
+                        help='Print the first events of a species')
+    parser.add_argument('--decayed', type=int, choices=[0, 1],
+                        help='Restrict --category to survived (0) or decayed (1) events')
+    parser.add_argument('--n', type=int, default=5, help='Events printed for --category')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = load_event_store(args.input_dir, args.runs)
+    if store is None:
+        print(f"ERROR: No run files in {args.input_dir}")
+        return
+    print(f"✓ {len(store)} events, runs {store.runs.tolist()}, species {store.species.tolist()} "
+          f"({time.perf_counter() - start:.2f} s)")
+
+    for run, event_id in args.event:
+        try:
+            event = store.event(run, event_id)
+        except KeyError as e:
+            print(f"ERROR: {e.args[0]}")
+            continue
+        print(f"\nRun {run}, event {event_id}:")
+        for col, value in event.items():
+            print(f"  {col:<20} {value}")
+
+    if args.category is not None:
+        decayed = None if args.decayed is None else bool(args.decayed)
+        print(f"\n{store.category_size(args.category, decayed)} events of PDG {args.category}:")
+        print(store.sample(args.category, decayed, n=args.n).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,8 @@ from matplotlib.colors import LinearSegmentedColormap
 from mpl_toolkits.mplot3d import Axes3D
 import os
 
+from dataset import load_dataset
+
 plt.style.use('seaborn-v0_8-whitegrid')
 plt.rcParams['font.family'] = 'sans-serif'
 plt.rcParams['font.size'] = 11
@@ -17,7 +19,7 @@ plt.rcParams['axes.linewidth'] = 1.5
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def load_data():
-    return pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    return load_dataset()
 
 def main():
     print("[1/13] Enhanced trajectory figure...")
@@ -8,13 +8,15 @@ import matplotlib.pyplot as plt
 from scipy.stats import norm
 import os
 
+from dataset import load_dataset
+
 plt.rcParams['font.size'] = 11
 plt.rcParams['axes.linewidth'] = 1.5
 
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def load_data():
-    return pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    return load_dataset()
 
 def main():
     print("[2/13] Enhanced momentum distributions...")
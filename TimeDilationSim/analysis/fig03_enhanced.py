@@ -8,11 +8,13 @@ import matplotlib.pyplot as plt
 from scipy.stats import norm
 import os
 
+from dataset import load_dataset
+
 plt.rcParams['font.size'] = 11
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def load_data():
-    return pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    return load_dataset()
 
 def main():
     print("[3/13] Enhanced beta distributions...")
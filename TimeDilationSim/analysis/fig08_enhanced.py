@@ -7,11 +7,15 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
+from dataset import load_dataset
+from density_plot import density_scatter
+from histograms import load_histograms
+
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def main():
     print('[8/13] Enhanced PID performance...')
-    df = pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    df = load_dataset()
     
     fig = plt.figure(figsize=(16, 12), facecolor='white')
     fig.suptitle('Particle Identification Performance', fontsize=16, fontweight='bold', y=0.98)
@@ -19,11 +23,11 @@ def main():
     # Panel 1: Beta vs E/p scatter
     ax1 = fig.add_subplot(221)
     for pdg, name, color in [(211, 'Pions', '#E74C3C'), (321, 'Kaons', '#3498DB')]:
-        data = df[df['PrimaryPDG'] == pdg].sample(min(3000, len(df[df['PrimaryPDG']==pdg])))
+        data = df[df['PrimaryPDG'] == pdg]
         beta = data['RICH1_Beta']
         eop = data['Calo_EoP']
         valid = (beta > 0.995) & (beta < 1.005) & (eop < 1.5)
-        ax1.scatter(beta[valid], eop[valid], c=color, alpha=0.4, s=15, label=name)
+        density_scatter(ax1, beta[valid], eop[valid], color, label=name, alpha=0.4, s=15)
     
     ax1.axhline(0.3, color='gray', linestyle='--', alpha=0.7, label='MIP threshold')
     ax1.axhline(0.8, color='gray', linestyle=':', alpha=0.7)
@@ -92,12 +96,11 @@ def main():
     
     # Panel 4: NPE distribution comparison
     ax4 = fig.add_subplot(224)
-    pions = df[df['PrimaryPDG'] == 211]
-    kaons = df[df['PrimaryPDG'] == 321]
+    hists = load_histograms()
     
     bins = np.linspace(0, 120, 40)
-    ax4.hist(pions['RICH1_NPE'], bins=bins, alpha=0.6, color='#E74C3C', density=True, label='Pions')
-    ax4.hist(kaons['RICH1_NPE'], bins=bins, alpha=0.6, color='#3498DB', density=True, label='Kaons')
+    hists['rich1_npe', 211].regroup(bins).plot(ax4, alpha=0.6, color='#E74C3C', density=True, label='Pions')
+    hists['rich1_npe', 321].regroup(bins).plot(ax4, alpha=0.6, color='#3498DB', density=True, label='Kaons')
     
     ax4.set_xlabel('Number of Photoelectrons', fontsize=12)
     ax4.set_ylabel('Normalized', fontsize=12)
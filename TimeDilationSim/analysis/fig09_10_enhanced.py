@@ -5,16 +5,18 @@ Enhanced Figures 9-11: Main physics results
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
 import os
 
+from dataset import load_dataset
+from lifetime_fit import fit_lifetime
+
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def exp_decay(x, S0, lam):
     return S0 * np.exp(-x / lam)
 
 def main():
-    df = pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    df = load_dataset()
     
     # Figure 9: Lifetime measurement
     print('[9/13] Enhanced lifetime measurement...')
@@ -22,6 +24,7 @@ def main():
     fig.suptitle('Decay Length Measurement - Time Dilation Effect', fontsize=15, fontweight='bold', y=1.02)
     
     dists = np.array([0, 5, 10, 15])
+    fits = fit_lifetime(df).set_index('PrimaryPDG')
     
     for ax, (pdg, name, color, exp_lam) in zip(axes, 
         [(211, 'Pions', '#E74C3C', 447), (321, 'Kaons', '#3498DB', 60)]):
@@ -35,12 +38,9 @@ def main():
         
         surv, errs = np.array(surv), np.array(errs)
         
-        # Fit
-        try:
-            popt, pcov = curve_fit(exp_decay, dists, surv, p0=[1.0, exp_lam], sigma=errs, absolute_sigma=True)
-            lam_fit, lam_err = popt[1], np.sqrt(pcov[1,1])
-        except:
-            lam_fit, lam_err = exp_lam, 10
+        # Unbinned likelihood fit to the decay vertices (NaN when it failed)
+        fit = fits.loc[pdg]
+        fitted = np.isfinite(fit['lambda_m'])
         
         # Plot data
         ax.errorbar(dists, surv, yerr=errs, fmt='o', color=color, markersize=12, capsize=6, 
@@ -48,10 +48,13 @@ def main():
         
         # Plot fit
         x = np.linspace(0, 20, 100)
-        ax.plot(x, exp_decay(x, popt[0], lam_fit), '-', color=color, linewidth=2.5, 
-               label=f'Fit: lambda = {lam_fit:.0f} +/- {lam_err:.0f} m')
-        ax.fill_between(x, exp_decay(x, popt[0], lam_fit-lam_err), 
-                       exp_decay(x, popt[0], lam_fit+lam_err), alpha=0.2, color=color)
+        if fitted:
+            lam_fit = fit['lambda_m']
+            lam_lo, lam_hi = fit['lambda_m_err_low'], fit['lambda_m_err_high']
+            ax.plot(x, exp_decay(x, 1.0, lam_fit), '-', color=color, linewidth=2.5, 
+                   label=f'Fit: lambda = {lam_fit:.0f} +{lam_hi:.0f}/-{lam_lo:.0f} m')
+            ax.fill_between(x, exp_decay(x, 1.0, lam_fit-lam_lo), 
+                           exp_decay(x, 1.0, lam_fit+lam_hi), alpha=0.2, color=color)
         
         # Expected
         ax.plot(x, exp_decay(x, 1.0, exp_lam), '--', color='gray', linewidth=1.5, 
@@ -59,7 +62,7 @@ def main():
         
         ax.set_xlabel('Flight Distance (m)', fontsize=12)
         ax.set_ylabel('Survival Fraction', fontsize=12)
-        ax.set_title(f'{name}', fontsize=13, fontweight='bold')
+        ax.set_title(f'{name}' if fitted else f'{name} (fit failed)', fontsize=13, fontweight='bold')
         ax.legend(fontsize=10)
         ax.grid(True, alpha=0.3)
         ax.set_xlim([-1, 20])
@@ -5,15 +5,16 @@ Figure 11: TIME DILATION PROOF - Main Scientific Result
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
 import os
 
+from dataset import load_dataset
+
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def main():
     print('[11/13] *** TIME DILATION PROOF - MAIN RESULT ***')
     
-    df = pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    df = load_dataset()
     
     fig = plt.figure(figsize=(15, 10), facecolor='white')
     fig.suptitle('EXPERIMENTAL PROOF OF TIME DILATION', fontsize=18, fontweight='bold', y=0.98, color='#2C3E50')
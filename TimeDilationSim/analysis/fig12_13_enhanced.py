@@ -7,10 +7,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
+from dataset import load_dataset
+from histograms import load_histograms
+
 OUTPUT = '../geant4-result/figures/python-analysis'
 
 def main():
-    df = pd.concat([pd.read_csv(f'../output/TimeDilation_Run{i}.csv') for i in range(4)])
+    df = load_dataset()
+    hists = load_histograms()
     
     # Figure 12: Detector response summary
     print('[12/13] Enhanced detector response...')
@@ -19,8 +23,8 @@ def main():
     
     # 12a: ToF resolution
     ax = axes[0, 0]
-    tof = df['TOF'].dropna()
-    ax.hist(tof, bins=50, color='#9B59B6', alpha=0.7, edgecolor='black')
+    tof = hists['tof']
+    tof.display(50).plot(ax, color='#9B59B6', alpha=0.7, edgecolor='black')
     ax.axvline(tof.mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {tof.mean():.2f} ns')
     ax.set_xlabel('Time of Flight (ns)', fontsize=11)
     ax.set_ylabel('Events', fontsize=11)
@@ -30,8 +34,7 @@ def main():
     
     # 12b: ECal response
     ax = axes[0, 1]
-    ecal = df['Calo_TotalE'].dropna()
-    ax.hist(ecal[ecal > 0], bins=60, color='#E67E22', alpha=0.7, edgecolor='black')
+    hists['calo_e'].display(60, low=0).plot(ax, color='#E67E22', alpha=0.7, edgecolor='black')
     ax.set_xlabel('Calorimeter Energy (MeV)', fontsize=11)
     ax.set_ylabel('Events', fontsize=11)
     ax.set_title('Calorimeter Energy Deposition', fontsize=12, fontweight='bold')
@@ -40,8 +43,8 @@ def main():
     # 12c: Cherenkov resolution
     ax = axes[1, 0]
     for pdg, name, color in [(211, 'Pions', '#E74C3C'), (321, 'Kaons', '#3498DB')]:
-        npe = df[df['PrimaryPDG']==pdg]['RICH1_NPE'].dropna()
-        ax.hist(npe[npe > 0], bins=40, alpha=0.6, color=color, label=name, edgecolor='black')
+        npe = hists['rich1_npe', pdg]
+        npe.display(40, low=0).plot(ax, alpha=0.6, color=color, label=name, edgecolor='black')
     ax.set_xlabel('RICH NPE', fontsize=11)
     ax.set_ylabel('Events', fontsize=11)
     ax.set_title('Cherenkov Light Yield', fontsize=12, fontweight='bold')
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+figure_export.py
+Headless, multi-format export of the figure scripts' savefig calls
+
+The figure scripts save each figure once (mostly PNG at dpi=300). Inside
+an Exporter, every savefig also writes the same figure in the extra
+formats asked for, from the figure already built in memory: the plotting
+code runs once however many formats are written. A file written twice
+within one export (a script saving the .pdf itself after the .png) is
+only saved once. The time spent in savefig is recorded per figure, so
+slow exports can be told apart from slow plotting code.
+
+use_headless_backend() switches matplotlib to Agg before any figure is
+made, so batch renders never need a display and plt.show() never blocks.
+
+Usage:
+  from figure_export import Exporter, use_headless_backend
+  use_headless_backend()
+  with Exporter(['png', 'pdf']) as export:
+      make_figure()
+  print(export.written, export.save_seconds)
+"""
+
+import os
+import time
+
+# Formats the Agg canvas can write
+EXPORT_FORMATS = ('png', 'pdf', 'svg', 'eps', 'jpg', 'tif', 'webp')
+
+def use_headless_backend():
+    """Render with Agg from now on (no display, plt.show() does nothing)"""
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+def export_paths(path, formats):
+    """path followed by its variants in the other formats"""
+    stem, ext = os.path.splitext(path)
+    paths = [path]
+    for fmt in formats or ():
+        variant = f'{stem}.{fmt}'
+        if variant != path and variant not in paths:
+            paths.append(variant)
+    return paths
+
+def expand_outputs(outputs, formats):
+    """Output files of a task once every save also writes `formats`"""
+    expanded = []
+    for out in outputs:
+        for path in export_paths(out, formats):
+            if path not in expanded:
+                expanded.append(path)
+    return expanded
+
+class Exporter:
+    """Context manager routing every Figure.savefig through the extra formats
+
+    After the block, written lists the files saved and save_seconds the
+    time spent saving them.
+    """
+
+    def __init__(self, formats=None):
+        self.formats = list(formats or ())
+        self.written = []
+        self.save_seconds = 0.0
+        self._original = None
+
+    def _savefig(self, figure, fname, *args, **kwargs):
+        if not isinstance(fname, (str, os.PathLike)):
+            # File objects and buffers: one format only
+            return self._original(figure, fname, *args, **kwargs)
+
+        kwargs.pop('format', None)
+        start = time.perf_counter()
+        for path in export_paths(os.fspath(fname), self.formats):
+            if path in self.written:
+                continue
+            self._original(figure, path, *args, **kwargs)
+            self.written.append(path)
+        self.save_seconds += time.perf_counter() - start
+
+    def __enter__(self):
+        from matplotlib.figure import Figure
+
+        self._original = Figure.savefig
+        exporter = self
+
+        def savefig(figure, fname, *args, **kwargs):
+            return exporter._savefig(figure, fname, *args, **kwargs)
+
+        Figure.savefig = savefig
+        return self
+
+    def __exit__(self, *exc):
+        from matplotlib.figure import Figure
+
+        Figure.savefig = self._original
+        return False
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+figure_manifest.py
+Build manifest for incremental figure rendering
+
+For every figure task the manifest records what its last successful render
+depended on:
+  source   hash of the generating function, the module-level helpers and
+           constants it uses, and the script's import-time plot settings
+  inputs   content hash of each dataset column the function reads
+  outputs  size and mtime of each file it wrote
+  seconds  how long that render took, and the part spent saving files
+
+A task is stale when any of these differ from the current tree, so a
+rebuild with no changes only stats files and compares hashes.
+
+Usage:
+  from figure_manifest import load_manifest, stale_reason, record_task
+"""
+
+import json
+import os
+from pathlib import Path
+
+from dataset import cache_dir
+
+MANIFEST_NAME = 'figure_manifest.json'
+
+# Bump when the record layout changes, to force a full rebuild
+MANIFEST_VERSION = 1
+
+def manifest_path(data_dir='../output'):
+    """Location of the manifest (inside the dataset cache directory)"""
+    return cache_dir(data_dir) / MANIFEST_NAME
+
+def load_manifest(path):
+    """Task records by task name ({} if missing, unreadable or outdated)"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('tasks', {})
+
+def save_manifest(path, records):
+    """Write the manifest atomically"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'tasks': records}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def task_inputs(task, column_hashes):
+    """{column: hash} of the dataset columns a task reads"""
+    if not task.uses_data:
+        return {}
+    if column_hashes is None:
+        return {'<missing dataset>': ''}
+    # Columns could not be determined statically: depend on all of them
+    columns = task.columns if task.columns else sorted(column_hashes)
+    return {col: column_hashes.get(col, '') for col in columns}
+
+def _output_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def stale_reason(task, record, inputs):
+    """Why a task must be re-rendered, or None if its outputs are current"""
+    if record is None:
+        return 'never built'
+    if record['source'] != task.source_hash:
+        return 'code changed'
+    if record['inputs'] != inputs:
+        changed = sorted(col for col in set(inputs) | set(record['inputs'])
+                         if inputs.get(col) != record['inputs'].get(col))
+        return 'data changed (' + ', '.join(changed) + ')'
+    for out in task.outputs:
+        stamp = _output_stamp(out)
+        if stamp is None:
+            return 'output missing'
+        if record['outputs'].get(out) != stamp:
+            return 'output modified'
+    return None
+
+def record_task(task, inputs, seconds=None, export_seconds=None):
+    """Manifest record of a task that has just rendered successfully"""
+    return {
+        'source': task.source_hash,
+        'inputs': inputs,
+        'columns': task.columns,
+        'outputs': {out: _output_stamp(out) for out in task.outputs},
+        'seconds': seconds,
+        'export_seconds': export_seconds,
+    }
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+figure_runner.py
+Render every analysis figure in parallel from one shared copy of the dataset
+
+Figure functions are found by scanning the figure scripts: any top-level
+function that calls savefig and takes no arguments, just `df` (the
+dataset) or just `store` (the event store, event_store.py) is a task.
+Functions that save figures but take other arguments are reported, as
+are tasks of an earlier build that are no longer found, so a signature
+change never drops a figure silently. When two scripts write the same
+file, the one later in the scan order wins (the fig*_enhanced.py
+versions are the published ones).
+
+The dataset cache and its pre-binned histograms (histograms.py) are
+built once up front. Each worker process memory-maps the cached columns
+read-only, so all workers share one physical copy of the data, and runs
+with its address space capped at --memory-limit MB.
+
+Only stale figures are rendered: figure_manifest.py records the code
+(including the analysis helper modules it imports), dataset columns and
+output files each figure was last built from.
+
+Workers render headless (Agg). With --formats every savefig also writes
+the figure in those formats from the same render (figure_export.py).
+The render and export time of each figure is printed, kept in the
+manifest and written to figure_timings.csv next to it.
+
+Usage:
+  python figure_runner.py                       # stale figures, one worker per CPU
+  python figure_runner.py --force               # all figures
+  python figure_runner.py --workers 4 --memory-limit 2000
+  python figure_runner.py --list
+  python figure_runner.py --only fig08 vis0
+  python figure_runner.py --formats png pdf     # also write a PDF of every figure
+"""
+
+import argparse
+import ast
+import contextlib
+import csv
+import functools
+import glob
+import hashlib
+import importlib
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import dataset
+import histograms
+from event_store import INDEX_COLUMNS, load_event_store
+from figure_export import EXPORT_FORMATS, Exporter, expand_outputs, use_headless_backend
+from figure_manifest import (load_manifest, manifest_path, record_task, save_manifest,
+                             stale_reason, task_inputs)
+from run_io import COLUMN_TYPES
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts scanned for figure functions, lowest precedence first;
+# fig*_enhanced.py scripts are appended in name order
+BASE_MODULES = [
+    'generate_all_figures',
+    'generate_physics_figures',
+    'generate_geant4_style_vis',
+    'enhanced_3d_vis',
+    'enhance_fig01',
+]
+
+# Calls that make a figure function read the dataset itself
+DATA_LOADERS = {'load_dataset', 'load_arrays', 'load_event_store'}
+
+# Parameters a figure function may take: the dataset or the event store
+DATA_PARAMS = ('df', 'store')
+
+TIMINGS_NAME = 'figure_timings.csv'
+
+class FigureTask:
+    """One figure function and the files it writes"""
+
+    def __init__(self, module, function, data_param, outputs, output_dirs,
+                 source_hash='', uses_data=False, columns=None):
+        self.module = module
+        self.function = function
+        self.data_param = data_param
+        self.outputs = outputs
+        self.output_dirs = output_dirs
+        self.source_hash = source_hash
+        self.uses_data = uses_data
+        self.columns = columns or []
+
+    @property
+    def name(self):
+        return f'{self.module}.{self.function}'
+
+def figure_modules():
+    """Names of the figure scripts, lowest precedence first"""
+    enhanced = sorted(os.path.basename(path)[:-3]
+                      for path in glob.glob(os.path.join(ANALYSIS_DIR, 'fig*_enhanced.py')))
+    return BASE_MODULES + enhanced
+
+def _string_constants(tree):
+    """Module-level NAME = 'string' assignments"""
+    constants = {}
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, str)):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+    return constants
+
+def _savefig_path(call, constants):
+    """Output path of a savefig(f'{DIR}/name.png', ...) call, or None"""
+    if not call.args:
+        return None
+    arg = call.args[0]
+    if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+        return arg.value
+    if not isinstance(arg, ast.JoinedStr):
+        return None
+
+    parts = []
+    for value in arg.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+        elif isinstance(value.value, ast.Name) and value.value.id in constants:
+            parts.append(constants[value.value.id])
+        else:
+            return None
+    return ''.join(parts)
+
+def _is_savefig(node):
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == 'savefig')
+
+def _module_definitions(tree):
+    """Module-level functions, classes and assignments by name, and the
+    remaining statements that run at import (rcParams, style settings)"""
+    definitions = {}
+    side_effects = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            definitions[node.name] = node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [t.id for t in targets if isinstance(t, ast.Name)]
+            for name in names:
+                definitions[name] = node
+            if not names:
+                side_effects.append(node)
+        elif isinstance(node, ast.Expr) and not isinstance(node.value, ast.Constant):
+            side_effects.append(node)
+        elif isinstance(node, ast.If) and _is_main_guard(node):
+            continue
+        elif isinstance(node, ast.ImportFrom) and _is_helper_module(node.module):
+            # Names from analysis helpers (lifetime_fit, kinematics, ...) resolve
+            # to their module, loaders too (event_store's sampling shapes the
+            # figures); the data a loader reads is tracked through the columns
+            for alias in node.names:
+                definitions[alias.asname or alias.name] = node
+        elif not isinstance(node, (ast.Import, ast.ImportFrom, ast.Expr)):
+            side_effects.append(node)
+    return definitions, side_effects
+
+def _is_helper_module(module):
+    return (module is not None and module != 'dataset'
+            and os.path.exists(os.path.join(ANALYSIS_DIR, f'{module}.py')))
+
+def _string_literals(tree):
+    return {child.value for child in ast.walk(tree)
+            if isinstance(child, ast.Constant) and isinstance(child.value, str)}
+
+@functools.lru_cache(maxsize=None)
+def _helper_dependencies(module, visiting=()):
+    """(source hash, string literals) of a helper module and the helpers it imports"""
+    path = os.path.join(ANALYSIS_DIR, f'{module}.py')
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    digest = hashlib.sha1(ast.dump(tree).encode())
+    strings = _string_literals(tree)
+    for node in tree.body:
+        if (isinstance(node, ast.ImportFrom) and _is_helper_module(node.module)
+                and node.module not in visiting + (module,)):
+            sub_hash, sub_strings = _helper_dependencies(node.module, visiting + (module,))
+            digest.update(sub_hash.encode())
+            strings |= sub_strings
+    return digest.hexdigest(), frozenset(strings)
+
+def _is_main_guard(node):
+    test = node.test
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name)
+            and test.left.id == '__name__')
+
+def _reachable(node, definitions):
+    """A function and the module-level definitions it uses, in source order"""
+    seen = {id(node): node}
+    stack = [node]
+    while stack:
+        for child in ast.walk(stack.pop()):
+            if isinstance(child, ast.Name) and child.id in definitions:
+                target = definitions[child.id]
+                if id(target) not in seen:
+                    seen[id(target)] = target
+                    stack.append(target)
+    return sorted(seen.values(), key=lambda n: n.lineno)
+
+def _dependencies(node, definitions, side_effects):
+    """(source hash, uses dataset, columns read) of a figure function"""
+    nodes = _reachable(node, definitions)
+
+    # ast.dump ignores comments and formatting, so only code edits count
+    digest = hashlib.sha1()
+    for dep in side_effects + nodes:
+        digest.update(ast.dump(dep).encode())
+
+    names = set()
+    strings = set()
+    for dep in nodes:
+        if isinstance(dep, ast.ImportFrom):
+            helper_hash, helper_strings = _helper_dependencies(dep.module)
+            digest.update(helper_hash.encode())
+            strings |= helper_strings
+            continue
+        for child in ast.walk(dep):
+            if isinstance(child, ast.Name):
+                names.add(child.id)
+            elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+                strings.add(child.value)
+
+    uses_data = bool(names & DATA_LOADERS)
+    # Which events the store hands out depends on the columns it indexes
+    if 'load_event_store' in names or [arg.arg for arg in node.args.args] == ['store']:
+        strings |= set(INDEX_COLUMNS)
+    columns = sorted(strings & set(COLUMN_TYPES))
+    return digest.hexdigest(), uses_data, columns
+
+def scan_module(module, skipped=None):
+    """Figure tasks defined in one script
+
+    Functions that save figures but take arguments the runner cannot
+    supply are appended to `skipped` as 'module.function(args)'.
+    """
+    path = os.path.join(ANALYSIS_DIR, f'{module}.py')
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    constants = _string_constants(tree)
+    definitions, side_effects = _module_definitions(tree)
+
+    tasks = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        outputs = []
+        for call in ast.walk(node):
+            if _is_savefig(call):
+                out = _savefig_path(call, constants)
+                if out is not None:
+                    outputs.append(os.path.normpath(out))
+        if not outputs:
+            continue
+
+        params = [arg.arg for arg in node.args.args]
+        if len(params) > 1 or (params and params[0] not in DATA_PARAMS):
+            if skipped is not None:
+                skipped.append(f"{module}.{node.name}({', '.join(params)})")
+            continue
+
+        output_dirs = sorted({os.path.dirname(out) for out in outputs if os.path.dirname(out)})
+        data_param = params[0] if params else None
+        source_hash, loads_data, columns = _dependencies(node, definitions, side_effects)
+        tasks.append(FigureTask(module, node.name, data_param, outputs, output_dirs,
+                                source_hash, data_param is not None or loads_data, columns))
+    return tasks
+
+def discover_tasks(modules=None, skipped=None):
+    """Figure tasks of all scripts, dropping those whose every output is
+    written by a higher-precedence script (see scan_module for skipped)"""
+    all_tasks = []
+    for module in modules or figure_modules():
+        all_tasks.extend(scan_module(module, skipped))
+
+    # Last writer of each output file
+    owner = {}
+    for task in all_tasks:
+        for out in task.outputs:
+            owner[out] = task
+
+    return [task for task in all_tasks if any(owner[out] is task for out in task.outputs)]
+
+def select_tasks(tasks, patterns):
+    """Tasks whose name contains any of the patterns (all if none given)"""
+    if not patterns:
+        return tasks
+    return [task for task in tasks
+            if any(p in task.name or any(p in out for out in task.outputs) for p in patterns)]
+
+def default_memory_limit(n_workers):
+    """Physical memory split evenly across the workers, in MB (None if unknown)"""
+    try:
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+    return total // n_workers // (1024 * 1024)
+
+# --- Worker side -----------------------------------------------------------
+
+_worker_df = None
+_worker_store = None
+_module_rc = {}
+_default_rc = None
+
+def _init_worker(memory_limit_mb):
+    """Pool initializer: headless backend, memory cap, shared dataset"""
+    global _worker_df, _default_rc
+
+    import matplotlib
+    use_headless_backend()
+
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Warning: could not set memory limit ({e})")
+
+    # Figures only read the data: keep columns on the shared memory maps
+    dataset.COPY_BY_DEFAULT = False
+    _worker_df = dataset.load_dataset()
+    _default_rc = matplotlib.rcParams.copy()
+
+def _import_figure_module(module):
+    """Import a figure script, remembering the rcParams it sets at import
+    time so they apply to its own figures only"""
+    import matplotlib
+
+    if module not in _module_rc:
+        matplotlib.rcParams.update(_default_rc)
+        importlib.import_module(module)
+        _module_rc[module] = {key: value for key, value in matplotlib.rcParams.items()
+                              if _default_rc[key] != value}
+    return sys.modules[module]
+
+def _data_argument(data_param):
+    """The dataset or event store a figure function takes (loaded on first use)"""
+    global _worker_store
+
+    if data_param == 'store' and _worker_store is None:
+        _worker_store = load_event_store()
+    data = _worker_df if data_param == 'df' else _worker_store
+    if data is None:
+        raise FileNotFoundError("No run data found in ../output")
+    return data
+
+def _run_task(module, function, data_param, output_dirs, formats=None):
+    """Render one figure; returns (ok, elapsed seconds, export seconds, captured output)"""
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    ok = True
+    export = Exporter(formats)
+    try:
+        with contextlib.redirect_stdout(log), export:
+            mod = _import_figure_module(module)
+            for out_dir in output_dirs:
+                os.makedirs(out_dir, exist_ok=True)
+
+            matplotlib.rcParams.update(_default_rc)
+            with matplotlib.rc_context(_module_rc[module]):
+                func = getattr(mod, function)
+                if data_param is not None:
+                    func(_data_argument(data_param))
+                else:
+                    func()
+    except Exception:
+        ok = False
+        log.write(traceback.format_exc())
+    finally:
+        plt.close('all')
+    return ok, time.perf_counter() - start, export.save_seconds, log.getvalue()
+
+# --- Parent side -----------------------------------------------------------
+
+def run_tasks(tasks, n_workers, memory_limit_mb=None, verbose=False, on_done=None,
+              formats=None):
+    """Render tasks in a process pool; returns {name: (ok, seconds, export seconds)}
+
+    formats are written by every savefig in addition to the file it names.
+    on_done(task, ok, seconds, export_seconds) is called in this process
+    as each task finishes.
+    """
+    # Build the cache, histograms and event index before forking so workers
+    # don't race to write them
+    dataset.snapshot_path()
+    histograms.load_histograms(n_workers=n_workers)
+    if any(task.uses_data for task in tasks):
+        load_event_store()
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(memory_limit_mb,)) as pool:
+        futures = {pool.submit(_run_task, task.module, task.function, task.data_param,
+                               task.output_dirs, formats): task
+                   for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                ok, elapsed, export, log = future.result()
+            except BrokenProcessPool:
+                ok, elapsed, export, log = False, 0.0, 0.0, "Worker died (memory limit exceeded?)\n"
+
+            results[task.name] = (ok, elapsed, export)
+            if on_done is not None:
+                on_done(task, ok, elapsed, export)
+            status = '✓' if ok else '✗'
+            print(f"{status} {task.name:<55s} {elapsed:6.1f} s  (export {export:.1f} s)")
+            if verbose or not ok:
+                print(log.rstrip())
+    return results
+
+def save_timings(path, results):
+    """Write the render and export time of each task as CSV, slowest first"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['task', 'ok', 'seconds', 'export_seconds'])
+        for name, (ok, elapsed, export) in sorted(results.items(), key=lambda item: -item[1][1]):
+            writer.writerow([name, int(ok), f'{elapsed:.3f}', f'{export:.3f}'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render all analysis figures in parallel")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='Address-space cap per worker in MB '
+                             '(default: physical memory / workers; 0 disables)')
+    parser.add_argument('--only', nargs='+', default=None,
+                        help='Only render tasks whose name or output contains one of these')
+    parser.add_argument('--force', action='store_true',
+                        help='Render all selected figures, even if up to date')
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=None,
+                        help='Also write every figure in these formats, from the same render')
+    parser.add_argument('--list', action='store_true',
+                        help='List figure tasks with their build status and exit')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show figure script output')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    skipped = []
+    all_tasks = discover_tasks(skipped=skipped)
+    tasks = select_tasks(all_tasks, args.only)
+    if args.formats:
+        for task in tasks:
+            task.outputs = expand_outputs(task.outputs, args.formats)
+
+    # Compare every task against the manifest of its last successful build
+    manifest_file = manifest_path()
+    records = load_manifest(manifest_file)
+
+    # Report figure functions the runner cannot render, instead of dropping them
+    for name in skipped:
+        print(f"Warning: {name} saves figures but takes arguments other than "
+              f"{' or '.join(DATA_PARAMS)}; not rendered")
+    lost = sorted(set(records) - {task.name for task in all_tasks})
+    for name in lost:
+        print(f"Warning: {name} was rendered before but is no longer a figure task")
+    if lost and not args.list:
+        for name in lost:
+            del records[name]
+        save_manifest(manifest_file, records)
+    column_hashes = dataset.column_hashes() if any(t.uses_data for t in tasks) else None
+    inputs = {task.name: task_inputs(task, column_hashes) for task in tasks}
+    reasons = {task.name: stale_reason(task, records.get(task.name), inputs[task.name])
+               for task in tasks}
+
+    if args.list:
+        for task in tasks:
+            outputs = ', '.join(os.path.basename(out) for out in task.outputs)
+            status = reasons[task.name] or 'up to date'
+            seconds = records.get(task.name, {}).get('seconds')
+            timing = f"  {seconds:.1f} s" if seconds is not None else ''
+            print(f"{task.name:<55s} {outputs}  [{status}]{timing}")
+        return
+
+    stale = tasks if args.force else [task for task in tasks if reasons[task.name]]
+    if not stale:
+        print(f"All {len(tasks)} figure(s) up to date ({time.perf_counter() - start:.2f} s)")
+        return
+
+    def on_done(task, ok, seconds, export_seconds):
+        if ok:
+            records[task.name] = record_task(task, inputs[task.name], seconds, export_seconds)
+        else:
+            records.pop(task.name, None)
+        save_manifest(manifest_file, records)
+
+    n_workers = max(1, min(args.workers, len(stale)))
+    memory_limit = args.memory_limit
+    if memory_limit is None:
+        memory_limit = default_memory_limit(n_workers)
+
+    print("="*70)
+    print(f"Rendering {len(stale)} of {len(tasks)} figure task(s) with {n_workers} worker(s)"
+          + (f", {memory_limit} MB each" if memory_limit else ""))
+    print("="*70)
+    if not args.force:
+        for task in stale:
+            print(f"  {task.name}: {reasons[task.name]}")
+
+    results = run_tasks(stale, n_workers, memory_limit, args.verbose, on_done, args.formats)
+    wall = time.perf_counter() - start
+    timings_file = manifest_file.with_name(TIMINGS_NAME)
+    save_timings(timings_file, results)
+
+    failed = [name for name, (ok, _, _) in results.items() if not ok]
+    busy = sum(elapsed for _, elapsed, _ in results.values())
+    export = sum(export for _, _, export in results.values())
+    print("="*70)
+    print(f"{len(results) - len(failed)}/{len(results)} figures in {wall:.1f} s "
+          f"wall ({busy:.1f} s of rendering, {export:.1f} s of it saving files)")
+    print(f"Timings: {timings_file}")
+    if failed:
+        print("Failed: " + ', '.join(failed))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+g4_ntuple.py
+Read Geant4 per-thread CSV ntuples (tools::wcsv) and merge them into one run
+
+A multi-threaded Geant4 run writes one file per worker thread,
+TimeDilation_Run{i}_nt_TimeDilation_t{0..N}.csv, each starting with
+'#class', '#title', '#separator', '#vector_separator' and '#column <type>
+<name>' header lines. The thread files are read in parallel with typed
+columns and merged in EventID order.
+
+Usage:
+  python g4_ntuple.py --input-dir .. --runs 0
+  python g4_ntuple.py --input-dir .. --runs 0 --output-dir ../output --format parquet
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from run_io import FORMATS, RunWriter, run_path
+
+NTUPLE_NAME = 'TimeDilation'
+
+# tools::wcsv column types -> numpy dtypes
+WCSV_TYPES = {
+    'char': 'int8',
+    'short': 'int16',
+    'int': 'int32',
+    'int64': 'int64',
+    'uchar': 'uint8',
+    'ushort': 'uint16',
+    'uint': 'uint32',
+    'uint64': 'uint64',
+    'float': 'float32',
+    'double': 'float64',
+    'bool': 'bool',
+    'string': 'object',
+}
+
+THREAD_FILE_PATTERN = re.compile(r'_t(\d+)\.csv$')
+
+def parse_header(path):
+    """Parse the '#' header of a wcsv ntuple file
+
+    Returns a dict with 'class', 'title', 'separator', 'vector_separator',
+    'columns' (list of (name, dtype)) and 'n_header_lines'. Vector columns
+    ('vector<double>' etc.) are kept as strings.
+    """
+    header = {'class': None, 'title': '', 'separator': ',', 'vector_separator': ';',
+              'columns': [], 'n_header_lines': 0}
+
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            header['n_header_lines'] += 1
+            key, _, value = line[1:].rstrip('\n').partition(' ')
+
+            if key == 'class':
+                header['class'] = value
+            elif key == 'title':
+                header['title'] = value
+            elif key == 'separator':
+                header['separator'] = chr(int(value))
+            elif key == 'vector_separator':
+                header['vector_separator'] = chr(int(value))
+            elif key == 'column':
+                col_type, name = value.rsplit(' ', 1)
+                header['columns'].append((name, WCSV_TYPES.get(col_type, 'object')))
+
+    if not header['columns']:
+        raise ValueError(f"No '#column' header lines in {path}")
+    return header
+
+def is_thread_file(path):
+    """True for a per-thread ntuple file name (..._t{N}.csv)"""
+    return THREAD_FILE_PATTERN.search(Path(path).name) is not None
+
+def find_thread_files(run_id, data_dir='..', ntuple=NTUPLE_NAME):
+    """Per-thread ntuple files of a run, ordered by thread number"""
+    paths = Path(data_dir).glob(f'TimeDilation_Run{run_id}_nt_{ntuple}_t*.csv')
+    threads = []
+    for path in paths:
+        match = THREAD_FILE_PATTERN.search(path.name)
+        if match:
+            threads.append((int(match.group(1)), path))
+    return [path for _, path in sorted(threads)]
+
+def read_thread_file(path, columns=None, header=None):
+    """Read one thread file with the dtypes declared in its header"""
+    import pandas as pd
+    header = header or parse_header(path)
+    names = [name for name, _ in header['columns']]
+    dtypes = dict(header['columns'])
+
+    return pd.read_csv(path, sep=header['separator'], header=None, names=names,
+                       skiprows=header['n_header_lines'], dtype=dtypes,
+                       usecols=list(columns) if columns is not None else None)
+
+def read_ntuple(paths, columns=None, n_workers=None):
+    """Read thread files in parallel and merge them, ordered by EventID
+
+    Rows with equal EventID keep thread-file order, so the merge is
+    deterministic for a given set of files.
+    """
+    import pandas as pd
+    paths = [Path(p) for p in paths]
+    if not paths:
+        raise FileNotFoundError("No ntuple thread files given")
+
+    headers = [parse_header(p) for p in paths]
+    for path, header in zip(paths[1:], headers[1:]):
+        if header['columns'] != headers[0]['columns']:
+            raise ValueError(f"Column layout of {path} differs from {paths[0]}")
+
+    if columns is not None and 'EventID' not in columns:
+        read_columns = ['EventID'] + list(columns)
+    else:
+        read_columns = columns
+
+    n_workers = n_workers or min(len(paths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        parts = list(executor.map(lambda ph: read_thread_file(ph[0], read_columns, ph[1]),
+                                  zip(paths, headers)))
+
+    df = pd.concat(parts, ignore_index=True)
+    order = np.argsort(df['EventID'].to_numpy(), kind='stable')
+    df = df.take(order).reset_index(drop=True)
+
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+def load_thread_run(run_id, data_dir='..', columns=None, n_workers=None):
+    """Merged table of a run written as per-thread ntuple files"""
+    paths = find_thread_files(run_id, data_dir)
+    if not paths:
+        raise FileNotFoundError(f"No ntuple thread files for run {run_id} in {data_dir}")
+    return read_ntuple(paths, columns, n_workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge Geant4 per-thread CSV ntuples")
+    parser.add_argument('--input-dir', default='..', help='Directory with thread files')
+    parser.add_argument('--runs', type=int, nargs='+', default=[0], help='Run numbers to merge')
+    parser.add_argument('--output-dir', default=None,
+                        help='Where to write TimeDilation_Run{i} (default: input dir)')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv',
+                        help='Output file format')
+    parser.add_argument('--workers', type=int, default=None, help='Reader threads')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or args.input_dir
+    os.makedirs(output_dir, exist_ok=True)
+    for run_id in args.runs:
+        paths = find_thread_files(run_id, args.input_dir)
+        if not paths:
+            print(f"Skipping run {run_id} (no thread files in {args.input_dir})")
+            continue
+
+        df = read_ntuple(paths, n_workers=args.workers)
+        out_file = run_path(run_id, output_dir, args.format)
+        with RunWriter(out_file, args.format) as writer:
+            writer.write(df)
+        print(f"✓ Merged {len(paths)} thread files ({len(df)} events) -> {out_file}")
+
+if __name__ == '__main__':
+    main()
@@ -10,23 +10,25 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-from scipy.optimize import curve_fit
 import sys
 import os
 
+from dataset import dataset_source, load_dataset
+from density_plot import density_scatter
+from event_display import TRACKS_PER_PANEL, decay_z, draw_tracks, track_polylines
+from histograms import load_histograms
+from lifetime_fit import fit_lifetime
+
 # Output directory
 OUTPUT_DIR = '../geant4-result/figures/python-analysis'
 
 def load_all_data(output_dir='../output'):
-    """Load all CSV files and combine"""
-    dfs = []
-    for i in range(4):
-        csv_path = os.path.join(output_dir, f'TimeDilation_Run{i}.csv')
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            dfs.append(df)
-            print(f"Loaded Run{i}: {len(df)} events")
-    return pd.concat(dfs, ignore_index=True) if dfs else None
+    """Load all runs combined, through the dataset cache"""
+    df = load_dataset(output_dir)
+    if df is not None:
+        for run, n in df['RunNumber'].value_counts().sort_index().items():
+            print(f"Loaded Run{run}: {n} events")
+    return df
 
 def fig1_trajectory_fixed(df):
     """Fixed particle trajectories - proper axis limits"""
@@ -34,9 +36,9 @@ def fig1_trajectory_fixed(df):
     
     fig = plt.figure(figsize=(15, 10))
     
-    pions = df[df['PrimaryPDG'] == 211].head(30)
-    kaons = df[df['PrimaryPDG'] == 321].head(30)
-    muons = df[df['PrimaryPDG'] == -13].head(30)
+    pions = df[df['PrimaryPDG'] == 211].head(TRACKS_PER_PANEL)
+    kaons = df[df['PrimaryPDG'] == 321].head(TRACKS_PER_PANEL)
+    muons = df[df['PrimaryPDG'] == -13].head(TRACKS_PER_PANEL)
     
     for idx, (data, color, name) in enumerate([
         (pions, 'red', 'Pions (π⁺)'),
@@ -50,36 +52,16 @@ def fig1_trajectory_fixed(df):
         if len(data) == 0:
             ax.text(0, 0, 8, 'No data', ha='center', fontsize=12)
         else:
-            for _, event in data.iterrows():
-                # Start at z=-50cm (origin), end at z=15m
-                z_start = event['PrimaryPosZ'] / 100  # cm to m
-                z_end = 15.5
-                
-                # Trajectory with small spread
-                n_pts = 50
-                z_path = np.linspace(max(z_start, -0.5), z_end, n_pts)
-                
-                # XY positions in cm, convert to m for display
-                x_start = event['PrimaryPosX'] / 100
-                y_start = event['PrimaryPosY'] / 100
-                
-                # Small angular divergence
-                theta = np.random.normal(0, 0.002)
-                phi = np.random.uniform(0, 2*np.pi)
-                
-                x_path = x_start + np.tan(theta) * np.cos(phi) * (z_path - z_start)
-                y_path = y_start + np.tan(theta) * np.sin(phi) * (z_path - z_start)
-                
-                survived = event['Survived'] == 1
-                alpha = 0.7 if survived else 0.3
-                
-                ax.plot(x_path, y_path, z_path, color=color, linewidth=1, alpha=alpha)
-                
-                # Mark decay point
-                if event['Decayed'] == 1 and event['DecayPosZ'] > 0:
-                    dz = event['DecayPosZ'] / 100  # cm to m
-                    if 0 < dz < 16:
-                        ax.scatter([0], [0], [dz], c='black', marker='x', s=30)
+            # Start at z=-50cm (origin), end at z=15.5m, small angular divergence
+            tracks = track_polylines(data, z_end=15.5, z_min=-0.5, divergence=0.002)
+            survived = data['Survived'].to_numpy() == 1
+            draw_tracks(ax, tracks[survived], color=color, linewidth=1, alpha=0.7)
+            draw_tracks(ax, tracks[~survived], color=color, linewidth=1, alpha=0.3)
+            
+            # Mark decay points
+            dz = decay_z(data)
+            dz = dz[(dz > 0) & (dz < 16)]
+            ax.scatter(np.zeros_like(dz), np.zeros_like(dz), dz, c='black', marker='x', s=30)
         
         ax.set_xlabel('X (m)')
         ax.set_ylabel('Y (m)')
@@ -144,15 +126,15 @@ def fig3_beta_distribution(df):
     """RICH beta measurements"""
     print("\n[3/9] Generating β distributions...")
     
+    hists = load_histograms(*dataset_source(df))
     fig, axes = plt.subplots(2, 2, figsize=(12, 10))
     
     # β distribution by species
     ax1 = axes[0, 0]
     for pdg, name, color in [(211, 'π⁺', 'red'), (321, 'K⁺', 'blue'), (-13, 'μ⁺', 'green')]:
-        data = df[df['PrimaryPDG'] == pdg]['RICH1_Beta']
-        data = data[(data > 0.99) & (data < 1.01)]
+        data = hists['beta', pdg].restrict(0.99, 1.01)
         if len(data) > 0:
-            ax1.hist(data, bins=50, alpha=0.5, label=f'{name} (N={len(data)})', color=color)
+            data.display(50).plot(ax1, alpha=0.5, label=f'{name} (N={len(data)})', color=color)
     ax1.axvline(0.999850, color='red', linestyle='--', linewidth=2, label='π⁺ expected')
     ax1.axvline(0.998100, color='blue', linestyle='--', linewidth=2, label='K⁺ expected')
     ax1.set_xlabel('β (v/c)')
@@ -163,10 +145,9 @@ def fig3_beta_distribution(df):
     
     # β resolution
     ax2 = axes[0, 1]
-    pion_beta = df[df['PrimaryPDG'] == 211]['RICH1_Beta']
-    pion_beta = pion_beta[(pion_beta > 0.99) & (pion_beta < 1.01)]
+    pion_beta = hists['beta', 211].restrict(0.99, 1.01)
     if len(pion_beta) > 0:
-        ax2.hist(pion_beta - 0.999850, bins=50, color='red', alpha=0.7)
+        pion_beta.display(50).plot(ax2, shift=-0.999850, color='red', alpha=0.7)
         ax2.set_xlabel('β - β_expected')
         ax2.set_ylabel('Events')
         resolution = pion_beta.std() / pion_beta.mean()
@@ -177,8 +158,8 @@ def fig3_beta_distribution(df):
     ax3 = axes[1, 0]
     pions = df[df['PrimaryPDG'] == 211]
     kaons = df[df['PrimaryPDG'] == 321]
-    ax3.scatter(pions['PrimaryMom'], pions['RICH1_Beta'], c='red', alpha=0.3, s=5, label='π⁺')
-    ax3.scatter(kaons['PrimaryMom'], kaons['RICH1_Beta'], c='blue', alpha=0.3, s=5, label='K⁺')
+    density_scatter(ax3, pions['PrimaryMom'], pions['RICH1_Beta'], 'red', label='π⁺', s=5)
+    density_scatter(ax3, kaons['PrimaryMom'], kaons['RICH1_Beta'], 'blue', label='K⁺', s=5)
     ax3.set_xlabel('Momentum (GeV/c)')
     ax3.set_ylabel('β')
     ax3.set_title('β vs Momentum')
@@ -187,15 +168,13 @@ def fig3_beta_distribution(df):
     
     # K/π separation
     ax4 = axes[1, 1]
-    pi_beta = df[df['PrimaryPDG'] == 211]['RICH1_Beta']
-    k_beta = df[df['PrimaryPDG'] == 321]['RICH1_Beta']
-    pi_beta = pi_beta[(pi_beta > 0.99) & (pi_beta < 1.01)]
-    k_beta = k_beta[(k_beta > 0.99) & (k_beta < 1.01)]
+    pi_beta = hists['beta', 211].restrict(0.99, 1.01)
+    k_beta = hists['beta', 321].restrict(0.99, 1.01)
     
     if len(pi_beta) > 0 and len(k_beta) > 0:
         separation = abs(pi_beta.mean() - k_beta.mean()) / np.sqrt(pi_beta.std()**2 + k_beta.std()**2)
-        ax4.hist(pi_beta, bins=30, alpha=0.5, color='red', label=f'π⁺: β={pi_beta.mean():.5f}')
-        ax4.hist(k_beta, bins=30, alpha=0.5, color='blue', label=f'K⁺: β={k_beta.mean():.5f}')
+        pi_beta.display(30).plot(ax4, alpha=0.5, color='red', label=f'π⁺: β={pi_beta.mean():.5f}')
+        k_beta.display(30).plot(ax4, alpha=0.5, color='blue', label=f'K⁺: β={k_beta.mean():.5f}')
         ax4.set_title(f'K⁺/π⁺ Separation: {separation:.1f}σ')
         ax4.legend()
     ax4.set_xlabel('β')
@@ -211,15 +190,15 @@ def fig4_eop_distribution(df):
     """E/p (calorimeter) distributions"""
     print("\n[4/9] Generating E/p distributions...")
     
+    hists = load_histograms(*dataset_source(df))
     fig, axes = plt.subplots(1, 3, figsize=(14, 4))
     
     for ax, (pdg, name, color) in zip(axes, [
         (211, 'π⁺ (hadronic)', 'red'), (321, 'K⁺ (hadronic)', 'blue'), (-13, 'μ⁺ (MIP)', 'green')
     ]):
-        data = df[df['PrimaryPDG'] == pdg]['Calo_EoP']
-        data = data[data < 2]  # Remove outliers
+        data = hists['eop', pdg].restrict(high=2)  # Remove outliers
         if len(data) > 0:
-            ax.hist(data, bins=50, color=color, alpha=0.7, edgecolor='black')
+            data.display(50).plot(ax, color=color, alpha=0.7, edgecolor='black')
             ax.axvline(data.mean(), color='black', linestyle='-', linewidth=2,
                       label=f'Mean: {data.mean():.3f}')
             # PID thresholds
@@ -310,21 +289,21 @@ def fig6_cherenkov_npe(df):
     """Cherenkov photoelectron distributions"""
     print("\n[6/9] Generating Cherenkov NPE distributions...")
     
+    hists = load_histograms(*dataset_source(df))
     fig, axes = plt.subplots(1, 3, figsize=(14, 4))
     
     for ax, (pdg, name, color) in zip(axes, [
         (211, 'π⁺', 'red'), (321, 'K⁺', 'blue'), (-13, 'μ⁺', 'green')
     ]):
-        data = df[df['PrimaryPDG'] == pdg]
-        npe1 = data['RICH1_NPE']
-        npe2 = data['RICH2_NPE']
+        npe1 = hists['rich1_npe', pdg]
+        npe2 = hists['rich2_npe', pdg]
         
-        if len(data) > 0:
-            ax.hist(npe1, bins=30, alpha=0.5, color=color, label=f'RICH1: μ={npe1.mean():.1f}')
-            ax.hist(npe2, bins=30, alpha=0.5, color='gray', label=f'RICH2: μ={npe2.mean():.1f}')
+        if len(npe1) > 0:
+            npe1.display(30).plot(ax, alpha=0.5, color=color, label=f'RICH1: μ={npe1.mean():.1f}')
+            npe2.display(30).plot(ax, alpha=0.5, color='gray', label=f'RICH2: μ={npe2.mean():.1f}')
             ax.set_xlabel('Number of Photoelectrons')
             ax.set_ylabel('Events')
-            ax.set_title(f'{name} Cherenkov NPE\n(N={len(data)})')
+            ax.set_title(f'{name} Cherenkov NPE\n(N={len(npe1)})')
             ax.legend()
         ax.grid(True, alpha=0.3)
     
@@ -337,15 +316,16 @@ def fig7_beam_profile(df):
     """Beam profile 2D histograms"""
     print("\n[7/9] Generating beam profile...")
     
+    hists = load_histograms(*dataset_source(df))
     fig, axes = plt.subplots(1, 3, figsize=(14, 4))
+    edges = np.linspace(-4, 4, 31)
     
     for ax, (pdg, name, cmap) in zip(axes, [
         (211, 'π⁺', 'Reds'), (321, 'K⁺', 'Blues'), (-13, 'μ⁺', 'Greens')
     ]):
-        data = df[df['PrimaryPDG'] == pdg]
+        data = hists['beam_xy', pdg]
         if len(data) > 0:
-            h = ax.hist2d(data['PrimaryPosX'], data['PrimaryPosY'], 
-                         bins=30, cmap=cmap, range=[[-4, 4], [-4, 4]])
+            h = data.regroup(edges, edges).hist2d(ax, cmap=cmap)
             plt.colorbar(h[3], ax=ax, label='Events')
             circle1 = plt.Circle((0, 0), 1.0, fill=False, color='white', linestyle='--', linewidth=2)
             ax.add_patch(circle1)
@@ -372,7 +352,7 @@ def fig8_pid_performance(df):
         beta = data['RICH1_Beta']
         eop = data['Calo_EoP']
         valid = (beta > 0.99) & (beta < 1.01) & (eop < 1.5)
-        ax1.scatter(beta[valid], eop[valid], c=color, alpha=0.3, s=10, label=name)
+        density_scatter(ax1, beta[valid], eop[valid], color, label=name)
     ax1.axhline(0.3, color='gray', linestyle='--', alpha=0.5)
     ax1.axhline(0.8, color='gray', linestyle='--', alpha=0.5)
     ax1.axvline(0.999, color='gray', linestyle='--', alpha=0.5)
@@ -462,6 +442,8 @@ def fig9_lifetime_fit(df):
     def exp_decay(x, S0, lam):
         return S0 * np.exp(-x / lam)
     
+    fits = fit_lifetime(df).set_index('PrimaryPDG')
+    
     for ax, (pdg, name, color, expected_lambda) in zip(axes, [
         (211, 'π⁺', 'red', 447), (321, 'K⁺', 'blue', 60)
     ]):
@@ -480,28 +462,26 @@ def fig9_lifetime_fit(df):
         survivals = np.array(survivals)
         errors = np.array(errors)
         
-        # Fit
-        try:
-            popt, pcov = curve_fit(exp_decay, distances, survivals, p0=[1.0, expected_lambda], 
-                                   sigma=errors, absolute_sigma=True)
-            S0_fit, lambda_fit = popt
-            lambda_err = np.sqrt(pcov[1, 1])
-            
+        # Unbinned likelihood fit to the decay vertices
+        fit = fits.loc[pdg]
+        lambda_fit = fit['lambda_m']
+        if np.isfinite(lambda_fit):
             # Plot data
             ax.errorbar(distances, survivals, yerr=errors, fmt='o', color=color, 
                        markersize=10, capsize=5, label='Data')
             
             # Plot fit
             x_fit = np.linspace(0, 20, 100)
-            ax.plot(x_fit, exp_decay(x_fit, *popt), '-', color=color, linewidth=2,
-                   label=f'Fit: λ = {lambda_fit:.1f} ± {lambda_err:.1f} m')
+            ax.plot(x_fit, exp_decay(x_fit, 1.0, lambda_fit), '-', color=color, linewidth=2,
+                   label=f"Fit: λ = {lambda_fit:.1f} +{fit['lambda_m_err_high']:.1f}"
+                         f"/-{fit['lambda_m_err_low']:.1f} m")
             
             # Expected curve
             ax.plot(x_fit, exp_decay(x_fit, 1.0, expected_lambda), '--', color='gray',
                    linewidth=1, label=f'Expected: λ = {expected_lambda} m')
             
             ax.set_title(f'{name} Decay Length Measurement\nλ_meas = {lambda_fit:.1f} m vs λ_exp = {expected_lambda} m')
-        except:
+        else:
             ax.errorbar(distances, survivals, yerr=errors, fmt='o', color=color, markersize=10)
             ax.set_title(f'{name} (fit failed)')
         
@@ -8,49 +8,17 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import matplotlib.patches as mpatches
 from matplotlib.patches import FancyBboxPatch, Circle
 import sys
 import os
 
-OUTPUT_DIR = '../geant4-result/figures/geant4-vis'
-
-def create_detector_components():
-    """Define detector components with exact dimensions"""
-    components = {
-        'SC1': {'pos': (0, 0, 0.495), 'size': (0.1, 0.1, 0.01), 'color': 'lime', 'alpha': 0.8},
-        'RICH1': {'pos': (0, 0, 1.0), 'size': (0.3, 0.3, 1.0), 'color': 'lightblue', 'alpha': 0.3},
-        'DWC1': {'pos': (0, 0, 1.7), 'size': (0.3, 0.3, 0.2), 'color': 'yellow', 'alpha': 0.5},
-    }
-    return components
+from dataset import load_dataset
+from detector_geometry import STATION2_DISTANCES, draw_cross_section, draw_detector, station2_z
+from event_display import TRACKS_PER_PANEL, decay_z, decayed, draw_tracks, track_polylines
+from event_store import load_event_store
 
-def draw_3d_box(ax, position, size, color, alpha, label=None):
-    """Draw a 3D box"""
-    x, y, z = position
-    sx, sy, sz = size
-    
-    vertices = np.array([
-        [x-sx/2, y-sy/2, z-sz/2], [x+sx/2, y-sy/2, z-sz/2],
-        [x+sx/2, y+sy/2, z-sz/2], [x-sx/2, y+sy/2, z-sz/2],
-        [x-sx/2, y-sy/2, z+sz/2], [x+sx/2, y-sy/2, z+sz/2],
-        [x+sx/2, y+sy/2, z+sz/2], [x-sx/2, y+sy/2, z+sz/2]
-    ])
-    
-    faces = [
-        [vertices[j] for j in [0, 1, 5, 4]],
-        [vertices[j] for j in [7, 6, 2, 3]],
-        [vertices[j] for j in [0, 3, 7, 4]],
-        [vertices[j] for j in [1, 2, 6, 5]],
-        [vertices[j] for j in [0, 1, 2, 3]],
-        [vertices[j] for j in [4, 5, 6, 7]]
-    ]
-    
-    poly = Poly3DCollection(faces, alpha=alpha, facecolor=color, edgecolor='black', linewidth=0.5)
-    ax.add_collection3d(poly)
-    
-    if label:
-        ax.text(x, y, z, label, fontsize=9, ha='center', weight='bold')
+OUTPUT_DIR = '../geant4-result/figures/geant4-vis'
 
 def fig1_detector_layout_all_configs():
     """Complete detector layout for all 4 configurations"""
@@ -60,22 +28,12 @@ def fig1_detector_layout_all_configs():
     fig.suptitle('Time Dilation Experiment - Detector Configurations', 
                  fontsize=14, fontweight='bold')
     
-    station2_positions = [0, 5, 10, 15]
-    
-    for idx, dist in enumerate(station2_positions):
+    for idx, dist in enumerate(STATION2_DISTANCES):
         ax = fig.add_subplot(2, 2, idx+1, projection='3d')
         
-        # Station 1 components
-        draw_3d_box(ax, (0, 0, 0.495), (0.1, 0.1, 0.01), 'lime', 0.8, 'SC1')
-        draw_3d_box(ax, (0, 0, 1.0), (0.3, 0.3, 1.0), 'lightblue', 0.3, 'RICH1')
-        draw_3d_box(ax, (0, 0, 1.7), (0.3, 0.3, 0.2), 'yellow', 0.5, 'DWC1')
-        
-        # Station 2 components
-        s2_base = 0.5 + dist
-        draw_3d_box(ax, (0, 0, s2_base-0.005), (0.1, 0.1, 0.01), 'lime', 0.8, 'SC2')
-        draw_3d_box(ax, (0, 0, s2_base+0.5), (0.3, 0.3, 1.0), 'lightblue', 0.3, 'RICH2')
-        draw_3d_box(ax, (0, 0, s2_base+1.2), (0.3, 0.3, 0.2), 'yellow', 0.5, 'DWC2')
-        draw_3d_box(ax, (0, 0, s2_base+2.0), (0.3, 0.3, 0.14), 'orange', 0.6, 'Calo')
+        # Station 1 and Station 2 components
+        draw_detector(ax, dist)
+        s2_base = station2_z(dist)
         
         # Beam axis
         z_vals = np.linspace(-0.5, s2_base+2.5, 100)
@@ -93,7 +51,7 @@ def fig1_detector_layout_all_configs():
         ax.set_xlabel('X (m)', fontsize=10)
         ax.set_ylabel('Y (m)', fontsize=10)
         ax.set_zlabel('Z (m)', fontsize=10)
-        ax.set_title(f'Station 2 at {dist} m', fontsize=11, fontweight='bold')
+        ax.set_title(f'Station 2 at {dist:.0f} m', fontsize=11, fontweight='bold')
         ax.set_xlim([-0.3, 0.3])
         ax.set_ylim([-0.3, 0.3])
         ax.set_zlim([0, s2_base+2.5])
@@ -105,7 +63,7 @@ def fig1_detector_layout_all_configs():
     plt.close()
     print("✓ Saved: G4_01_detector_layout_all.png")
 
-def fig2_event_display_3d(df):
+def fig2_event_display_3d(store):
     """3D event display showing particle tracks"""
     print("[G4-02] 3D event display...")
     
@@ -115,45 +73,28 @@ def fig2_event_display_3d(df):
     
     # Get sample events
     events = {
-        'Pion (survived)': df[(df['PrimaryPDG']==211) & (df['Survived']==1)].head(5),
-        'Pion (decayed)': df[(df['PrimaryPDG']==211) & (df['Decayed']==1)].head(5),
-        'Kaon (survived)': df[(df['PrimaryPDG']==321) & (df['Survived']==1)].head(5),
-        'Kaon (decayed)': df[(df['PrimaryPDG']==321) & (df['Decayed']==1)].head(5),
+        'Pion (survived)': store.sample(211, decayed=False, n=5),
+        'Pion (decayed)': store.sample(211, decayed=True, n=5),
+        'Kaon (survived)': store.sample(321, decayed=False, n=5),
+        'Kaon (decayed)': store.sample(321, decayed=True, n=5),
     }
     
     for idx, (title, event_data) in enumerate(events.items()):
         ax = fig.add_subplot(2, 2, idx+1, projection='3d')
         
         # Draw simplified detector
-        draw_3d_box(ax, (0, 0, 0.5), (0.3, 0.3, 0.05), 'lightgray', 0.2)
-        draw_3d_box(ax, (0, 0, 1.0), (0.3, 0.3, 1.0), 'lightblue', 0.1)
-        draw_3d_box(ax, (0, 0, 15.5), (0.3, 0.3, 1.0), 'lightblue', 0.1)
+        draw_detector(ax, 15, names=('SC1', 'RICH1', 'SC2', 'RICH2'), labels=None,
+                      styles={'scint': ('lightgray', 0.2), 'rich': ('lightblue', 0.1)})
+        
+        # Draw tracks (decays end at the vertex)
+        tracks = track_polylines(event_data, z_end=16, z_min=0, z_max=16, stop_at_decay=True)
+        decays = decayed(event_data)
+        draw_tracks(ax, tracks[decays], color='orange', linewidth=2, alpha=0.8)
+        draw_tracks(ax, tracks[~decays], color='green', linewidth=1.5, alpha=0.8)
         
-        # Draw tracks
-        for _, event in event_data.iterrows():
-            z_start = event['PrimaryPosZ'] / 100
-            x_start = event['PrimaryPosX'] / 100
-            y_start = event['PrimaryPosY'] / 100
-            
-            if event['Decayed'] == 1 and event['DecayPosZ'] > 0:
-                z_end = event['DecayPosZ'] / 100
-                z_track = np.linspace(max(z_start, 0), min(z_end, 16), 50)
-                color = 'orange'
-                linewidth = 2
-            else:
-                z_end = 16
-                z_track = np.linspace(max(z_start, 0), z_end, 50)
-                color = 'green'
-                linewidth = 1.5
-            
-            x_track = x_start * np.ones_like(z_track)
-            y_track = y_start * np.ones_like(z_track)
-            
-            ax.plot(x_track, y_track, z_track, color=color, linewidth=linewidth, alpha=0.8)
-            
-            # Mark decay point
-            if event['Decayed'] == 1:
-                ax.scatter([0], [0], [z_end], c='red', marker='*', s=200, edgecolors='black')
+        # Mark decay points
+        dz = decay_z(event_data)[decays]
+        ax.scatter(np.zeros_like(dz), np.zeros_like(dz), dz, c='red', marker='*', s=200, edgecolors='black')
         
         ax.set_xlabel('X (m)')
         ax.set_ylabel('Y (m)')
@@ -161,7 +102,7 @@ def fig2_event_display_3d(df):
         ax.set_title(title)
         ax.set_xlim([-0.15, 0.15])
         ax.set_ylim([-0.15, 0.15])
-        ax.set_zlim([0, 16])
+        ax.set_zlim([0, 17])
         ax.view_init(elev=15, azim=60)
         ax.grid(True, alpha=0.3)
     
@@ -179,13 +120,7 @@ def fig3_detector_cross_section(df):
     
     # XZ plane
     ax1 = axes[0, 0]
-    ax1.add_patch(mpatches.Rectangle((-0.05, 0.49), 0.1, 0.01, fc='lime', ec='black', alpha=0.8))
-    ax1.add_patch(mpatches.Rectangle((-0.15, 0.5), 0.3, 1.0, fc='lightblue', ec='black', alpha=0.3))
-    ax1.add_patch(mpatches.Rectangle((-0.15, 1.6), 0.3, 0.2, fc='yellow', ec='black', alpha=0.5))
-    ax1.add_patch(mpatches.Rectangle((-0.05, 15.495), 0.1, 0.01, fc='lime', ec='black', alpha=0.8))
-    ax1.add_patch(mpatches.Rectangle((-0.15, 15.5), 0.3, 1.0, fc='lightblue', ec='black', alpha=0.3))
-    ax1.add_patch(mpatches.Rectangle((-0.15, 16.7), 0.3, 0.2, fc='yellow', ec='black', alpha=0.5))
-    ax1.add_patch(mpatches.Rectangle((-0.15, 17.5), 0.3, 0.14, fc='orange', ec='black', alpha=0.6))
+    draw_cross_section(ax1, 15, axis=0)
     ax1.axvline(0, color='red', linestyle='--', linewidth=2, alpha=0.5, label='Beam axis')
     ax1.set_xlabel('X (m)')
     ax1.set_ylabel('Z (m)')
@@ -197,13 +132,7 @@ def fig3_detector_cross_section(df):
     
     # YZ plane
     ax2 = axes[0, 1]
-    ax2.add_patch(mpatches.Rectangle((-0.05, 0.49), 0.1, 0.01, fc='lime', ec='black', alpha=0.8))
-    ax2.add_patch(mpatches.Rectangle((-0.15, 0.5), 0.3, 1.0, fc='lightblue', ec='black', alpha=0.3))
-    ax2.add_patch(mpatches.Rectangle((-0.15, 1.6), 0.3, 0.2, fc='yellow', ec='black', alpha=0.5))
-    ax2.add_patch(mpatches.Rectangle((-0.05, 15.495), 0.1, 0.01, fc='lime', ec='black', alpha=0.8))
-    ax2.add_patch(mpatches.Rectangle((-0.15, 15.5), 0.3, 1.0, fc='lightblue', ec='black', alpha=0.3))
-    ax2.add_patch(mpatches.Rectangle((-0.15, 16.7), 0.3, 0.2, fc='yellow', ec='black', alpha=0.5))
-    ax2.add_patch(mpatches.Rectangle((-0.15, 17.5), 0.3, 0.14, fc='orange', ec='black', alpha=0.6))
+    draw_cross_section(ax2, 15, axis=1)
     ax2.axvline(0, color='red', linestyle='--', linewidth=2, alpha=0.5)
     ax2.set_xlabel('Y (m)')
     ax2.set_ylabel('Z (m)')
@@ -362,7 +291,7 @@ def fig5_calorimeter_shower(df):
     plt.close()
     print("✓ Saved: G4_05_calorimeter_shower.png")
 
-def fig6_trajectory_comparison(df):
+def fig6_trajectory_comparison(store):
     """Side-by-side trajectory comparison"""
     print("[G4-06] Trajectory comparison...")
     
@@ -374,20 +303,16 @@ def fig6_trajectory_comparison(df):
     for idx, (pdg, name, color) in enumerate(species):
         ax = fig.add_subplot(1, 3, idx+1, projection='3d')
         
-        data = df[df['PrimaryPDG'] == pdg].head(20)
+        data = store.sample(pdg, n=TRACKS_PER_PANEL)
+        
+        tracks = track_polylines(data, z_end=16, z_min=0)
+        survived = data['Survived'].to_numpy() == 1
+        draw_tracks(ax, tracks[survived], color=color, linewidth=1, alpha=0.7)
+        draw_tracks(ax, tracks[~survived], color=color, linewidth=1, alpha=0.3)
         
-        for _, event in data.iterrows():
-            z = np.linspace(0, 16, 50)
-            x = event['PrimaryPosX']/100 * np.ones_like(z)
-            y = event['PrimaryPosY']/100 * np.ones_like(z)
-            
-            alpha = 0.7 if event['Survived'] == 1 else 0.3
-            ax.plot(x, y, z, color=color, linewidth=1, alpha=alpha)
-            
-            if event['Decayed'] == 1:
-                dz = event['DecayPosZ'] / 100
-                if 0 < dz < 16:
-                    ax.scatter([x[0]], [y[0]], [dz], c='black', marker='x', s=50)
+        dz = decay_z(data)
+        marked = (dz > 0) & (dz < 16)
+        ax.scatter(tracks[marked, 0, 0], tracks[marked, 0, 1], dz[marked], c='black', marker='x', s=50)
         
         ax.set_xlabel('X (m)')
         ax.set_ylabel('Y (m)')
@@ -411,21 +336,18 @@ def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     # Load data
-    df = pd.concat([
-        pd.read_csv(f'../output/TimeDilation_Run{i}.csv') 
-        for i in range(4) 
-        if os.path.exists(f'../output/TimeDilation_Run{i}.csv')
-    ])
+    df = load_dataset()
+    store = load_event_store()
     
     print(f"\nLoaded {len(df)} total events")
     
     # Generate all figures
     fig1_detector_layout_all_configs()
-    fig2_event_display_3d(df)
+    fig2_event_display_3d(store)
     fig3_detector_cross_section(df)
     fig4_rich_cherenkov_pattern(df)
     fig5_calorimeter_shower(df)
-    fig6_trajectory_comparison(df)
+    fig6_trajectory_comparison(store)
     
     print("\n" + "="*60)
     print(f"ALL GEANT4 VISUALIZATION FIGURES GENERATED!")
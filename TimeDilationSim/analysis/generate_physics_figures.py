@@ -9,15 +9,14 @@ import matplotlib.pyplot as plt
 from scipy.stats import norm
 import os
 
+from dataset import load_dataset
+from kinematics import (C_LIGHT, KAON_LIFETIME, KAON_MASS, MUON_MASS, PION_LIFETIME, PION_MASS,
+                        beta_from_momentum, decay_length, lorentz_gamma)
+
 OUTPUT_DIR = '../geant4-result/figures/python-analysis'
 
 def load_all_data(output_dir='../output'):
-    dfs = []
-    for i in range(4):
-        csv_path = os.path.join(output_dir, f'TimeDilation_Run{i}.csv')
-        if os.path.exists(csv_path):
-            dfs.append(pd.read_csv(csv_path))
-    return pd.concat(dfs, ignore_index=True) if dfs else None
+    return load_dataset(output_dir)
 
 def fig10_lorentz_gamma(df):
     """Lorentz factor visualization"""
@@ -26,11 +25,11 @@ def fig10_lorentz_gamma(df):
     fig, axes = plt.subplots(1, 2, figsize=(12, 5))
     
     # Theoretical γ values
-    masses = {'π⁺': 139.57, 'K⁺': 493.68, 'μ⁺': 105.66}  # MeV
-    p = 8000  # MeV/c
+    masses = {'π⁺': PION_MASS, 'K⁺': KAON_MASS, 'μ⁺': MUON_MASS}  # GeV
+    p = 8.0  # GeV/c
     
-    gammas = {name: np.sqrt(1 + (p/m)**2) for name, m in masses.items()}
-    betas = {name: np.sqrt(1 - 1/g**2) for name, g in gammas.items()}
+    gammas = {name: lorentz_gamma(p, m) for name, m in masses.items()}
+    betas = {name: beta_from_momentum(p, m) for name, m in masses.items()}
     
     # Bar plot of γ
     ax1 = axes[0]
@@ -82,18 +81,17 @@ def fig11_time_dilation_proof(df):
     fig = plt.figure(figsize=(14, 10))
     
     # Constants
-    c = 299792458  # m/s
-    tau_pi = 26.033e-9  # s
-    tau_K = 12.38e-9  # s
-    m_pi, m_K = 139.57, 493.68  # MeV
-    p = 8000  # MeV/c
+    c = C_LIGHT  # m/s
+    tau_pi = PION_LIFETIME  # s
+    tau_K = KAON_LIFETIME  # s
+    p = 8.0  # GeV/c
     
-    gamma_pi = np.sqrt(1 + (p/m_pi)**2)
-    gamma_K = np.sqrt(1 + (p/m_K)**2)
+    gamma_pi = lorentz_gamma(p, PION_MASS)
+    gamma_K = lorentz_gamma(p, KAON_MASS)
     
     # Lab frame decay lengths
-    lambda_pi = gamma_pi * c * tau_pi  # ~447 m
-    lambda_K = gamma_K * c * tau_K  # ~60 m
+    lambda_pi = decay_length(p, PION_MASS, tau_pi)  # ~447 m
+    lambda_K = decay_length(p, KAON_MASS, tau_K)  # ~60 m
     
     # Main plot: Survival curves
     ax1 = fig.add_subplot(221)
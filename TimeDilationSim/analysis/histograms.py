@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+histograms.py
+Pre-binned histograms of the dataset, filled once and plotted from disk
+
+Every histogram in HISTOGRAM_SPECS is filled for each species in SPECIES
+and for all events together, from one pass over the cached dataset
+(np.bincount over a combined species × bin key, in blocks). The binning
+is fixed before filling: a physical range per column split into many fine
+bins (or unit-width bins for integer counts), so partial histograms from
+any row range merge by adding counts, and the fill can be spread over a
+process pool. The ranges do not depend on the data, so sentinel values
+(RICH1_Beta = 0 for an event without a RICH hit) cannot stretch the
+binning; values outside the range are counted as overflow and left out
+of the counts and moments.
+
+The result is stored as histograms_<spec hash>.npz inside the dataset
+snapshot directory, so it is rebuilt exactly when the data or the specs
+change. Figures re-bin the fine histograms for display; drawing costs the
+same however many events were filled.
+
+Usage:
+  from histograms import load_histograms
+  hists = load_histograms()
+  hists['beta', 211].display(50).plot(ax, color='red', alpha=0.5)
+  hists['beam_xy', 321].hist2d(ax, cmap='Blues')
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import dataset
+from kinematics import SPECIES
+
+# Unit-width bins for integer-valued columns
+INTEGER = 'integer'
+
+# name: one (column, low, high, bins) per axis; bins is the number of fine
+# bins over [low, high], or INTEGER for unit bins centred on low..high
+HISTOGRAM_SPECS = {
+    'beta': [('RICH1_Beta', 0.99, 1.01, 2000)],
+    'eop': [('Calo_EoP', -1.0, 2.0, 30000)],
+    'calo_e': [('Calo_TotalE', 0.0, 10.0, 10000)],   # GeV
+    'tof': [('TOF', 0.0, 100.0, 10000)],              # ns
+    'rich1_npe': [('RICH1_NPE', 0, 1000, INTEGER)],
+    'rich2_npe': [('RICH2_NPE', 0, 1000, INTEGER)],
+    'beam_xy': [('PrimaryPosX', -10.0, 10.0, 1000), ('PrimaryPosY', -10.0, 10.0, 1000)],  # cm
+}
+
+# Rows per bincount pass
+BLOCK_SIZE = 1 << 22
+
+SPECIES_CODES = tuple(SPECIES)
+
+class Histogram:
+    """Counts on fixed bin edges (1D or 2D) plus exact moments of the filled values
+
+    entries, sums and sums2 are the number of filled values and the sum
+    and sum of squares of each coordinate, so mean() and std() are those
+    of the raw values, not of the bin centres. overflow counts the values
+    that fell outside the edges (on either side of any axis); they are not
+    part of counts, entries or the moments.
+    """
+
+    def __init__(self, edges, counts=None, entries=0, sums=None, sums2=None, overflow=0):
+        self.edges = [np.asarray(e, dtype=float) for e in edges]
+        shape = tuple(len(e) - 1 for e in self.edges)
+        self.counts = np.zeros(shape, dtype=np.int64) if counts is None else np.asarray(counts)
+        self.entries = int(entries)
+        self.sums = np.zeros(self.ndim) if sums is None else np.asarray(sums, dtype=float)
+        self.sums2 = np.zeros(self.ndim) if sums2 is None else np.asarray(sums2, dtype=float)
+        self.overflow = int(overflow)
+
+    @property
+    def ndim(self):
+        return len(self.edges)
+
+    def centers(self, axis=0):
+        edges = self.edges[axis]
+        return (edges[:-1] + edges[1:]) / 2
+
+    def __len__(self):
+        return self.entries
+
+    def __iadd__(self, other):
+        if any(a.shape != b.shape or not np.array_equal(a, b)
+               for a, b in zip(self.edges, other.edges)):
+            raise ValueError("Cannot merge histograms with different binning")
+        self.counts = self.counts + other.counts
+        self.entries += other.entries
+        self.sums = self.sums + other.sums
+        self.sums2 = self.sums2 + other.sums2
+        self.overflow += other.overflow
+        return self
+
+    def fill(self, *values):
+        """Add values (one array per axis); NaN is skipped, out-of-range values go to overflow"""
+        values = [np.asarray(v, dtype=float) for v in values]
+        finite = np.ones(len(values[0]), dtype=bool)
+        valid = np.ones(len(values[0]), dtype=bool)
+        for v, edges in zip(values, self.edges):
+            finite &= np.isfinite(v)
+            valid &= (v >= edges[0]) & (v <= edges[-1])
+        self.overflow += int((finite & ~valid).sum())
+        values = [v[valid] for v in values]
+        key = _cell_index(values, self.edges)
+        self.counts = self.counts + np.bincount(key, minlength=self.counts.size).reshape(self.counts.shape)
+        self.entries += int(valid.sum())
+        self.sums = self.sums + [v.sum() for v in values]
+        self.sums2 = self.sums2 + [(v**2).sum() for v in values]
+        return self
+
+    def mean(self, axis=0):
+        return self.sums[axis] / self.entries if self.entries else np.nan
+
+    def std(self, axis=0):
+        """Population standard deviation (like pandas .std() for large N)"""
+        if self.entries == 0:
+            return np.nan
+        mean = self.mean(axis)
+        return np.sqrt(max(self.sums2[axis] / self.entries - mean**2, 0.0))
+
+    def _with_counts(self, edges, counts):
+        """New histogram on a subset of the bins; moments from bin centres if entries were dropped
+
+        Dropped entries are added to the overflow.
+        """
+        dropped = int(self.counts.sum() - counts.sum())
+        if dropped == 0:
+            return Histogram(edges, counts, self.entries, self.sums, self.sums2, self.overflow)
+        sub = Histogram(edges, counts, counts.sum(), overflow=self.overflow + dropped)
+        for axis in range(self.ndim):
+            other = tuple(a for a in range(self.ndim) if a != axis)
+            projection = counts.sum(axis=other) if other else counts
+            centres = sub.centers(axis)
+            sub.sums[axis] = (projection * centres).sum()
+            sub.sums2[axis] = (projection * centres**2).sum()
+        return sub
+
+    def restrict(self, low=None, high=None, axis=0):
+        """Only the bins lying entirely within [low, high] on one axis"""
+        edges = self.edges[axis]
+        keep = np.ones(len(edges) - 1, dtype=bool)
+        if low is not None:
+            keep &= edges[:-1] >= low
+        if high is not None:
+            keep &= edges[1:] <= high
+        index = np.flatnonzero(keep)
+        if len(index) == 0:
+            index = np.array([0])
+            counts = np.zeros_like(np.take(self.counts, index, axis=axis))
+        else:
+            counts = np.take(self.counts, index, axis=axis)
+        new_edges = list(self.edges)
+        new_edges[axis] = edges[index[0]:index[-1] + 2]
+        return self._with_counts(new_edges, counts)
+
+    def crop(self):
+        """Drop empty bins at both ends of every axis"""
+        hist = self
+        for axis in range(self.ndim):
+            other = tuple(a for a in range(self.ndim) if a != axis)
+            projection = hist.counts.sum(axis=other) if other else hist.counts
+            occupied = np.flatnonzero(projection)
+            if len(occupied) == 0:
+                continue
+            edges = hist.edges[axis]
+            hist = hist.restrict(edges[occupied[0]], edges[occupied[-1] + 1], axis)
+        return hist
+
+    def rebin(self, n_bins):
+        """Merge neighbouring bins so that at most about n_bins remain per axis"""
+        edges = list(self.edges)
+        counts = self.counts
+        for axis in range(self.ndim):
+            n_fine = counts.shape[axis]
+            group = max(int(np.ceil(n_fine / n_bins)), 1)
+            if group == 1:
+                continue
+            n_coarse = int(np.ceil(n_fine / group))
+            pad = n_coarse * group - n_fine
+            if pad:
+                # Extend the last bin with empty bins of the same width
+                width = edges[axis][-1] - edges[axis][-2]
+                edges[axis] = np.append(edges[axis], edges[axis][-1] + width * np.arange(1, pad + 1))
+                widths = [(0, 0)] * counts.ndim
+                widths[axis] = (0, pad)
+                counts = np.pad(counts, widths)
+            shape = counts.shape[:axis] + (n_coarse, group) + counts.shape[axis + 1:]
+            counts = counts.reshape(shape).sum(axis=axis + 1)
+            edges[axis] = edges[axis][::group]
+        return Histogram(edges, counts, self.entries, self.sums, self.sums2, self.overflow)
+
+    def regroup(self, *edges):
+        """Histogram on new edges (one array per axis), each fine bin going where its centre falls
+
+        Exact for unit-width integer bins; otherwise each value may move by
+        up to one fine bin. Fine bins outside the new edges are dropped.
+        """
+        counts = self.counts
+        for axis, new_edges in enumerate(edges):
+            new_edges = np.asarray(new_edges, dtype=float)
+            index = np.searchsorted(new_edges, self.centers(axis), side='right') - 1
+            inside = (index >= 0) & (index < len(new_edges) - 1)
+            counts = np.moveaxis(counts, axis, 0)[inside]
+            grouped = np.zeros((len(new_edges) - 1,) + counts.shape[1:], dtype=counts.dtype)
+            np.add.at(grouped, index[inside], counts)
+            counts = np.moveaxis(grouped, 0, axis)
+        return self._with_counts([np.asarray(e, dtype=float) for e in edges], counts)
+
+    def display(self, n_bins, low=None, high=None):
+        """Histogram as matplotlib would bin the raw values with bins=n_bins
+
+        Restricted to [low, high] on the first axis, cropped to the filled
+        range and re-binned to about n_bins bins.
+        """
+        hist = self.restrict(low, high) if low is not None or high is not None else self
+        return hist.crop().rebin(n_bins)
+
+    def plot(self, ax, shift=0.0, **kwargs):
+        """Draw a 1D histogram with ax.hist (same styling keywords); shift moves the x axis"""
+        edges = self.edges[0] + shift
+        return ax.hist(self.centers() + shift, bins=edges, weights=self.counts, **kwargs)
+
+    def hist2d(self, ax, **kwargs):
+        """Draw a 2D histogram with ax.hist2d (same styling keywords)"""
+        x, y = np.meshgrid(self.centers(0), self.centers(1), indexing='ij')
+        return ax.hist2d(x.ravel(), y.ravel(), bins=self.edges,
+                         weights=self.counts.ravel(), **kwargs)
+
+def _cell_index(values, edges):
+    """Flat bin index of in-range values (one array per axis) on uniform edges"""
+    key = np.zeros(len(values[0]), dtype=np.intp)
+    for v, e in zip(values, edges):
+        n_bins = len(e) - 1
+        index = ((v - e[0]) * (n_bins / (e[-1] - e[0]))).astype(np.intp)
+        key = key * n_bins + np.clip(index, 0, n_bins - 1)
+    return key
+
+class HistogramSet:
+    """Histograms keyed by (name, pdg); pdg None holds all events"""
+
+    def __init__(self, histograms=None):
+        self.histograms = dict(histograms or {})
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, None)
+        return self.histograms[key]
+
+    def __contains__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, None)
+        return key in self.histograms
+
+    def keys(self):
+        return self.histograms.keys()
+
+    def __iadd__(self, other):
+        for key, hist in other.histograms.items():
+            if key in self.histograms:
+                self.histograms[key] += hist
+            else:
+                self.histograms[key] = hist
+        return self
+
+    def save(self, path):
+        """Write all histograms to one .npz file (atomically)"""
+        path = Path(path)
+        arrays = {}
+        keys = []
+        for i, (key, hist) in enumerate(self.histograms.items()):
+            keys.append(list(key))
+            arrays[f'{i}_counts'] = hist.counts
+            arrays[f'{i}_moments'] = np.concatenate([[hist.entries], hist.sums, hist.sums2,
+                                                     [hist.overflow]])
+            for axis, edges in enumerate(hist.edges):
+                arrays[f'{i}_edges{axis}'] = edges
+        arrays['keys'] = np.array(json.dumps(keys))
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        histograms = {}
+        with np.load(path) as data:
+            for i, key in enumerate(json.loads(str(data['keys']))):
+                counts = data[f'{i}_counts']
+                edges = [data[f'{i}_edges{axis}'] for axis in range(counts.ndim)]
+                moments = data[f'{i}_moments']
+                ndim = counts.ndim
+                histograms[tuple(key)] = Histogram(edges, counts, moments[0], moments[1:1 + ndim],
+                                                   moments[1 + ndim:1 + 2 * ndim], moments[-1])
+        return cls(histograms)
+
+def spec_hash(specs=HISTOGRAM_SPECS):
+    """Short hash of the histogram definitions (names the stored file)"""
+    payload = json.dumps({'specs': specs, 'species': SPECIES_CODES}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+def _axis_edges(low, high, bins):
+    """Bin edges of one axis of a spec"""
+    if bins == INTEGER:
+        return np.arange(low, high + 2, dtype=float) - 0.5
+    return np.linspace(low, high, bins + 1)
+
+def histogram_binning(arrays, specs=HISTOGRAM_SPECS):
+    """{name: [edges per axis]} for the specs whose columns are all in arrays"""
+    binning = {}
+    for name, axes in specs.items():
+        if all(column in arrays for column, *_ in axes):
+            binning[name] = [_axis_edges(low, high, bins) for _, low, high, bins in axes]
+    return binning
+
+def fill_histograms(arrays, binning, start=0, stop=None, specs=HISTOGRAM_SPECS):
+    """HistogramSet of rows [start, stop) of {column: array}, on fixed binning"""
+    n_rows = len(arrays['PrimaryPDG'])
+    stop = n_rows if stop is None else min(stop, n_rows)
+    n_slots = len(SPECIES_CODES) + 1        # last slot: any other PDG
+
+    # Per-species partial sums, filled block by block
+    parts = {}
+    for name, edges in binning.items():
+        n_cells = int(np.prod([len(e) - 1 for e in edges]))
+        parts[name] = {
+            'counts': np.zeros(n_slots * n_cells, dtype=np.int64),
+            'entries': np.zeros(n_slots, dtype=np.int64),
+            'sums': np.zeros((len(edges), n_slots)),
+            'sums2': np.zeros((len(edges), n_slots)),
+            'overflow': np.zeros(n_slots, dtype=np.int64),
+        }
+
+    for block_start in range(start, stop, BLOCK_SIZE):
+        block = slice(block_start, min(block_start + BLOCK_SIZE, stop))
+        pdg = np.asarray(arrays['PrimaryPDG'][block])
+        slot = np.full(len(pdg), n_slots - 1, dtype=np.intp)
+        for i, code in enumerate(SPECIES_CODES):
+            slot[pdg == code] = i
+
+        for name, edges in binning.items():
+            part = parts[name]
+            values = [np.asarray(arrays[column][block], dtype=float) for column, *_ in specs[name]]
+            finite = np.ones(len(pdg), dtype=bool)
+            valid = np.ones(len(pdg), dtype=bool)
+            for v, e in zip(values, edges):
+                finite &= np.isfinite(v)
+                valid &= (v >= e[0]) & (v <= e[-1])
+            part['overflow'] += np.bincount(slot[finite & ~valid], minlength=n_slots)
+            if not valid.all():
+                values = [v[valid] for v in values]
+            block_slot = slot[valid] if not valid.all() else slot
+
+            n_cells = len(part['counts']) // n_slots
+            key = block_slot * n_cells + _cell_index(values, edges)
+            part['counts'] += np.bincount(key, minlength=len(part['counts']))
+            part['entries'] += np.bincount(block_slot, minlength=n_slots)
+            for axis, v in enumerate(values):
+                part['sums'][axis] += np.bincount(block_slot, v, minlength=n_slots)
+                part['sums2'][axis] += np.bincount(block_slot, v * v, minlength=n_slots)
+
+    histograms = {}
+    for name, edges in binning.items():
+        part = parts[name]
+        shape = (n_slots,) + tuple(len(e) - 1 for e in edges)
+        counts = part['counts'].reshape(shape)
+        for i, code in enumerate(SPECIES_CODES):
+            histograms[name, code] = Histogram(edges, counts[i], part['entries'][i],
+                                               part['sums'][:, i], part['sums2'][:, i],
+                                               part['overflow'][i])
+        histograms[name, None] = Histogram(edges, counts.sum(axis=0), part['entries'].sum(),
+                                           part['sums'].sum(axis=1), part['sums2'].sum(axis=1),
+                                           part['overflow'].sum())
+    return HistogramSet(histograms)
+
+def _fill_rows(unit):
+    """Worker: fill the histograms of one row range of a snapshot"""
+    snapshot, binning, start, stop = unit
+    return fill_histograms(dataset.open_snapshot(snapshot), binning, start, stop)
+
+def build_histograms(snapshot, n_workers=None, rows_per_unit=BLOCK_SIZE * 4):
+    """Fill every histogram of a snapshot, over row ranges on a process pool"""
+    arrays = dataset.open_snapshot(snapshot)
+    binning = histogram_binning(arrays)
+    n_rows = len(arrays['PrimaryPDG'])
+    units = [(snapshot, binning, start, start + rows_per_unit)
+             for start in range(0, max(n_rows, 1), rows_per_unit)]
+
+    if n_workers and n_workers > 1 and len(units) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parts = list(executor.map(_fill_rows, units))
+    else:
+        parts = [_fill_rows(unit) for unit in units]
+
+    histograms = parts[0]
+    for part in parts[1:]:
+        histograms += part
+    return histograms
+
+def histograms_path(snapshot):
+    return Path(snapshot) / f'histograms_{spec_hash()}.npz'
+
+def load_histograms(data_dir='../output', run_ids=range(4), n_workers=None):
+    """HistogramSet of the combined runs, built and stored on first use, or None"""
+    snapshot = dataset.snapshot_path(data_dir, run_ids)
+    if snapshot is None:
+        return None
+    path = histograms_path(snapshot)
+    if not path.exists():
+        print("Filling histograms...")
+        build_histograms(snapshot, n_workers).save(path)
+    return HistogramSet.load(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the pre-binned histograms of the dataset")
+    parser.add_argument('--input-dir', default='../output', help='Directory with run files')
+    parser.add_argument('--runs', nargs='+', type=int, default=[0, 1, 2, 3],
+                        help='Run numbers to include')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Fill row ranges on this many processes')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    hists = load_histograms(args.input_dir, args.runs, args.workers)
+    if hists is None:
+        print(f"ERROR: No run files in {args.input_dir}")
+        return
+    snapshot = dataset.snapshot_path(args.input_dir, args.runs)
+    print(f"✓ {histograms_path(snapshot)}: {len(hists.keys())} histograms "
+          f"({time.perf_counter() - start:.2f} s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+kinematics.py
+Species constants and Lorentz kinematics shared by the simulation and the
+analysis scripts
+
+Masses and lifetimes are the PDG values; every script takes them from
+SPECIES (or the PION_*/KAON_*/MUON_* names) instead of its own copy.
+
+lorentz_gamma, beta_from_momentum and decay_length are the exact formulas
+and take whole arrays. They are not tabulated: one vectorized sqrt over
+5M momenta takes ~0.06 s, a table gather with linear interpolation ~0.2 s.
+
+Usage:
+  from kinematics import KAON_LIFETIME, KAON_MASS, decay_length
+  lam = decay_length(df['PrimaryMom'].to_numpy(), KAON_MASS, KAON_LIFETIME)   # m
+"""
+
+import numpy as np
+
+# PDG codes
+PDG_PION = 211
+PDG_KAON = 321
+PDG_MUON = -13
+
+# Physical constants (PDG)
+C_LIGHT = 299792458  # m/s
+PION_MASS = 0.13957  # GeV
+KAON_MASS = 0.49368  # GeV
+MUON_MASS = 0.10566  # GeV
+PION_LIFETIME = 26.033e-9  # s
+KAON_LIFETIME = 12.380e-9  # s
+MUON_LIFETIME = 2196.98e-9  # s
+
+# {pdg: (name, mass [GeV], lifetime [s])}
+SPECIES = {
+    PDG_PION: ('pion', PION_MASS, PION_LIFETIME),
+    PDG_KAON: ('kaon', KAON_MASS, KAON_LIFETIME),
+    PDG_MUON: ('muon', MUON_MASS, MUON_LIFETIME),
+}
+
+def lorentz_gamma(momentum, mass):
+    """Calculate Lorentz γ factor"""
+    energy = np.sqrt(momentum**2 + mass**2)
+    return energy / mass
+
+def beta_from_momentum(momentum, mass):
+    """Calculate velocity β = v/c"""
+    energy = np.sqrt(momentum**2 + mass**2)
+    return momentum / energy
+
+def decay_length(momentum, mass, lifetime):
+    """Calculate characteristic decay length λ = βcγτ₀ = (p/m)cτ₀ in m"""
+    return momentum / mass * C_LIGHT * lifetime
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+lifetime_fit.py
+Maximum-likelihood decay-length fits to decay vertices
+
+Every event is either a decay at flight distance d (density e^{-d/λ}/λ) or
+a survivor that reached station 2 at flight distance L without decaying
+(probability e^{-L/λ}). For that censored exponential the unbinned
+likelihood peaks at λ = (total flight of all events) / N_decayed, so the
+fit is a couple of sums per species, computed together for all species
+with np.bincount. Dividing each event's flight by its βγ = p/m gives the
+proper-time flight and the same fit yields cτ₀.
+
+fit_binned() fits histograms of decay vertices (one row per species)
+with the multinomial likelihood, by Newton iteration on θ = 1/λ with
+analytic first and second derivatives.
+
+Errors are likelihood-ratio intervals (2ΔlnL = 1). λ is the only free
+parameter, so the profile likelihood is the likelihood itself; the
+intervals are asymmetric for small samples, unlike the curve_fit errors
+on four survival fractions.
+
+Usage:
+  from lifetime_fit import fit_lifetime
+  fits = fit_lifetime(df)        # one row per species: λ, τ₀, γ with errors
+"""
+
+import numpy as np
+import pandas as pd
+
+from detector_geometry import RUN_STATION2_DISTANCES, event_station2_distance
+from kinematics import C_LIGHT, SPECIES, beta_from_momentum
+
+# Station 2 position (m) of each run number, for runs that do not record it
+STATION_POSITIONS_M = RUN_STATION2_DISTANCES
+
+# 2ΔlnL at the interval ends (1σ)
+DELTA_CHI2 = 1.0
+
+NEWTON_ITERATIONS = 50
+
+def observed_flight(data, station_positions=STATION_POSITIONS_M):
+    """Observed flight distance of every event in m
+
+    Decays count up to their vertex (DecayPosZ), survivors up to the
+    station 2 position, both from the production point (PrimaryPosZ).
+    The position is the one recorded with the event (Station2PosZ, written
+    by simulate_physics.py) or else its run's entry in station_positions
+    (run number -> m); a run with neither raises ValueError.
+    """
+    start = np.asarray(data['PrimaryPosZ'], dtype=float) / 100
+    survived = np.asarray(data['Survived']).astype(bool)
+    station = event_station2_distance(data, station_positions)
+    end = np.where(survived, station, np.asarray(data['DecayPosZ'], dtype=float) / 100)
+    return end - start
+
+def _newton_interval(h, dh, x_hat, step, lower_bound=0.0):
+    """Lower and upper roots of a convex h with h(x_hat) < 0, elementwise
+
+    Newton steps from x_hat ∓ step. On a convex function the first step
+    lands outside the root and later steps approach it monotonically.
+    """
+    bounds = []
+    for sign in (-1, 1):
+        x = x_hat + sign * step
+        x = np.where(x > lower_bound, x, (x_hat + lower_bound) / 2)
+        for _ in range(NEWTON_ITERATIONS):
+            slope = dh(x)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                x_new = np.where(slope != 0, x - h(x) / slope, x)
+            # Stay inside the domain (halve the distance to the bound instead)
+            x_new = np.where(x_new > lower_bound, x_new, (x + lower_bound) / 2)
+            if np.allclose(x_new, x, rtol=1e-12, atol=0, equal_nan=True):
+                x = x_new
+                break
+            x = x_new
+        bounds.append(x)
+    return bounds
+
+def exponential_interval(n_decayed):
+    """Likelihood-ratio interval of a censored exponential, as ratios to the MLE
+
+    With u = θ/θ̂, 2ΔlnL = 2N(u - 1 - ln u) depends on N_decayed only.
+    Returns (u_low, u_high); the λ interval is (λ̂/u_high, λ̂/u_low).
+    """
+    n = np.asarray(n_decayed, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u_low, u_high = _newton_interval(
+            lambda u: 2 * n * (u - 1 - np.log(u)) - DELTA_CHI2,
+            lambda u: 2 * n * (1 - 1 / u),
+            np.ones_like(n), 1 / np.sqrt(n))
+    return np.where(n > 0, u_low, np.nan), np.where(n > 0, u_high, np.nan)
+
+def _fit_columns(name, estimate, u_low, u_high, scale=1.0):
+    """{name, name_err_low, name_err_high} columns from an MLE and its u interval"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = estimate * scale
+        return {
+            name: value,
+            f'{name}_err_low': value - value / u_high,
+            f'{name}_err_high': value / u_low - value,
+        }
+
+def fit_lifetime(data, species=(211, 321), station_positions=STATION_POSITIONS_M):
+    """Unbinned decay-length fit per species from a DataFrame or dict of arrays
+
+    Needs RunNumber, PrimaryPDG, PrimaryMom, PrimaryPosZ, Survived and
+    DecayPosZ (sampled decays; events of a weighted simulation never decay).
+    Columns of the result: PrimaryPDG, N_total, N_decayed, lambda_m, tau0_ns
+    and gamma, each with _err_low/_err_high. τ₀ uses each event's momentum;
+    γ = λ / (β c τ₀_PDG) at the mean momentum of the species.
+    """
+    pdg = np.asarray(data['PrimaryPDG'])
+    momentum = np.asarray(data['PrimaryMom'], dtype=float)
+    decayed = np.asarray(data['Survived']) == 0
+    flight = observed_flight(data, station_positions)
+
+    # Species index of every event; other species go to a last, dropped bin
+    species = list(species)
+    n_species = len(species)
+    index = np.full(len(pdg), n_species, dtype=np.intp)
+    for i, code in enumerate(species):
+        index[pdg == code] = i
+    mass = np.array([SPECIES[code][1] for code in species])
+
+    def sums(weights=None):
+        return np.bincount(index, weights, minlength=n_species + 1)[:n_species]
+
+    n_total = sums().astype(np.int64)
+    n_decayed = sums(decayed).astype(np.int64)
+    total_flight = sums(flight)
+    # Proper-time flight c·t = d / (βγ) = d m / p
+    total_proper = sums(flight * np.append(mass, np.nan)[index] / momentum)
+    mean_momentum = sums(momentum)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lambda_hat = total_flight / n_decayed
+        ctau_hat = total_proper / n_decayed
+        mean_momentum = mean_momentum / n_total
+    u_low, u_high = exponential_interval(n_decayed)
+
+    tau_pdg = np.array([SPECIES[code][2] for code in species])
+    beta = beta_from_momentum(mean_momentum, mass)
+
+    result = pd.DataFrame({'PrimaryPDG': species, 'N_total': n_total, 'N_decayed': n_decayed})
+    for columns in (_fit_columns('lambda_m', lambda_hat, u_low, u_high),
+                    _fit_columns('tau0_ns', ctau_hat, u_low, u_high, 1e9 / C_LIGHT),
+                    _fit_columns('gamma', lambda_hat, u_low, u_high, 1 / (beta * C_LIGHT * tau_pdg))):
+        for name, values in columns.items():
+            result[name] = values
+    return result
+
+def _binned_terms(theta, counts, n_survived, edges):
+    """Multinomial log-likelihood in θ = 1/λ and its first two derivatives
+
+    counts: (S, K) decays per bin, n_survived: (S,) events past edges[-1],
+    edges: (K+1,). Probabilities are conditional on reaching edges[0].
+    """
+    theta = theta[:, None]
+    E = np.exp(-theta * edges)                               # (S, K+1)
+    p = E[:, :-1] - E[:, 1:]
+    dp = edges[1:] * E[:, 1:] - edges[:-1] * E[:, :-1]
+    d2p = edges[:-1]**2 * E[:, :-1] - edges[1:]**2 * E[:, 1:]
+    n_all = counts.sum(axis=1) + n_survived
+
+    occupied = counts > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_p = np.where(occupied, np.log(p), 0.0)
+        r1 = np.where(occupied, dp / p, 0.0)
+        r2 = np.where(occupied, d2p / p, 0.0)
+    theta = theta[:, 0]
+    loglik = ((counts * log_p).sum(axis=1) - n_survived * theta * edges[-1]
+              + n_all * theta * edges[0])
+    d1 = (counts * r1).sum(axis=1) - n_survived * edges[-1] + n_all * edges[0]
+    d2 = (counts * (r2 - r1**2)).sum(axis=1)
+    return loglik, d1, d2
+
+def fit_binned(counts, edges, n_survived, species=None):
+    """Binned decay-length fit of decay-vertex histograms
+
+    counts is (S, K) or (K,): decays per flight-distance bin (m) with
+    bin edges `edges`; n_survived (S,) counts events that passed edges[-1]
+    without decaying. Returns one row per histogram with N_decayed,
+    lambda_m, lambda_m_err_low and lambda_m_err_high.
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=float))
+    edges = np.asarray(edges, dtype=float)
+    n_survived = np.atleast_1d(np.asarray(n_survived, dtype=float))
+    n_decayed = counts.sum(axis=1)
+
+    # Start from the unbinned estimate with decays at bin centres
+    centres = (edges[:-1] + edges[1:]) / 2
+    flight = counts @ (centres - edges[0]) + n_survived * (edges[-1] - edges[0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        theta = np.where(n_decayed > 0, n_decayed / flight, np.nan)
+
+    for _ in range(NEWTON_ITERATIONS):
+        _, d1, d2 = _binned_terms(theta, counts, n_survived, edges)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            theta_new = theta - d1 / d2
+        # The log-likelihood is concave in θ; keep θ positive on overshoot
+        theta_new = np.where(theta_new > 0, theta_new, theta / 2)
+        if np.allclose(theta_new, theta, rtol=1e-12, atol=0, equal_nan=True):
+            theta = theta_new
+            break
+        theta = theta_new
+
+    loglik_max, _, d2 = _binned_terms(theta, counts, n_survived, edges)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        theta_low, theta_high = _newton_interval(
+            lambda t: 2 * (loglik_max - _binned_terms(t, counts, n_survived, edges)[0]) - DELTA_CHI2,
+            lambda t: -2 * _binned_terms(t, counts, n_survived, edges)[1],
+            theta, np.sqrt(-1 / d2))
+        lambda_hat = 1 / theta
+    u_low, u_high = theta_low / theta, theta_high / theta
+
+    result = pd.DataFrame({'N_decayed': n_decayed.astype(np.int64)})
+    if species is not None:
+        result.insert(0, 'PrimaryPDG', list(species))
+    for name, values in _fit_columns('lambda_m', lambda_hat, u_low, u_high).items():
+        result[name] = values
+    return result
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+pid.py
+Vectorized particle identification: cut-based classification, confusion
+matrices and β-threshold scans
+
+A cut set is an ordered list of (pdg, {column: (low, high)}) rules. Each
+event gets the PDG of the first rule whose ranges it falls in (low <= x <
+high, None for an open end), or 0 if none match. The scan sorts β once per
+true species and counts events below every threshold with searchsorted,
+so scanning thousands of thresholds over millions of events costs about
+one sort.
+
+Usage:
+  from pid import beta_cuts, classify, confusion_matrix, scan_beta_threshold
+  reco = classify(df, beta_cuts(0.999))
+  matrix = confusion_matrix(df['PrimaryPDG'], reco)
+  scan = scan_beta_threshold(df['RICH1_Beta'], df['PrimaryPDG'], np.linspace(0.99, 1.0, 201))
+"""
+
+import numpy as np
+import pandas as pd
+
+PDG_PION = 211
+PDG_KAON = 321
+PDG_MUON = -13
+UNIDENTIFIED = 0
+
+TRUE_LABELS = (PDG_PION, PDG_KAON, PDG_MUON)
+RECO_LABELS = (PDG_PION, PDG_KAON, PDG_MUON, UNIDENTIFIED)
+
+def beta_cuts(threshold=0.999, column='RICH1_Beta', below=PDG_KAON, above=PDG_PION):
+    """Simplified RICH rule: β < threshold → `below`, otherwise `above`"""
+    return [
+        (below, {column: (None, threshold)}),
+        (above, {}),
+    ]
+
+# ID logic of the analysis scripts: β < 0.999 → K+, else π+
+DEFAULT_CUTS = beta_cuts()
+
+def classify(data, cuts=DEFAULT_CUTS):
+    """Reconstructed PDG of every event in a DataFrame or dict of arrays"""
+    n_events = len(data[next(iter(data.keys()))])
+    reco = np.full(n_events, UNIDENTIFIED, dtype=np.int64)
+    unassigned = np.ones(n_events, dtype=bool)
+
+    for pdg, ranges in cuts:
+        selected = unassigned.copy()
+        for column, (low, high) in ranges.items():
+            values = np.asarray(data[column])
+            if low is not None:
+                selected &= values >= low
+            if high is not None:
+                selected &= values < high
+        reco[selected] = pdg
+        unassigned &= ~selected
+
+    return reco
+
+def confusion_matrix(true_pdg, reco_pdg, true_labels=TRUE_LABELS, reco_labels=RECO_LABELS):
+    """Event counts with rows = true PDG and columns = reconstructed PDG
+
+    Events whose true or reconstructed PDG is not among the labels are
+    left out.
+    """
+    true_pdg = np.asarray(true_pdg)
+    reco_pdg = np.asarray(reco_pdg)
+    true_labels = np.asarray(true_labels)
+    reco_labels = np.asarray(reco_labels)
+
+    true_order = np.argsort(true_labels)
+    reco_order = np.argsort(reco_labels)
+    true_idx = true_order[np.clip(np.searchsorted(true_labels[true_order], true_pdg),
+                                  0, len(true_labels) - 1)]
+    reco_idx = reco_order[np.clip(np.searchsorted(reco_labels[reco_order], reco_pdg),
+                                  0, len(reco_labels) - 1)]
+    known = (true_labels[true_idx] == true_pdg) & (reco_labels[reco_idx] == reco_pdg)
+
+    key = true_idx[known] * len(reco_labels) + reco_idx[known]
+    counts = np.bincount(key, minlength=len(true_labels) * len(reco_labels))
+    return pd.DataFrame(counts.reshape(len(true_labels), len(reco_labels)),
+                        index=pd.Index(true_labels, name='True'),
+                        columns=pd.Index(reco_labels, name='Reco'))
+
+def pid_metrics(matrix):
+    """Efficiency and purity of every species present as both a row and a column"""
+    rows = []
+    for pdg in matrix.index:
+        if pdg not in matrix.columns:
+            continue
+        n_true = matrix.loc[pdg].sum()
+        n_reco = matrix[pdg].sum()
+        n_correct = matrix.loc[pdg, pdg]
+        rows.append({
+            'PDG': pdg,
+            'N_true': n_true,
+            'N_reco': n_reco,
+            'N_correct': n_correct,
+            'Efficiency': n_correct / n_true if n_true > 0 else 0.0,
+            'Purity': n_correct / n_reco if n_reco > 0 else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+def scan_beta_threshold(beta, true_pdg, thresholds, below=PDG_KAON, above=PDG_PION,
+                        true_labels=TRUE_LABELS):
+    """Confusion matrices of the rule β < t → `below`, else `above`, for every t
+
+    Returns a dict with 'thresholds', 'true_labels', 'reco_labels' (=
+    [above, below]), 'counts' of shape (n_thresholds, n_true, 2), and
+    'efficiency' and 'purity' of shape (n_thresholds, 2) for the two
+    reconstructed species.
+    """
+    beta = np.asarray(beta, dtype=float)
+    true_pdg = np.asarray(true_pdg)
+    thresholds = np.asarray(thresholds, dtype=float)
+    true_labels = np.asarray(true_labels)
+
+    counts = np.zeros((len(thresholds), len(true_labels), 2), dtype=np.int64)
+    for i, pdg in enumerate(true_labels):
+        sorted_beta = np.sort(beta[true_pdg == pdg])
+        n_below = np.searchsorted(sorted_beta, thresholds, side='left')
+        counts[:, i, 0] = len(sorted_beta) - n_below
+        counts[:, i, 1] = n_below
+
+    reco_labels = np.array([above, below])
+    n_true = counts.sum(axis=2)
+    n_reco = counts.sum(axis=1)
+    efficiency = np.zeros((len(thresholds), 2))
+    purity = np.zeros((len(thresholds), 2))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for j, pdg in enumerate(reco_labels):
+            row = np.flatnonzero(true_labels == pdg)
+            if len(row) == 0:
+                continue
+            n_correct = counts[:, row[0], j]
+            efficiency[:, j] = np.where(n_true[:, row[0]] > 0, n_correct / n_true[:, row[0]], 0.0)
+            purity[:, j] = np.where(n_reco[:, j] > 0, n_correct / n_reco[:, j], 0.0)
+
+    return {
+        'thresholds': thresholds,
+        'true_labels': true_labels,
+        'reco_labels': reco_labels,
+        'counts': counts,
+        'efficiency': efficiency,
+        'purity': purity,
+    }
+
+def scan_table(scan):
+    """Threshold scan as a DataFrame: one row per threshold"""
+    table = {'Threshold': scan['thresholds']}
+    for j, pdg in enumerate(scan['reco_labels']):
+        table[f'Efficiency_{pdg}'] = scan['efficiency'][:, j]
+        table[f'Purity_{pdg}'] = scan['purity'][:, j]
+    return pd.DataFrame(table)
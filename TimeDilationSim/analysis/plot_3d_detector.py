@@ -8,38 +8,19 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import sys
 import os
 
-def draw_detector_box(ax, position, size, color, alpha, label):
-    """Draw a 3D box representing a detector"""
-    x, y, z = position
-    sx, sy, sz = size
-    
-    # Define vertices
-    vertices = [
-        [x-sx/2, y-sy/2, z-sz/2], [x+sx/2, y-sy/2, z-sz/2],
-        [x+sx/2, y+sy/2, z-sz/2], [x-sx/2, y+sy/2, z-sz/2],
-        [x-sx/2, y-sy/2, z+sz/2], [x+sx/2, y-sy/2, z+sz/2],
-        [x+sx/2, y+sy/2, z+sz/2], [x-sx/2, y+sy/2, z+sz/2]
-    ]
-    
-    # Define faces
-    faces = [
-        [vertices[0], vertices[1], vertices[5], vertices[4]],
-        [vertices[7], vertices[6], vertices[2], vertices[3]],
-        [vertices[0], vertices[3], vertices[7], vertices[4]],
-        [vertices[1], vertices[2], vertices[6], vertices[5]],
-        [vertices[0], vertices[1], vertices[2], vertices[3]],
-        [vertices[4], vertices[5], vertices[6], vertices[7]]
-    ]
-    
-    poly = Poly3DCollection(faces, alpha=alpha, facecolor=color, edgecolor='k', linewidth=0.5)
-    ax.add_collection3d(poly)
-    
-    # Add label
-    ax.text(x, y, z, label, fontsize=8, ha='center')
+from detector_geometry import STATION1_Z, draw_detector
+from run_io import find_run_file, read_table
+
+# Detector colours of this figure (detector_geometry kinds)
+DETECTOR_STYLES = {
+    'scint': ('lime', 0.6),
+    'rich': ('lightblue', 0.3),
+    'dwc': ('yellow', 0.4),
+    'calo': ('orange', 0.5),
+}
 
 def plot_detector_setup():
     """Create 3D visualization of the detector setup"""
@@ -75,39 +56,10 @@ def plot_detector_setup():
 def plot_setup(ax, station2_z=10):
     """Plot a single detector configuration"""
     
-    # Station 1 at z=0.5m
-    station1_z = 0.5
-    
-    # Scintillator 1
-    draw_detector_box(ax, (0, 0, station1_z-0.005), (0.1, 0.1, 0.01), 
-                     'lime', 0.6, 'SC1')
-    
-    # RICH 1
-    draw_detector_box(ax, (0, 0, station1_z+0.5), (0.3, 0.3, 1.0), 
-                     'lightblue', 0.3, 'RICH1')
-    
-    # DWC 1
-    draw_detector_box(ax, (0, 0, station1_z+1.2), (0.3, 0.3, 0.2), 
-                     'yellow', 0.4, 'DWC1')
-    
-    # Station 2
+    # Station 1 at z=0.5m, Station 2 station2_z downstream
+    station1_z = STATION1_Z
     station2_pos = station1_z + station2_z
-    
-    # Scintillator 2
-    draw_detector_box(ax, (0, 0, station2_pos-0.005), (0.1, 0.1, 0.01), 
-                     'lime', 0.6, 'SC2')
-    
-    # RICH 2
-    draw_detector_box(ax, (0, 0, station2_pos+0.5), (0.3, 0.3, 1.0), 
-                     'lightblue', 0.3, 'RICH2')
-    
-    # DWC 2
-    draw_detector_box(ax, (0, 0, station2_pos+1.2), (0.3, 0.3, 0.2), 
-                     'yellow', 0.4, 'DWC2')
-    
-    # Calorimeter
-    draw_detector_box(ax, (0, 0, station2_pos+2.0), (0.3, 0.3, 0.14), 
-                     'orange', 0.5, 'Calo')
+    draw_detector(ax, station2_z, styles=DETECTOR_STYLES, fontsize=8)
     
     # Draw beam line
     z_vals = np.linspace(-0.5, station2_pos+2.5, 100)
@@ -144,7 +96,7 @@ def plot_sample_events(csv_file):
     """Plot sample particle trajectories from simulation data"""
     
     print(f"Loading data from {csv_file}...")
-    df = pd.read_csv(csv_file)
+    df = read_table(csv_file)
     
     fig = plt.figure(figsize=(16, 12))
     
@@ -231,11 +183,11 @@ def main():
     plot_detector_setup()
     
     # Plot sample event trajectories from Run 3 (15m)
-    csv_file = os.path.join(output_dir, 'TimeDilation_Run3.csv')
-    if os.path.exists(csv_file):
-        plot_sample_events(csv_file)
+    run_file = find_run_file(3, output_dir)
+    if run_file is not None:
+        plot_sample_events(run_file)
     else:
-        print(f"Warning: {csv_file} not found, skipping trajectory plots")
+        print(f"Warning: no Run 3 file in {output_dir}, skipping trajectory plots")
     
     print("\n✓ 3D visualization complete!")
 
@@ -2,45 +2,32 @@
 """
 plot_3d_events.py
 Create 3D visualizations of selected particle decay events
+
+Events come from the indexed event store of the run files in
+--input-dir, or from a Geant4 ROOT file (--input) read once in bulk.
 """
 
-import ROOT
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import argparse
+from pathlib import Path
 
-def draw_detector_box(ax, center, size, color, alpha=0.2, label=None):
-    """Draw a translucent box representing detector volume"""
-    x, y, z = center
-    dx, dy, dz = size
-    
-    # Define 8 corners of box
-    corners = np.array([
-        [x-dx/2, y-dy/2, z-dz/2],
-        [x+dx/2, y-dy/2, z-dz/2],
-        [x+dx/2, y+dy/2, z-dz/2],
-        [x-dx/2, y+dy/2, z-dz/2],
-        [x-dx/2, y-dy/2, z+dz/2],
-        [x+dx/2, y-dy/2, z+dz/2],
-        [x+dx/2, y+dy/2, z+dz/2],
-        [x-dx/2, y+dy/2, z+dz/2]
-    ])
-    
-    # Define 6 faces
-    faces = [[corners[j] for j in [0, 1, 2, 3]],  # bottom
-             [corners[j] for j in [4, 5, 6, 7]],  # top
-             [corners[j] for j in [0, 1, 5, 4]],  # front
-             [corners[j] for j in [2, 3, 7, 6]],  # back
-             [corners[j] for j in [1, 2, 6, 5]],  # right
-             [corners[j] for j in [4, 7, 3, 0]]]  # left
-    
-    collection = Poly3DCollection(faces, alpha=alpha, facecolor=color, edgecolor='black', linewidth=0.5)
-    ax.add_collection3d(collection)
-    
-    if label:
-        ax.text(x, y, z, label, fontsize=8)
+from detector_geometry import draw_detector, run_station2_distance
+from event_store import INDEX_COLUMNS, event_store_from_arrays, load_event_store
+from run_io import tag_run
+
+# Columns needed to draw one event
+EVENT_COLUMNS = ['PrimaryPDG', 'PrimaryPosX', 'PrimaryPosY', 'PrimaryPosZ', 'Decayed',
+                  'DecayPosX', 'DecayPosY', 'DecayPosZ', 'DecayProductPDG']
+
+# Detector colours of this display (detector_geometry kinds)
+DETECTOR_STYLES = {
+    'scint': ('green', 0.3),
+    'rich': ('cyan', 0.15),
+    'dwc': ('yellow', 0.2),
+    'calo': ('orange', 0.2),
+}
 
 def visualize_event(event_data, event_id):
     """Create 3D visualization of single event"""
@@ -48,18 +35,10 @@ def visualize_event(event_data, event_id):
     fig = plt.figure(figsize=(14, 10))
     ax = fig.add_subplot(111, projection='3d')
     
-    # Draw detector geometry
-    # Station 1 components (z = 0)
-    draw_detector_box(ax, (0, 0, 0), (10, 10, 1), 'green', alpha=0.3, label='SC1')
-    draw_detector_box(ax, (0, 0, 50), (30, 30, 90), 'cyan', alpha=0.15, label='RICH1')
-    draw_detector_box(ax, (0, 0, 120), (30, 30, 20), 'yellow', alpha=0.2, label='DWC1')
-    
-    # Station 2 components (z = 15 m = 1500 cm)
+    # Draw detector geometry: Station 1 at z = 0, Station 2 (default 15 m = 1500 cm)
     station2_z = event_data.get('station2_pos', 1500)
-    draw_detector_box(ax, (0, 0, station2_z), (10, 10, 1), 'green', alpha=0.3, label='SC2')
-    draw_detector_box(ax, (0, 0, station2_z+50), (30, 30, 90), 'cyan', alpha=0.15, label='RICH2')
-    draw_detector_box(ax, (0, 0, station2_z+120), (30, 30, 20), 'yellow', alpha=0.2, label='DWC2')
-    draw_detector_box(ax, (0, 0, station2_z+200), (30, 30, 14), 'orange', alpha=0.2, label='Calo')
+    draw_detector(ax, station2_z / 100, station1_z=0, units='cm', styles=DETECTOR_STYLES,
+                  fontsize=8)
     
     # Draw beam pipe
     theta = np.linspace(0, 2*np.pi, 50)
@@ -125,22 +104,31 @@ def visualize_event(event_data, event_id):
     plt.tight_layout()
     plt.savefig(f'event_3d_{event_id}.png', dpi=200, bbox_inches='tight')
     print(f"Saved: event_3d_{event_id}.png")
-    plt.show()
+    plt.close()
 
-def load_event_from_root(filename, event_id):
-    """Extract event data from ROOT file"""
-    rootfile = ROOT.TFile.Open(filename)
-    tree = rootfile.Get("TimeDilation")
-    
-    tree.GetEntry(event_id)
+def load_root_store(filename, run):
+    """Event store of one ROOT file, read once with root_io.read_branches
+
+    Geant4 records RunNumber 0 in every file, so the events are filed
+    under `run`, the configuration the file was made with.
+    """
+    from root_io import read_branches
+
+    branches = sorted(set(INDEX_COLUMNS) | set(EVENT_COLUMNS))
+    arrays = tag_run(read_branches(filename, branches), run, filename)
+    return event_store_from_arrays(arrays)
+
+def load_event(store, run, event_id):
+    """Extract event data from the indexed event store"""
+    event = store.event(run, event_id, EVENT_COLUMNS)
     
     event_data = {
-        'pdg': tree.PrimaryPDG,
-        'primary_pos': (tree.PrimaryPosX, tree.PrimaryPosY, tree.PrimaryPosZ),
-        'decayed': bool(tree.Decayed),
-        'decay_pos': (tree.DecayPosX, tree.DecayPosY, tree.DecayPosZ) if tree.Decayed else None,
-        'decay_product_pdg': tree.DecayProductPDG if tree.Decayed else None,
-        'station2_pos': 1500  # Default 15 m, adjust per run
+        'pdg': event['PrimaryPDG'],
+        'primary_pos': (event['PrimaryPosX'], event['PrimaryPosY'], event['PrimaryPosZ']),
+        'decayed': bool(event['Decayed']),
+        'decay_pos': (event['DecayPosX'], event['DecayPosY'], event['DecayPosZ']) if event['Decayed'] else None,
+        'decay_product_pdg': event['DecayProductPDG'] if event['Decayed'] else None,
+        'station2_pos': run_station2_distance(run) * 100
     }
     
     return event_data
@@ -149,13 +137,33 @@ def main():
     parser = argparse.ArgumentParser(description="Visualize 3D particle events")
     parser.add_argument('--event-id', nargs='+', type=int, default=[0, 1, 2],
                         help='Event IDs to visualize')
-    parser.add_argument('--input', default='../output/TimeDilation_Run3.root',
-                        help='ROOT file to read')
+    parser.add_argument('--run', type=int, default=3, help='Run the events belong to')
+    parser.add_argument('--input', default=None,
+                        help='ROOT file to read (default: the run files in --input-dir, '
+                             'else TimeDilation_Run{run}.root there)')
+    parser.add_argument('--input-dir', default='../output', help='Directory with run files')
     args = parser.parse_args()
     
+    root_file = args.input
+    store = None
+    if root_file is None:
+        store = load_event_store(args.input_dir)
+        if store is None:
+            root_file = Path(args.input_dir) / f'TimeDilation_Run{args.run}.root'
+    if store is None:
+        try:
+            store = load_root_store(root_file, args.run)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"ERROR: {e}")
+            return
+    
     for evt_id in args.event_id:
-        print(f"\nVisualizing event {evt_id}...")
-        event_data = load_event_from_root(args.input, evt_id)
+        print(f"\nVisualizing event {evt_id} of run {args.run}...")
+        try:
+            event_data = load_event(store, args.run, evt_id)
+        except (KeyError, ValueError) as e:
+            print(f"ERROR: {e.args[0]}")
+            continue
         visualize_event(event_data, evt_id)
 
 if __name__ == '__main__':
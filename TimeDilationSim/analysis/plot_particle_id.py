@@ -4,35 +4,36 @@ plot_particle_id.py
 Analyze and visualize particle identification performance
 """
 
-import ROOT
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
 
+from density_plot import density_scatter
+from pid import beta_cuts, classify, confusion_matrix
+from root_io import read_branches
+
+ROOT_FILE = "../output/TimeDilation_Run0.root"
+
+def load_beta_data(filename=ROOT_FILE, branches=('Calo_EoP', 'PrimaryPDG')):
+    """Read β (RICH1, or RICH2 if RICH1 has no data) and other branches for events with β > 0"""
+    data = read_branches(filename, ['RICH1_Beta', 'RICH2_Beta'] + list(branches))
+    
+    # Use RICH1 or RICH2 (whichever has data)
+    beta = np.where(data['RICH1_Beta'] > 0, data['RICH1_Beta'], data['RICH2_Beta'])
+    has_beta = beta > 0
+    
+    selected = {name: data[name][has_beta] for name in branches}
+    selected['beta'] = beta[has_beta]
+    return selected
+
 def plot_beta_vs_energy():
     """Create β vs. E/p scatter plot for particle ID"""
     
     # Load data
-    rootfile = ROOT.TFile.Open("../output/TimeDilation_Run0.root")
-    tree = rootfile.Get("TimeDilation")
-    
-    # Extract data
-    beta1 = []
-    beta2 = []
-    eop = []
-    pdg = []
-    
-    for event in tree:
-        # Use RICH1 or RICH2 (whichever has data)
-        b = event.RICH1_Beta if event.RICH1_Beta > 0 else event.RICH2_Beta
-        if b > 0:
-            beta1.append(b)
-            eop.append(event.Calo_EoP)
-            pdg.append(event.PrimaryPDG)
-    
-    beta1 = np.array(beta1)
-    eop = np.array(eop)
-    pdg = np.array(pdg)
+    data = load_beta_data()
+    beta1 = data['beta']
+    eop = data['Calo_EoP']
+    pdg = data['PrimaryPDG']
     
     # Separate by species
     mask_pion = (pdg == 211)
@@ -41,9 +42,10 @@ def plot_beta_vs_energy():
     # Create plot
     fig, ax = plt.subplots(figsize=(10, 8))
     
-    # Plot scatter
-    ax.scatter(beta1[mask_pion], eop[mask_pion], c='red', alpha=0.3, s=20, label='π+')
-    ax.scatter(beta1[mask_kaon], eop[mask_kaon], c='blue', alpha=0.3, s=20, label='K+')
+    # Plot scatter (density plus sparse points for large samples)
+    plot_range = [[0.985, 1.001], [0, 2.0]]
+    density_scatter(ax, beta1[mask_pion], eop[mask_pion], 'red', label='π+', range=plot_range, s=20)
+    density_scatter(ax, beta1[mask_kaon], eop[mask_kaon], 'blue', label='K+', range=plot_range, s=20)
     
     # Add ID regions (ellipses)
     # Kaon region: β < 0.999, E/p ~ 1
@@ -60,8 +62,8 @@ def plot_beta_vs_energy():
     
     ax.set_xlabel('Measured β (RICH)', fontsize=14, fontweight='bold')
     ax.set_ylabel('E/p (Calorimeter)', fontsize=14, fontweight='bold')
-    ax.set_xlim(0.985, 1.001)
-    ax.set_ylim(0, 2.0)
+    ax.set_xlim(*plot_range[0])
+    ax.set_ylim(*plot_range[1])
     ax.grid(alpha=0.3, linestyle='--')
     ax.legend(loc='upper left', fontsize=12)
     
@@ -72,44 +74,23 @@ def plot_beta_vs_energy():
     plt.tight_layout()
     plt.savefig('particle_id_beta_eop.png', dpi=300, bbox_inches='tight')
     print("Saved: particle_id_beta_eop.png")
-    plt.show()
+    plt.close()
 
 def calculate_efficiencies():
     """Calculate particle ID efficiencies and cross-contamination"""
     
-    rootfile = ROOT.TFile.Open("../output/TimeDilation_Run0.root")
-    tree = rootfile.Get("TimeDilation")
-    
-    # Apply ID cuts
-    correct_pion = 0
-    correct_kaon = 0
-    total_pion = 0
-    total_kaon = 0
-    pion_as_kaon = 0
-    kaon_as_pion = 0
-    
-    for event in tree:
-        beta = event.RICH1_Beta if event.RICH1_Beta > 0 else event.RICH2_Beta
-        if beta == 0:
-            continue
-        
-        true_pdg = event.PrimaryPDG
-        
-        # ID logic: β < 0.999 → K+, else π+ (simplified)
-        reco_pdg = 321 if beta < 0.999 else 211
-        
-        if true_pdg == 211:
-            total_pion += 1
-            if reco_pdg == 211:
-                correct_pion += 1
-            else:
-                pion_as_kaon += 1
-        elif true_pdg == 321:
-            total_kaon += 1
-            if reco_pdg == 321:
-                correct_kaon += 1
-            else:
-                kaon_as_pion += 1
+    data = load_beta_data(branches=['PrimaryPDG'])
+    
+    # ID logic: β < 0.999 → K+, else π+ (simplified)
+    reco_pdg = classify(data, beta_cuts(0.999, column='beta'))
+    matrix = confusion_matrix(data['PrimaryPDG'], reco_pdg)
+    
+    total_pion = matrix.loc[211].sum()
+    total_kaon = matrix.loc[321].sum()
+    correct_pion = matrix.loc[211, 211]
+    correct_kaon = matrix.loc[321, 321]
+    pion_as_kaon = matrix.loc[211, 321]
+    kaon_as_pion = matrix.loc[321, 211]
     
     eff_pion = correct_pion / total_pion if total_pion > 0 else 0
     eff_kaon = correct_kaon / total_kaon if total_kaon > 0 else 0
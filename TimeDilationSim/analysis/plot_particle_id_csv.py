@@ -9,11 +9,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
 
+from dataset import load_dataset
+from density_plot import density_scatter
+from pid import beta_cuts, classify, confusion_matrix, scan_beta_threshold, scan_table
+
+# β thresholds for the efficiency scan
+SCAN_THRESHOLDS = np.linspace(0.990, 1.000, 201)
+
 def plot_beta_vs_energy():
     """Create β vs. E/p scatter plot for particle ID"""
     
     # Load data from any run (use Run 0)
-    df = pd.read_csv("../output/TimeDilation_Run0.csv")
+    df = load_dataset(run_ids=[0], columns=['RICH1_Beta', 'Calo_EoP', 'PrimaryPDG'])
     
     # Extract data
     beta = df['RICH1_Beta'].values
@@ -27,9 +34,10 @@ def plot_beta_vs_energy():
     # Create plot
     fig, ax = plt.subplots(figsize=(10, 8))
     
-    # Plot scatter
-    ax.scatter(beta[mask_pion], eop[mask_pion], c='red', alpha=0.3, s=20, label='π+')
-    ax.scatter(beta[mask_kaon], eop[mask_kaon], c='blue', alpha=0.3, s=20, label='K+')
+    # Plot scatter (density plus sparse points for large samples)
+    plot_range = [[0.985, 1.001], [0, 1.5]]
+    density_scatter(ax, beta[mask_pion], eop[mask_pion], 'red', label='π+', range=plot_range, s=20)
+    density_scatter(ax, beta[mask_kaon], eop[mask_kaon], 'blue', label='K+', range=plot_range, s=20)
     
     # Add ID regions (ellipses)
     # Kaon region: β < 0.999, E/p ~ 1
@@ -46,8 +54,8 @@ def plot_beta_vs_energy():
     
     ax.set_xlabel('Measured β (RICH)', fontsize=14, fontweight='bold')
     ax.set_ylabel('E/p (Calorimeter)', fontsize=14, fontweight='bold')
-    ax.set_xlim(0.985, 1.001)
-    ax.set_ylim(0, 1.5)
+    ax.set_xlim(*plot_range[0])
+    ax.set_ylim(*plot_range[1])
     ax.grid(alpha=0.3, linestyle='--')
     ax.legend(loc='upper left', fontsize=12)
     
@@ -63,35 +71,18 @@ def plot_beta_vs_energy():
 def calculate_efficiencies():
     """Calculate particle ID efficiencies and cross-contamination"""
     
-    df = pd.read_csv("../output/TimeDilation_Run0.csv")
-    
-    # Apply ID cuts
-    correct_pion = 0
-    correct_kaon = 0
-    total_pion = 0
-    total_kaon = 0
-    pion_as_kaon = 0
-    kaon_as_pion = 0
-    
-    for _, row in df.iterrows():
-        beta = row['RICH1_Beta']
-        true_pdg = row['PrimaryPDG']
-        
-        # ID logic: β < 0.999 → K+, else π+ (simplified)
-        reco_pdg = 321 if beta < 0.999 else 211
-        
-        if true_pdg == 211:
-            total_pion += 1
-            if reco_pdg == 211:
-                correct_pion += 1
-            else:
-                pion_as_kaon += 1
-        elif true_pdg == 321:
-            total_kaon += 1
-            if reco_pdg == 321:
-                correct_kaon += 1
-            else:
-                kaon_as_pion += 1
+    df = load_dataset(run_ids=[0], columns=['RICH1_Beta', 'PrimaryPDG'])
+    
+    # ID logic: β < 0.999 → K+, else π+ (simplified)
+    reco_pdg = classify(df, beta_cuts(0.999, column='RICH1_Beta'))
+    matrix = confusion_matrix(df['PrimaryPDG'], reco_pdg)
+    
+    total_pion = matrix.loc[211].sum()
+    total_kaon = matrix.loc[321].sum()
+    correct_pion = matrix.loc[211, 211]
+    correct_kaon = matrix.loc[321, 321]
+    pion_as_kaon = matrix.loc[211, 321]
+    kaon_as_pion = matrix.loc[321, 211]
     
     eff_pion = correct_pion / total_pion if total_pion > 0 else 0
     eff_kaon = correct_kaon / total_kaon if total_kaon > 0 else 0
@@ -116,6 +107,11 @@ def calculate_efficiencies():
     })
     pid_df.to_csv('particle_id_performance.csv', index=False)
     print("\n✓ Performance saved to particle_id_performance.csv")
+    
+    # Efficiency and purity vs. β threshold
+    scan = scan_beta_threshold(df['RICH1_Beta'], df['PrimaryPDG'], SCAN_THRESHOLDS)
+    scan_table(scan).to_csv('particle_id_threshold_scan.csv', index=False)
+    print("✓ Threshold scan saved to particle_id_threshold_scan.csv")
 
 if __name__ == '__main__':
     try:
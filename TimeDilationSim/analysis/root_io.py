@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+root_io.py
+Columnar reads of the TimeDilation TTree without a per-event Python loop
+
+read_branches() returns the requested branches as NumPy arrays in one bulk
+read. It uses uproot when installed (pure Python, no ROOT start-up cost)
+and falls back to PyROOT's RDataFrame.AsNumpy otherwise.
+
+Usage:
+  from root_io import read_branches
+  data = read_branches('../output/TimeDilation_Run0.root', ['PrimaryPDG', 'Survived'])
+"""
+
+import os
+
+import numpy as np
+
+TREE_NAME = 'TimeDilation'
+
+def root_backend():
+    """Name of the available ROOT reader: 'uproot' or 'pyroot'"""
+    try:
+        import uproot  # noqa: F401
+        return 'uproot'
+    except ImportError:
+        pass
+    try:
+        import ROOT  # noqa: F401
+        return 'pyroot'
+    except ImportError:
+        raise ImportError("Reading ROOT files needs uproot (pip install uproot) or PyROOT")
+
+def _read_uproot(filename, branches, tree_name, entry_start, entry_stop):
+    import uproot
+    with uproot.open(filename) as rootfile:
+        if tree_name not in rootfile:
+            raise ValueError(f"Tree '{tree_name}' not found in {filename}")
+        return rootfile[tree_name].arrays(branches, library='np',
+                                          entry_start=entry_start, entry_stop=entry_stop)
+
+def _read_pyroot(filename, branches, tree_name, entry_start, entry_stop):
+    import ROOT
+    ROOT.gROOT.SetBatch(True)
+
+    rootfile = ROOT.TFile.Open(filename)
+    if not rootfile or rootfile.IsZombie():
+        raise FileNotFoundError(f"Cannot open {filename}")
+    if not rootfile.Get(tree_name):
+        raise ValueError(f"Tree '{tree_name}' not found in {filename}")
+    rootfile.Close()
+
+    frame = ROOT.RDataFrame(tree_name, filename)
+    if entry_start is not None or entry_stop is not None:
+        frame = frame.Range(entry_start or 0, entry_stop or 0)
+    arrays = frame.AsNumpy(list(branches))
+    return {name: np.asarray(arrays[name]) for name in branches}
+
+def read_branches(filename, branches, tree_name=TREE_NAME, entry_start=None, entry_stop=None):
+    """Read branches of a TTree as {name: numpy array}
+
+    entry_start/entry_stop select a range of entries (stop exclusive).
+    """
+    filename = str(filename)
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"Cannot open {filename}")
+
+    branches = list(branches)
+    if root_backend() == 'uproot':
+        return _read_uproot(filename, branches, tree_name, entry_start, entry_stop)
+    return _read_pyroot(filename, branches, tree_name, entry_start, entry_stop)
+
+def read_entry(filename, entry, branches, tree_name=TREE_NAME):
+    """Values of the given branches for a single entry, as {name: scalar}"""
+    arrays = read_branches(filename, branches, tree_name, entry, entry + 1)
+    if len(arrays[branches[0]]) == 0:
+        raise IndexError(f"Entry {entry} out of range in {filename}")
+    return {name: values[0] for name, values in arrays.items()}
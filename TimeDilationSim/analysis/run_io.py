@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+run_io.py
+Read and write TimeDilation_Run{i} event tables as CSV, Parquet or Feather
+
+The binary formats store typed columns (ints as ints, not 211.0) and let
+readers load only the columns they need. Loaders read the newest file of
+a run, so a binary copy is used until the run is written again in
+another format (see find_run_file).
+
+read_arrays() and iter_arrays() return columns as {name: array}. They
+parse CSV files below NUMPY_CSV_MAX_BYTES with NumPy instead of pandas:
+importing pandas takes ~0.4 s, longer than NumPy needs to parse that
+much text, so numeric-only scripts start faster without it. NumPy
+rounds decimal text exactly, so floats may differ from pandas' default
+parser in the last bit.
+
+Usage:
+  python run_io.py convert --input-dir ../output --format parquet
+"""
+
+import argparse
+import csv
+import itertools
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# File suffix for each supported format
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Preferred format when a run exists in several formats written at the same time
+READ_PREFERENCE = ('parquet', 'feather', 'csv')
+
+# Column types of the event table (matches the Geant4 ntuple definition)
+COLUMN_TYPES = {
+    'EventID': 'int64',
+    'RunNumber': 'int32',
+    'PrimaryPDG': 'int32',
+    'PrimaryMom': 'float64',
+    'PrimaryPosX': 'float64',
+    'PrimaryPosY': 'float64',
+    'PrimaryPosZ': 'float64',
+    'RICH1_Beta': 'float64',
+    'RICH1_NPE': 'int32',
+    'RICH2_Beta': 'float64',
+    'RICH2_NPE': 'int32',
+    'Calo_TotalE': 'float64',
+    'Calo_EoP': 'float64',
+    'DWC1_NHits': 'int32',
+    'DWC1_TrackAngle': 'float64',
+    'DWC2_NHits': 'int32',
+    'DWC2_TrackAngle': 'float64',
+    'DecayKinkDetected': 'int32',
+    'SC1_Hit': 'int32',
+    'SC2_Hit': 'int32',
+    'TOF': 'float64',
+    'Decayed': 'int32',
+    'DecayPosX': 'float64',
+    'DecayPosY': 'float64',
+    'DecayPosZ': 'float64',
+    'DecayTime': 'float64',
+    'DecayProductPDG': 'int32',
+    'ReconstructedPID': 'int32',
+    'Survived': 'int32',
+    'SurvivalWeight': 'float64',
+    'Station2PosZ': 'float64',
+}
+
+# Per-event analytic survival probability written by weighted simulations
+WEIGHT_COLUMN = 'SurvivalWeight'
+
+# Largest CSV parsed with NumPy; above this pandas' faster parser repays its
+# import (np.loadtxt is ~1.5x slower, break-even near 50 MB)
+NUMPY_CSV_MAX_BYTES = 48 << 20
+
+# Run files whose recorded RunNumber was replaced (noted once per file)
+_retagged = set()
+
+# Run files skipped as older than another copy of their run (noted once per file)
+_stale_copies = set()
+
+def run_path(run_id, data_dir='../output', fmt='csv'):
+    """Path of TimeDilation_Run{run_id} in the given format"""
+    return Path(data_dir) / f'TimeDilation_Run{run_id}{FORMATS[fmt]}'
+
+def file_format(path):
+    """Format name of a run file, from its suffix"""
+    suffix = Path(path).suffix.lower()
+    for fmt, fmt_suffix in FORMATS.items():
+        if suffix == fmt_suffix:
+            return fmt
+    raise ValueError(f"Unknown run file format: {path}")
+
+def find_run_file(run_id, data_dir='../output'):
+    """Newest file of a run (binary preferred among equally new copies), or None
+
+    A binary copy made by `run_io.py convert` is newer than its CSV and is
+    read instead; once the run is simulated again the new CSV is newer and
+    the stale copy is skipped with a note.
+    """
+    copies = []
+    for rank, fmt in enumerate(READ_PREFERENCE):
+        path = run_path(run_id, data_dir, fmt)
+        try:
+            copies.append((-path.stat().st_mtime_ns, rank, path))
+        except OSError:
+            continue
+    if not copies:
+        return None
+    copies.sort()
+    newest = copies[0][2]
+    for _, rank, path in copies[1:]:
+        if rank < copies[0][1] and str(path) not in _stale_copies:
+            _stale_copies.add(str(path))
+            print(f"Note: {path} is older than {newest}; reading {newest}")
+    return newest
+
+def apply_column_types(df):
+    """Cast known columns to their typed schema, leaving others untouched"""
+    types = {col: dtype for col, dtype in COLUMN_TYPES.items() if col in df.columns}
+    return df.astype(types)
+
+def read_table(path, columns=None):
+    """Read one run file of any supported format"""
+    import pandas as pd
+    fmt = file_format(path)
+    columns = list(columns) if columns is not None else None
+
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    if fmt == 'feather':
+        return pd.read_feather(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+def table_columns(path):
+    """Column names of a run file, without reading its rows"""
+    fmt = file_format(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    if fmt == 'feather':
+        import pyarrow as pa
+        return pa.ipc.open_file(pa.memory_map(str(path))).schema.names
+    with open(path, newline='') as f:
+        return next(csv.reader(f), [])
+
+def _arrow_batches(path, chunk_size, columns):
+    """Record batches of at most chunk_size rows of a Parquet or Feather file"""
+    if file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(str(path)))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    for batch in batches:
+        if columns is not None:
+            batch = batch.select(columns)
+        # Feather batches have the size they were written with; split large ones
+        for start in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(start, chunk_size)
+
+def iter_table(path, chunk_size=1000000, columns=None):
+    """Yield a run file as DataFrame chunks of at most chunk_size rows"""
+    import pandas as pd
+    columns = list(columns) if columns is not None else None
+
+    if file_format(path) == 'csv':
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+        return
+    for batch in _arrow_batches(path, chunk_size, columns):
+        yield batch.to_pandas()
+
+def _typed_arrays(columns, values):
+    """{name: array} with known columns cast to their schema type"""
+    return {name: values[name].astype(COLUMN_TYPES.get(name, values[name].dtype), copy=False)
+            for name in columns}
+
+def _frame_arrays(df):
+    return _typed_arrays(list(df.columns), {col: df[col].to_numpy() for col in df.columns})
+
+def _iter_csv_arrays(path, chunk_size, columns):
+    """CSV chunks parsed by np.loadtxt (numeric columns only; chunk_size None: one chunk)"""
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]), [])
+        columns = header if columns is None else list(columns)
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise ValueError(f"Columns {missing} not in {path}")
+        usecols = [header.index(col) for col in columns]
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+            values = np.loadtxt(lines, delimiter=',', usecols=usecols, ndmin=2)
+            yield _typed_arrays(columns, dict(zip(columns, values.T)))
+
+def _arrow_arrays(table):
+    """{name: array} of a pyarrow Table or RecordBatch"""
+    names = table.schema.names
+    return _typed_arrays(names, {name: np.asarray(table.column(name)) for name in names})
+
+def _numpy_csv(path):
+    return file_format(path) == 'csv' and Path(path).stat().st_size <= NUMPY_CSV_MAX_BYTES
+
+def iter_arrays(path, chunk_size=1000000, columns=None):
+    """Yield a run file as {column: array} chunks of at most chunk_size rows
+
+    Like iter_table(), without building DataFrames; small CSV files are
+    parsed without importing pandas (see NUMPY_CSV_MAX_BYTES).
+    """
+    columns = list(columns) if columns is not None else None
+    if _numpy_csv(path):
+        yield from _iter_csv_arrays(path, chunk_size, columns)
+    elif file_format(path) == 'csv':
+        for chunk in iter_table(path, chunk_size, columns):
+            yield _frame_arrays(chunk)
+    else:
+        for batch in _arrow_batches(path, chunk_size, columns):
+            yield _arrow_arrays(batch)
+
+def read_arrays(path, columns=None):
+    """Read one run file as {column: array}, typed like apply_column_types()"""
+    columns = list(columns) if columns is not None else None
+    fmt = file_format(path)
+    if _numpy_csv(path):
+        chunks = list(_iter_csv_arrays(path, None, columns))
+        if not chunks:
+            names = table_columns(path) if columns is None else list(columns)
+            return {name: np.zeros(0, dtype=COLUMN_TYPES.get(name, 'float64')) for name in names}
+        return chunks[0]
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return _arrow_arrays(pq.read_table(path, columns=columns))
+    if fmt == 'feather':
+        import pyarrow.feather as feather
+        return _arrow_arrays(feather.read_table(path, columns=columns))
+    return _frame_arrays(read_table(path, columns))
+
+def tag_run(data, run_id, source):
+    """Set RunNumber of rows read from run file `run_id` to that index
+
+    Runs are identified by their file (TimeDilation_Run{i}), not by the
+    RunNumber column: every Geant4 run is a separate invocation and
+    records GetRunID() == 0. data is a DataFrame or dict of arrays and is
+    modified in place; a file recording other numbers is noted once.
+    """
+    if 'RunNumber' not in data:
+        return data
+    recorded = np.asarray(data['RunNumber'])
+    if len(recorded) and (recorded != run_id).any() and str(source) not in _retagged:
+        _retagged.add(str(source))
+        found = ', '.join(str(run) for run in np.unique(recorded)[:4])
+        print(f"Note: {source} records RunNumber {found}; counted as run {run_id} (its file index)")
+    data['RunNumber'] = np.full(len(recorded), run_id, dtype=COLUMN_TYPES['RunNumber'])
+    return data
+
+def load_run(run_id, data_dir='../output', columns=None):
+    """Load one run, preferring a binary copy over the CSV
+
+    Falls back to merging Geant4 per-thread ntuple files when the run has
+    not been written as a single table. RunNumber is the run's file index
+    (see tag_run).
+    """
+    path = find_run_file(run_id, data_dir)
+    if path is not None:
+        return tag_run(read_table(path, columns), run_id, path)
+
+    from g4_ntuple import find_thread_files, read_ntuple
+    thread_files = find_thread_files(run_id, data_dir)
+    if thread_files:
+        return tag_run(read_ntuple(thread_files, columns), run_id, thread_files[0])
+    raise FileNotFoundError(f"No file for run {run_id} in {data_dir}")
+
+def load_runs(run_ids=range(4), data_dir='../output', columns=None):
+    """Load and concatenate the available runs, or None if there are none"""
+    import pandas as pd
+    dfs = []
+    for run_id in run_ids:
+        try:
+            dfs.append(load_run(run_id, data_dir, columns))
+        except FileNotFoundError:
+            continue
+    return pd.concat(dfs, ignore_index=True) if dfs else None
+
+class RunWriter:
+    """Append DataFrame chunks to a single run file
+
+    CSV chunks are appended as text. Parquet chunks become row groups and
+    Feather chunks become Arrow record batches, so a run of any size is
+    written with memory bounded by the chunk.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = Path(path)
+        self.fmt = fmt or file_format(path)
+        self._writer = None
+        self._header_written = False
+
+    def write(self, df):
+        """Append one chunk"""
+        if self.fmt == 'csv':
+            df.to_csv(self.path, index=False, mode='a' if self._header_written else 'w',
+                      header=not self._header_written)
+            self._header_written = True
+            return
+
+        import pyarrow as pa
+        table = pa.Table.from_pandas(apply_column_types(df), preserve_index=False)
+        if self._writer is None:
+            self._writer = self._open_arrow_writer(table.schema)
+        self._writer.write_table(table)
+
+    def append_file(self, path):
+        """Append a headerless CSV shard, or any table file in this format"""
+        if self.fmt == 'csv':
+            with open(self.path, 'a', newline='') as out, open(path, 'r', newline='') as shard:
+                shutil.copyfileobj(shard, out)
+            return
+        self.write(read_table(path))
+
+    def write_header(self, columns):
+        """Start a CSV with a header line only (used before appending shards)"""
+        with open(self.path, 'w', newline='') as out:
+            out.write(','.join(columns) + '\n')
+        self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open_arrow_writer(self, schema):
+        import pyarrow as pa
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self.path, schema, compression='zstd')
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        return pa.ipc.new_file(self.path, schema, options=options)
+
+def convert_run_file(path, fmt, chunk_size=1000000):
+    """Convert a run CSV to a typed binary file next to it"""
+    import pandas as pd
+    path = Path(path)
+    out_path = path.with_suffix(FORMATS[fmt])
+    with RunWriter(out_path, fmt) as writer:
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            writer.write(chunk)
+    return out_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert TimeDilation run tables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help='Convert run CSVs to a binary format')
+    convert.add_argument('--input-dir', default='../output', help='Directory with run CSVs')
+    convert.add_argument('--format', choices=['parquet', 'feather'], default='parquet')
+    convert.add_argument('--runs', nargs='+', type=int, default=[0, 1, 2, 3],
+                         help='Run numbers to convert')
+    args = parser.parse_args()
+
+    for run_id in args.runs:
+        csv_file = run_path(run_id, args.input_dir, 'csv')
+        if not csv_file.exists():
+            print(f"Skipping {csv_file} (not found)")
+            continue
+        out_file = convert_run_file(csv_file, args.format)
+        ratio = out_file.stat().st_size / csv_file.stat().st_size
+        print(f"✓ {csv_file} -> {out_file} ({ratio*100:.0f}% of CSV size)")
+
+if __name__ == '__main__':
+    main()
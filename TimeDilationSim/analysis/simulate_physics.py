@@ -3,55 +3,58 @@
 simulate_physics.py
 Python-based Monte Carlo simulation mimicking GEANT4 physics
 Generates realistic decay data for immediate analysis
+
+With --weighted, decays are not sampled: every particle is tracked to
+station 2 and carries its analytic survival probability exp(-L/λ(p)) in a
+SurvivalWeight column. The survival analysis weights events by it, so
+S(x) comes out with the precision of orders of magnitude more unweighted
+events (the only fluctuation left is that of the beam momentum).
 """
 
 import numpy as np
 import pandas as pd
+import argparse
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# Physical constants
-C_LIGHT = 299792458  # m/s
-PION_MASS = 0.13957  # GeV
-KAON_MASS = 0.49368  # GeV
-MUON_MASS = 0.10566  # GeV
-PION_LIFETIME = 26.03e-9  # s
-KAON_LIFETIME = 12.38e-9  # s
-
-def lorentz_gamma(momentum, mass):
-    """Calculate Lorentz γ factor"""
-    energy = np.sqrt(momentum**2 + mass**2)
-    return energy / mass
-
-def beta_from_momentum(momentum, mass):
-    """Calculate velocity β = v/c"""
-    energy = np.sqrt(momentum**2 + mass**2)
-    return momentum / energy
-
-def decay_length(momentum, mass, lifetime):
-    """Calculate characteristic decay length λ = βcγτ₀"""
-    gamma = lorentz_gamma(momentum, mass)
-    beta = beta_from_momentum(momentum, mass)
-    return beta * C_LIGHT * gamma * lifetime
-
-def simulate_beam(n_events, pion_fraction=0.95):
-    """Generate beam particles with realistic distribution"""
+from kinematics import (C_LIGHT, KAON_LIFETIME, KAON_MASS, PION_LIFETIME, PION_MASS,
+                        beta_from_momentum, decay_length)
+from run_io import FORMATS, WEIGHT_COLUMN, RunWriter, run_path
+from survival import add_survival_fractions
+
+OUTPUT_DIR = Path('../output')
+
+# Events per (position, shard) work unit of the parallel executor
+SHARD_SIZE = 250000
+
+def simulate_beam(n_events, pion_fraction=0.95, first_event_id=0, rng=None):
+    """Generate beam particles with realistic distribution
+
+    rng is a numpy.random.Generator; by default the global np.random
+    state is used.
+    """
+    rng = np.random if rng is None else rng
+    
     # Particle type (95% pions, 5% kaons)
     particle_pdg = np.where(
-        np.random.random(n_events) < pion_fraction,
+        rng.random(n_events) < pion_fraction,
         211,  # pion
         321   # kaon
     )
     
     # Momentum (Gaussian, mean=8 GeV/c, sigma=0.1 GeV/c)
-    momentum = np.random.normal(8.0, 0.1, n_events)
+    momentum = rng.normal(8.0, 0.1, n_events)
     
     # Initial position (beam spot, sigma=1 cm)
-    pos_x = np.random.normal(0, 1.0, n_events)  # cm
-    pos_y = np.random.normal(0, 1.0, n_events)
+    pos_x = rng.normal(0, 1.0, n_events)  # cm
+    pos_y = rng.normal(0, 1.0, n_events)
     pos_z = np.full(n_events, -50.0)  # -50 cm upstream
     
     return pd.DataFrame({
-        'EventID': np.arange(n_events),
+        'EventID': np.arange(first_event_id, first_event_id + n_events),
         'PrimaryPDG': particle_pdg,
         'PrimaryMom': momentum,
         'PrimaryPosX': pos_x,
@@ -59,128 +62,368 @@ def simulate_beam(n_events, pion_fraction=0.95):
         'PrimaryPosZ': pos_z
     })
 
-def simulate_decay(df, station2_position=1500):
-    """Simulate decay-in-flight to station2_position (cm)"""
-    results = []
+def beam_decay_length(pdg, momentum):
+    """(mass [GeV], decay length λ [m]) per particle
+
+    Anything that is not a pion is treated as a kaon.
+    """
+    is_pion = (pdg == 211)
+    mass = np.where(is_pion, PION_MASS, KAON_MASS)
+    lifetime = np.where(is_pion, PION_LIFETIME, KAON_LIFETIME)
+    return mass, decay_length(momentum, mass, lifetime)
+
+def simulate_decay(df, station2_position=1500, rng=None, weighted=False):
+    """Simulate decay-in-flight to station2_position (cm)
+
+    Every column is computed as a whole-array operation over the beam, so
+    the cost per event is a handful of NumPy kernels rather than a Python
+    loop iteration.
+
+    With weighted=True no particle decays; each carries its survival
+    probability in the SurvivalWeight column instead.
+    """
+    rng = np.random if rng is None else rng
+    n_events = len(df)
+    pdg = df['PrimaryPDG'].to_numpy()
+    momentum = df['PrimaryMom'].to_numpy(dtype=float)
+    pos_z = df['PrimaryPosZ'].to_numpy(dtype=float)
     
-    for _, row in df.iterrows():
-        pdg = row['PrimaryPDG']
-        momentum = row['PrimaryMom']
-        
-        # Get particle parameters
-        if pdg == 211:
-            mass = PION_MASS
-            lifetime = PION_LIFETIME
-        else:  # 321 (kaon)
-            mass = KAON_MASS
-            lifetime = KAON_LIFETIME
-        
-        # Calculate decay length
-        lambda_decay = decay_length(momentum, mass, lifetime)
-        
+    # Calculate decay length (exact; the sqrt-free λ = (p/m)cτ₀ is cheaper than a table)
+    mass, lambda_decay = beam_decay_length(pdg, momentum)
+    
+    # Check if particle reaches station 2
+    flight_distance = station2_position - pos_z
+    if weighted:
+        # Forced survival: analytic probability instead of a sampled outcome
+        survival_weight = np.exp(-flight_distance / (lambda_decay * 100))
+        decay_distance = np.full(n_events, np.inf)
+    else:
         # Sample decay position (exponential distribution)
-        decay_distance = np.random.exponential(lambda_decay * 100)  # convert m to cm
-        
-        # Check if particle reaches station 2
-        flight_distance = station2_position - row['PrimaryPosZ']
-        
-        if decay_distance < flight_distance:
-            # Particle decayed before station 2
-            decayed = True
-            survived = False
-            decay_z = row['PrimaryPosZ'] + decay_distance
-            decay_product_pdg = -13  # muon (μ+)
-        else:
-            # Particle survived to station 2
-            decayed = False
-            survived = True
-            decay_z = 0
-            decay_product_pdg = 0
-        
-        # RICH detector (measure β)
-        beta_true = beta_from_momentum(momentum, mass)
-        # Add measurement uncertainty (Δβ/β ~ 10^-3)
-        beta_measured = beta_true + np.random.normal(0, beta_true * 0.001)
-        
-        # Calorimeter energy (for stable particles, minimal deposition)
-        if survived:
-            calo_energy = 0.1 + np.random.normal(0, 0.05)  # MIP energy
-        else:
-            calo_energy = 0.0
-        
-        eop = calo_energy / momentum if survived else 0
+        decay_distance = rng.exponential(lambda_decay * 100)  # convert m to cm
+    decayed = decay_distance < flight_distance
+    survived = ~decayed
+    decay_z = np.where(decayed, pos_z + decay_distance, 0.0)
+    decay_product_pdg = np.where(decayed, -13, 0)  # muon (μ+)
+    
+    # RICH detector (measure β)
+    beta_true = beta_from_momentum(momentum, mass)
+    # Add measurement uncertainty (Δβ/β ~ 10^-3)
+    beta_measured = beta_true + rng.normal(0, beta_true * 0.001)
+    
+    # Calorimeter energy (for stable particles, minimal deposition)
+    calo_energy = np.where(survived, 0.1 + rng.normal(0, 0.05, n_events), 0.0)
+    eop = np.where(survived, calo_energy / momentum, 0.0)
+    
+    # DWC hits
+    dwc1_nhits = 10 + rng.poisson(2, n_events)
+    dwc2_nhits = np.where(survived, 10 + rng.poisson(2, n_events), 0)
+    
+    # RICH photoelectrons
+    rich1_npe = 50 + rng.poisson(10, n_events)
+    rich2_npe = np.where(survived, 50 + rng.poisson(10, n_events), 0)
+    
+    # Beam columns are carried over as floats, as the row-wise engine did
+    # (DataFrame rows upcast every field to float64)
+    results = df.astype(float)
+    results = results.assign(**{
+        'RICH1_Beta': beta_measured,
+        'RICH1_NPE': rich1_npe,
+        'RICH2_Beta': np.where(survived, beta_measured, 0.0),
+        'RICH2_NPE': rich2_npe,
+        'Calo_TotalE': calo_energy,
+        'Calo_EoP': eop,
+        'DWC1_NHits': dwc1_nhits,
+        'DWC1_TrackAngle': 0.0,
+        'DWC2_NHits': dwc2_nhits,
+        'DWC2_TrackAngle': 0.0,
+        'DecayKinkDetected': decayed.astype(int),
+        'SC1_Hit': 1,  # All particles hit SC1
+        'SC2_Hit': survived.astype(int),
+        'TOF': np.where(survived, 50.0, 0.0),
+        'Decayed': decayed.astype(int),
+        'DecayPosX': 0.0,
+        'DecayPosY': 0.0,
+        'DecayPosZ': decay_z,
+        'DecayTime': np.where(decayed, decay_distance / (beta_true * C_LIGHT * 100), 0.0),
+        'DecayProductPDG': decay_product_pdg,
+        'ReconstructedPID': pdg.astype(float),
+        'Survived': survived.astype(int),
+        # Lets the analysis measure flights against the simulated position
+        'Station2PosZ': float(station2_position),
+    })
+    if weighted:
+        results[WEIGHT_COLUMN] = survival_weight
+    
+    return results.reset_index(drop=True)
+
+def simulate_sweep_events(n_events, pion_fraction=0.95, rng=None):
+    """One beam sample with an unconditional decay vertex for every particle
+
+    Adds DecayPosZ (cm), the point where each particle decays if nothing
+    stops it first. Where station 2 sits does not change that point, so
+    the same events answer "did it survive?" for any station position.
+    """
+    rng = np.random if rng is None else rng
+    beam = simulate_beam(n_events, pion_fraction, rng=rng)
+    _, lambda_decay = beam_decay_length(beam['PrimaryPDG'].to_numpy(),
+                                        beam['PrimaryMom'].to_numpy(dtype=float))
+    beam['DecayPosZ'] = beam['PrimaryPosZ'].to_numpy() + rng.exponential(lambda_decay * 100)
+    return beam
+
+def sweep_survival(events, positions, species=(211, 321)):
+    """Survival table at every station position (cm) from one set of events
+
+    The decay vertices of each species are sorted once and counted against
+    all positions with searchsorted, so the cost is one sort plus
+    O(N log n) for N positions. Columns: Position_cm, PrimaryPDG, N_total,
+    N_survived, N_decayed, S, S_err_binomial, S_err_poisson.
+
+    All positions share the same events, so their S values are correlated;
+    see sweep_covariance().
+    """
+    positions = np.asarray(positions, dtype=float)
+    pdg = events['PrimaryPDG'].to_numpy()
+    decay_z = events['DecayPosZ'].to_numpy(dtype=float)
+    
+    tables = []
+    for code in species:
+        z_sorted = np.sort(decay_z[pdg == code])
+        # Decayed before station 2 <=> decay vertex upstream of it
+        n_decayed = np.searchsorted(z_sorted, positions, side='left')
+        tables.append(pd.DataFrame({
+            'Position_cm': positions,
+            'PrimaryPDG': code,
+            'N_total': len(z_sorted),
+            'N_survived': len(z_sorted) - n_decayed,
+            'N_decayed': n_decayed,
+        }))
+    return add_survival_fractions(pd.concat(tables, ignore_index=True))
+
+def sweep_covariance(table, pdg):
+    """Covariance matrix of S over the positions of one species in a sweep table
+
+    A particle that survives to the farther station also survives to the
+    nearer one, so Cov(S_i, S_j) = (S(max(x_i, x_j)) - S_i S_j) / N.
+    Returns a DataFrame indexed by Position_cm on both axes.
+    """
+    rows = table[table['PrimaryPDG'] == pdg]
+    positions = rows['Position_cm'].to_numpy()
+    S = rows['S'].to_numpy()
+    n_total = rows['N_total'].iloc[0]
+    
+    # S is non-increasing in position, so S at the farther position is the smaller one
+    farther = np.where(positions[:, None] >= positions[None, :], S[:, None], S[None, :])
+    covariance = (farther - np.outer(S, S)) / n_total if n_total else np.zeros_like(farther)
+    return pd.DataFrame(covariance, index=pd.Index(positions, name='Position_cm'),
+                        columns=positions)
+
+def simulate_run(n_events, station2_position, run_id, chunk_size=None, weighted=False):
+    """Yield one run's events as DataFrames of at most chunk_size rows"""
+    chunk_size = chunk_size or n_events
+    
+    for first_event in range(0, n_events, chunk_size):
+        n_chunk = min(chunk_size, n_events - first_event)
         
-        # Scintillator hits
-        sc1_hit = True  # All particles hit SC1
-        sc2_hit = survived
+        # Generate beam
+        beam = simulate_beam(n_chunk, first_event_id=first_event)
         
-        # DWC hits
-        dwc1_nhits = 10 + np.random.poisson(2)
-        dwc2_nhits = (10 + np.random.poisson(2)) if survived else 0
+        # Simulate physics
+        data = simulate_decay(beam, station2_position=station2_position, weighted=weighted)
         
-        results.append({
-            **row.to_dict(),
-            'RICH1_Beta': beta_measured,
-            'RICH1_NPE': int(50 + np.random.poisson(10)),
-            'RICH2_Beta': beta_measured if survived else 0,
-            'RICH2_NPE': int(50 + np.random.poisson(10)) if survived else 0,
-            'Calo_TotalE': calo_energy,
-            'Calo_EoP': eop,
-            'DWC1_NHits': dwc1_nhits,
-            'DWC1_TrackAngle': 0.0,
-            'DWC2_NHits': dwc2_nhits,
-            'DWC2_TrackAngle': 0.0,
-            'DecayKinkDetected': int(decayed),
-            'SC1_Hit': int(sc1_hit),
-            'SC2_Hit': int(sc2_hit),
-            'TOF': 50.0 if survived else 0.0,
-            'Decayed': int(decayed),
-            'DecayPosX': 0.0,
-            'DecayPosY': 0.0,
-            'DecayPosZ': decay_z,
-            'DecayTime': decay_distance / (beta_true * C_LIGHT * 100) if decayed else 0,
-            'DecayProductPDG': decay_product_pdg,
-            'ReconstructedPID': pdg,
-            'Survived': int(survived)
-        })
-    
-    return pd.DataFrame(results)
-
-def run_simulation(n_events, station_positions=[0, 500, 1000, 1500]):
-    """Run full simulation for all station positions"""
+        # Add run number
+        data['RunNumber'] = run_id
+        yield data
+
+def tally_survivors(data, n_total, n_survived):
+    """Add one chunk's per-species event and (weighted) survivor counts"""
+    survived = data['Survived'].to_numpy(dtype=float)
+    if WEIGHT_COLUMN in data:
+        survived = survived * data[WEIGHT_COLUMN].to_numpy()
+    for pdg in n_total:
+        species = (data['PrimaryPDG'] == pdg).to_numpy()
+        n_total[pdg] += int(species.sum())
+        n_survived[pdg] += survived[species].sum()
+
+def print_run_statistics(n_total, n_survived):
+    """Print per-species survival for one run from {pdg: count} tallies"""
+    n_pions = n_total[211]
+    n_kaons = n_total[321]
+    pion_survival = n_survived[211] / n_pions
+    kaon_survival = n_survived[321] / n_kaons
+    
+    print(f"  Pions: {n_pions} total, {pion_survival:.4f} survived")
+    print(f"  Kaons: {n_kaons} total, {kaon_survival:.4f} survived")
+
+def run_simulation(n_events, station_positions=[0, 500, 1000, 1500], chunk_size=None,
+                   fmt='csv', weighted=False):
+    """Run full simulation for all station positions
+
+    With chunk_size set, events are generated and appended to the output
+    file chunk by chunk, so peak memory is set by chunk_size rather than
+    by n_events. fmt selects the output format (csv, parquet or feather).
+    weighted selects the analytic-survival mode.
+    """
     print(f"Generating {n_events} events per position...")
+    if chunk_size:
+        print(f"Streaming in chunks of {chunk_size} events")
     
-    output_dir = Path('../output')
+    output_dir = OUTPUT_DIR
     output_dir.mkdir(exist_ok=True)
     
     for run_id, position in enumerate(station_positions):
         print(f"\nRun {run_id}: Station2 @ {position/100:.1f} m")
         
-        # Generate beam
-        beam = simulate_beam(n_events)
+        out_file = run_path(run_id, output_dir, fmt)
+        n_total = {211: 0, 321: 0}
+        n_survived = {211: 0, 321: 0}
         
-        # Simulate physics
-        data = simulate_decay(beam, station2_position=position)
-        
-        # Add run number
-        data['RunNumber'] = run_id
-        
-        # Save to CSV
-        csv_file = output_dir / f'TimeDilation_Run{run_id}.csv'
-        data.to_csv(csv_file, index=False)
-        print(f"  Saved: {csv_file}")
+        with RunWriter(out_file, fmt) as writer:
+            for data in simulate_run(n_events, position, run_id, chunk_size, weighted):
+                writer.write(data)
+                tally_survivors(data, n_total, n_survived)
+        print(f"  Saved: {out_file}")
+        print_run_statistics(n_total, n_survived)
+
+def _simulate_shard(unit):
+    """Simulate one (position, shard) work unit and write it to a shard file"""
+    run_id, position, first_event, n_shard, seed_seq, shard_file, fmt, weighted = unit
+    rng = np.random.default_rng(seed_seq)
+    
+    beam = simulate_beam(n_shard, first_event_id=first_event, rng=rng)
+    data = simulate_decay(beam, station2_position=position, rng=rng, weighted=weighted)
+    data['RunNumber'] = run_id
+    if fmt == 'csv':
+        data.to_csv(shard_file, index=False, header=False)
+    else:
+        with RunWriter(shard_file, fmt) as writer:
+            writer.write(data)
+    
+    n_total = {211: 0, 321: 0}
+    n_survived = {211: 0, 321: 0}
+    tally_survivors(data, n_total, n_survived)
+    return list(data.columns), n_total, n_survived
+
+def run_simulation_parallel(n_events, station_positions=[0, 500, 1000, 1500],
+                            n_workers=None, shard_size=SHARD_SIZE, seed=None, fmt='csv',
+                            weighted=False):
+    """Run the simulation with (position, shard) work units on a process pool
+
+    Every shard draws from its own generator, spawned from one
+    numpy.random.SeedSequence as seed -> position -> shard. The output
+    depends only on seed and shard_size, never on the number of workers.
+    Workers write their shards to a directory of this run's own (so shards
+    left by an interrupted earlier run are never merged or in the way) and
+    the parent concatenates them in order into the usual TimeDilation_Run{i}
+    files.
+    """
+    seed_seq = np.random.SeedSequence(seed)
+    n_workers = n_workers or os.cpu_count()
+    print(f"Generating {n_events} events per position on {n_workers} workers...")
+    print(f"Seed entropy: {seed_seq.entropy} (shard size {shard_size})")
+    
+    output_dir = OUTPUT_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+    shard_dir = Path(tempfile.mkdtemp(dir=output_dir, prefix='shards_'))
+    
+    # Work units, ordered by run then by shard
+    units = []
+    for (run_id, position), position_seq in zip(enumerate(station_positions),
+                                                seed_seq.spawn(len(station_positions))):
+        first_events = range(0, n_events, shard_size)
+        for shard, (first_event, shard_seq) in enumerate(zip(first_events,
+                                                              position_seq.spawn(len(first_events)))):
+            n_shard = min(shard_size, n_events - first_event)
+            shard_file = shard_dir / f'TimeDilation_Run{run_id}_shard{shard}{FORMATS[fmt]}'
+            units.append((run_id, position, first_event, n_shard, shard_seq, shard_file, fmt,
+                          weighted))
+    
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        results = list(executor.map(_simulate_shard, units))
+    
+    # Merge shards into one file per run
+    for run_id, position in enumerate(station_positions):
+        print(f"\nRun {run_id}: Station2 @ {position/100:.1f} m")
         
-        # Print statistics
-        n_pions = (data['PrimaryPDG'] == 211).sum()
-        n_kaons = (data['PrimaryPDG'] == 321).sum()
-        pion_survival = data[(data['PrimaryPDG'] == 211) & (data['Survived'] == 1)].shape[0] / n_pions
-        kaon_survival = data[(data['PrimaryPDG'] == 321) & (data['Survived'] == 1)].shape[0] / n_kaons
+        out_file = run_path(run_id, output_dir, fmt)
+        n_total = {211: 0, 321: 0}
+        n_survived = {211: 0, 321: 0}
         
-        print(f"  Pions: {n_pions} total, {pion_survival:.4f} survived")
-        print(f"  Kaons: {n_kaons} total, {kaon_survival:.4f} survived")
+        with RunWriter(out_file, fmt) as writer:
+            for unit, (columns, shard_total, shard_survived) in zip(units, results):
+                if unit[0] != run_id:
+                    continue
+                if fmt == 'csv' and unit[2] == 0:
+                    writer.write_header(columns)
+                writer.append_file(unit[5])
+                os.remove(unit[5])
+                for pdg in n_total:
+                    n_total[pdg] += shard_total[pdg]
+                    n_survived[pdg] += shard_survived[pdg]
+        print(f"  Saved: {out_file}")
+        print_run_statistics(n_total, n_survived)
+    
+    shutil.rmtree(shard_dir, ignore_errors=True)
 
-if __name__ == '__main__':
-    # Run with 10,000 events per position (fast, good statistics)
-    run_simulation(10000, station_positions=[0, 500, 1000, 1500])
-    print("\n✓ Simulation complete! CSV files saved in output/")
+def run_sweep(n_events, positions, seed=None):
+    """Survival at every position from one beam sample, saved as a CSV table"""
+    rng = np.random.default_rng(seed)
+    print(f"Sweeping {len(positions)} Station2 positions with {n_events} events...")
+    
+    events = simulate_sweep_events(n_events, rng=rng)
+    table = sweep_survival(events, positions)
+    
+    output_dir = OUTPUT_DIR
+    output_dir.mkdir(exist_ok=True)
+    out_file = output_dir / 'survival_sweep.csv'
+    table.to_csv(out_file, index=False)
+    print(f"  Saved: {out_file}")
+    
+    for name, pdg in [('Pions', 211), ('Kaons', 321)]:
+        rows = table[table['PrimaryPDG'] == pdg]
+        last = rows.iloc[-1]
+        print(f"  {name}: {int(last['N_total'])} total, "
+              f"{last['S']:.4f} survived @ {last['Position_cm']/100:.1f} m")
+
+def main():
+    parser = argparse.ArgumentParser(description="Python Monte Carlo for pion/kaon decay-in-flight")
+    parser.add_argument('--events', type=int, default=10000,
+                        help='Events per station position')
+    parser.add_argument('--positions', nargs='+', type=float, default=[0, 500, 1000, 1500],
+                        help='Station2 positions in cm')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Stream events to disk in chunks of this size (bounded memory); '
+                             'with --workers, the shard size')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Run (position, shard) work units on this many processes')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Root seed of the parallel run (reproducible for any --workers)')
+    parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                        help='Output format of the run tables')
+    parser.add_argument('--weighted', action='store_true',
+                        help='Weight events by their analytic survival probability '
+                             'instead of sampling decays')
+    parser.add_argument('--sweep', nargs=3, type=float, default=None,
+                        metavar=('START', 'STOP', 'STEP'),
+                        help='Survival at every Station2 position from START to STOP (cm) '
+                             'in STEP increments, from one beam sample')
+    args = parser.parse_args()
+    
+    if args.sweep:
+        start, stop, step = args.sweep
+        run_sweep(args.events, np.arange(start, stop + step / 2, step), seed=args.seed)
+        return
+    
+    # Default: 10,000 events per position (fast, good statistics)
+    if args.workers:
+        run_simulation_parallel(args.events, station_positions=args.positions,
+                                n_workers=args.workers,
+                                shard_size=args.chunk_size or SHARD_SIZE, seed=args.seed,
+                                fmt=args.format, weighted=args.weighted)
+    else:
+        run_simulation(args.events, station_positions=args.positions, chunk_size=args.chunk_size,
+                       fmt=args.format, weighted=args.weighted)
+    print(f"\n✓ Simulation complete! {args.format.upper()} files saved in output/")
     print("Run analysis scripts to generate figures.")
+
+if __name__ == '__main__':
+    main()
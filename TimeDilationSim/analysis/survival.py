@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+survival.py
+Survival counts and fractions for every (run, species) pair in one pass
+
+survival_table() groups events by (RunNumber, PrimaryPDG) with a single
+np.bincount over a combined integer key, so the cost is a few linear passes
+over the input regardless of how many runs or species it holds. Inputs are
+processed in fixed-size blocks to keep temporaries small on 10^8-row data.
+SurvivalAccumulator gives the same table for data streamed in chunks, as
+a DataFrame (table()) or as {column: array} (arrays(), which needs no
+pandas).
+
+Events from a weighted simulation (simulate_physics.py --weighted) carry
+their analytic survival probability in a SurvivalWeight column. When that
+column is present, N_survived is the sum of weights of the surviving
+events and both S errors are the standard error of the mean weight, which
+is far smaller than the binomial error of the same number of events.
+
+Usage:
+  from survival import survival_table
+  table = survival_table(df)                     # all (run, PDG) pairs
+  table = survival_table(df, species=[211, 321])
+  table = survival_table(df, by_run=False)       # runs pooled
+"""
+
+import numpy as np
+
+from accumulators import GroupedCounts, grouped_sum_arrays
+from run_io import WEIGHT_COLUMN
+
+GROUP_COLUMNS = ['RunNumber', 'PrimaryPDG']
+
+def _column(data, name):
+    return np.asarray(data[name])
+
+def _finish_counts(sums, has_decayed, weighted=False):
+    """Turn grouped_sum_arrays() output into survival counts ({column: array})
+
+    Counts are integers, except weighted N_survived/N_decayed, which are
+    sums of survival probabilities.
+    """
+    counts = {
+        'RunNumber': np.asarray(sums['RunNumber']),
+        'PrimaryPDG': np.asarray(sums['PrimaryPDG']),
+        'N_total': np.asarray(sums['N'], dtype=np.int64),
+    }
+    if weighted:
+        counts['N_survived'] = np.asarray(sums['N_survived'], dtype=float)
+        counts['N_decayed'] = counts['N_total'] - counts['N_survived']
+        counts['W2_survived'] = np.asarray(sums['W2_survived'], dtype=float)
+        return counts
+
+    counts['N_survived'] = np.rint(sums['N_survived']).astype(np.int64)
+    if has_decayed:
+        counts['N_decayed'] = np.rint(sums['N_decayed']).astype(np.int64)
+    else:
+        counts['N_decayed'] = counts['N_total'] - counts['N_survived']
+    return counts
+
+def _survival_sums(survived, decayed=None, weights=None):
+    """Per-event quantities summed by grouped_sum_arrays()"""
+    if weights is not None:
+        # Events without a weight (unweighted runs mixed in) count as sampled outcomes
+        weights = np.nan_to_num(np.asarray(weights, dtype=float), nan=1.0)
+        w_survived = np.asarray(survived) * weights
+        return {'N_survived': w_survived, 'W2_survived': w_survived**2}
+    sums = {'N_survived': survived}
+    if decayed is not None:
+        sums['N_decayed'] = decayed
+    return sums
+
+def survival_counts(run, pdg, survived, decayed=None, weights=None):
+    """N_total, N_survived and N_decayed for each (run, PDG) pair present
+
+    Arguments are equal-length arrays; `weights` are per-event survival
+    probabilities of a weighted simulation. Returns a DataFrame with one
+    row per pair that has at least one event, ordered by run then PDG.
+    """
+    import pandas as pd
+    sums = grouped_sum_arrays(run, pdg, _survival_sums(survived, decayed, weights), GROUP_COLUMNS)
+    return pd.DataFrame(_finish_counts(sums, decayed is not None, weights is not None))
+
+def _fraction_columns(counts):
+    """S, S_err_binomial and S_err_poisson of survival counts, as arrays"""
+    n_total = np.asarray(counts['N_total'], dtype=float)
+    n_survived = np.asarray(counts['N_survived'], dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        S = np.where(n_total > 0, n_survived / n_total, 0.0)
+        if 'W2_survived' in counts:
+            variance = np.maximum(np.asarray(counts['W2_survived']) / n_total - S**2, 0.0)
+            err_binomial = np.where(n_total > 0, np.sqrt(variance / n_total), 0.0)
+            err_poisson = err_binomial
+        else:
+            err_binomial = np.where(n_total > 0, np.sqrt(S * (1 - S) / n_total), 0.0)
+            err_poisson = np.where(n_total > 0, np.sqrt(n_survived) / n_total, 0.0)
+
+    return {'S': S, 'S_err_binomial': err_binomial, 'S_err_poisson': err_poisson}
+
+def add_survival_fractions(counts):
+    """Add S = N_survived/N_total with binomial and Poisson errors
+
+    For weighted counts both errors are the standard error of the mean
+    survival weight.
+    """
+    fractions = _fraction_columns(counts)
+    if 'W2_survived' in counts:
+        counts = counts.drop(columns='W2_survived')
+    return counts.assign(**fractions)
+
+def _reindex_species(counts, species):
+    """Counts for every (run present, species listed) pair, zero where absent"""
+    runs = np.unique(counts['RunNumber'])
+    species = np.asarray(list(species), dtype=counts['PrimaryPDG'].dtype)
+    present = {(run, pdg): i for i, (run, pdg) in
+               enumerate(zip(counts['RunNumber'].tolist(), counts['PrimaryPDG'].tolist()))}
+
+    full = {'RunNumber': np.repeat(runs, len(species)), 'PrimaryPDG': np.tile(species, len(runs))}
+    rows = np.array([present.get(pair, -1) for pair in
+                     zip(full['RunNumber'].tolist(), full['PrimaryPDG'].tolist())], dtype=np.intp)
+    for name, values in counts.items():
+        if name not in full:
+            full[name] = np.where(rows >= 0, values[rows], 0).astype(values.dtype)
+    return full
+
+class SurvivalAccumulator:
+    """Survival counts accumulated over chunks of events
+
+    add() takes a DataFrame or dict of arrays with PrimaryPDG and Survived
+    (plus RunNumber when by_run, and optionally Decayed and the weight
+    column). table() gives the same result as survival_table() on all
+    chunks combined, arrays() the same columns as {name: array}. Pass
+    weight_column=None to ignore event weights. Every chunk must have
+    Decayed and the weight column if and only if the first one did
+    (ValueError otherwise).
+    """
+
+    def __init__(self, by_run=True, weight_column=WEIGHT_COLUMN):
+        self.by_run = by_run
+        self.weight_column = weight_column
+        self.has_decayed = None
+        self.weighted = None
+        self._counts = GroupedCounts(GROUP_COLUMNS)
+
+    def add(self, data):
+        """Accumulate one chunk"""
+        pdg = _column(data, 'PrimaryPDG')
+        run = _column(data, 'RunNumber') if self.by_run else np.zeros(len(pdg), dtype=np.int64)
+
+        has_decayed = 'Decayed' in data
+        weighted = self.weight_column is not None and self.weight_column in data
+        if self.has_decayed is None:
+            self.has_decayed, self.weighted = has_decayed, weighted
+        elif (has_decayed, weighted) != (self.has_decayed, self.weighted):
+            # Mixing chunks would silently drop the column from later sums
+            raise ValueError(
+                f"Chunk columns differ from the first chunk: Decayed {has_decayed} "
+                f"(first {self.has_decayed}), {self.weight_column} {weighted} "
+                f"(first {self.weighted})")
+        sums = _survival_sums(
+            _column(data, 'Survived'),
+            _column(data, 'Decayed') if self.has_decayed else None,
+            _column(data, self.weight_column) if self.weighted else None,
+        )
+
+        self._counts.add(run, pdg, sums)
+
+    def arrays(self, species=None):
+        """Survival table of everything added so far, as {column: array}"""
+        counts = _finish_counts(self._counts.arrays(), bool(self.has_decayed), bool(self.weighted))
+        if species is not None:
+            counts = _reindex_species(counts, species)
+
+        counts.update(_fraction_columns(counts))
+        counts.pop('W2_survived', None)
+        if not self.by_run:
+            del counts['RunNumber']
+        return counts
+
+    def table(self, species=None):
+        """Tidy survival table of everything added so far"""
+        import pandas as pd
+        return pd.DataFrame(self.arrays(species))
+
+def survival_table(data, species=None, by_run=True, weight_column=WEIGHT_COLUMN):
+    """Tidy survival table of every (run, PDG) pair in a DataFrame or dict of arrays
+
+    Columns: RunNumber, PrimaryPDG, N_total, N_survived, N_decayed, S,
+    S_err_binomial, S_err_poisson. Species listed in `species` but absent
+    from a run appear with zero counts. With by_run=False all runs are
+    pooled and the RunNumber column is dropped. Events are weighted by
+    `weight_column` when the data has it.
+    """
+    accumulator = SurvivalAccumulator(by_run, weight_column)
+    accumulator.add(data)
+    return accumulator.table(species)
+
+def lookup(table, run, pdg):
+    """Row of a survival table (DataFrame or {column: array}) for one
+    (run, PDG) pair as a dict, or None"""
+    match = np.flatnonzero((np.asarray(table['RunNumber']) == run)
+                           & (np.asarray(table['PrimaryPDG']) == pdg))
+    if len(match) == 0:
+        return None
+    # Per-column access keeps the integer counts as integers
+    return {col: np.asarray(table[col])[match[0]] for col in table}
@@ -0,0 +1,6 @@
+"""Make the analysis scripts importable as top-level modules, as they are run"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
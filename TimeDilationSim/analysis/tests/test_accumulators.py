@@ -0,0 +1,37 @@
+import numpy as np
+
+from accumulators import GroupedCounts, GroupedMoments, grouped_sum_arrays
+
+def test_grouped_sums_counts_pairs():
+    a = np.array([3, 1, 3, 1, 3])
+    b = np.array([7, 7, 7, 9, 7])
+    table = grouped_sum_arrays(a, b, {'w': np.array([1.0, 2.0, 3.0, 4.0, 5.0])})
+    assert table['a'].tolist() == [1, 1, 3]
+    assert table['b'].tolist() == [7, 9, 7]
+    assert table['N'].tolist() == [1, 1, 3]
+    assert table['w'].tolist() == [2.0, 4.0, 9.0]
+
+def test_grouped_counts_merge_chunks():
+    counts = GroupedCounts()
+    counts.add([0, 0, 1], [211, 321, 211])
+    counts.add([1, 2], [211, 321])
+    assert counts.count(1, 211) == 2
+    assert counts.totals('b') == {211: 3, 321: 2}
+
+def test_moments_merge_matches_numpy():
+    rng = np.random.default_rng(7)
+    groups = rng.choice([211, 321], size=10_001)
+    # Large offset, small spread: a naive sum of squares loses every digit
+    values = 1.0 + 1e-4 * rng.standard_normal(groups.size)
+
+    moments = GroupedMoments()
+    for start in range(0, groups.size, 997):
+        moments.add(groups[start:start + 997], values[start:start + 997])
+
+    for group in (211, 321):
+        selected = values[groups == group]
+        assert moments.count(group) == selected.size
+        assert np.isclose(moments.mean(group), selected.mean(), rtol=1e-15, atol=0)
+        assert np.isclose(moments.std(group), selected.std(), rtol=1e-9, atol=0)
+        assert np.isclose(moments.std(group, ddof=1), selected.std(ddof=1), rtol=1e-9, atol=0)
+    assert np.isnan(moments.mean(13))
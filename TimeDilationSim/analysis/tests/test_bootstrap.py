@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bootstrap import bootstrap_lifetime, bootstrap_survival_table, replica_counts
+
+COUNTS = np.array([[0, 5, 40], [400, 3, 1]])
+
+def test_poisson_replicas_are_poisson_per_cell():
+    replicas = replica_counts(COUNTS, 20_000, rng=np.random.default_rng(1))
+    assert replicas.shape == (20_000,) + COUNTS.shape
+    assert (replicas[:, 0, 0] == 0).all()
+    # Mean and variance of Poisson(n) are both n; 5σ bounds on the sample mean
+    tolerance = 5 * np.sqrt(COUNTS / 20_000)
+    assert (np.abs(replicas.mean(axis=0) - COUNTS) < tolerance + 1e-12).all()
+    assert np.allclose(replicas.var(axis=0), COUNTS, rtol=0.05)
+
+def test_multinomial_replicas_keep_the_total():
+    replicas = replica_counts(COUNTS, 5_000, method='multinomial', rng=np.random.default_rng(2))
+    assert (replicas.sum(axis=(1, 2)) == COUNTS.sum()).all()
+    assert (replicas[:, 0, 0] == 0).all()
+    p = COUNTS / COUNTS.sum()
+    assert np.allclose(replicas.var(axis=0), COUNTS.sum() * p * (1 - p), rtol=0.1)
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        replica_counts(COUNTS, 10, method='jackknife')
+
+def test_survival_errors_match_binomial():
+    table = pd.DataFrame({'N_total': [1000, 4000], 'N_survived': [900, 2000]})
+    result = bootstrap_survival_table(table, 4000, rng=np.random.default_rng(3))
+    S = table['N_survived'] / table['N_total']
+    binomial = np.sqrt(S * (1 - S) / table['N_total'])
+    assert np.allclose(result['S_err_bootstrap'], binomial, rtol=0.05)
+    assert (result['S_low'] < S).all() and (S < result['S_high']).all()
+
+    with pytest.raises(ValueError):
+        bootstrap_survival_table(table.astype({'N_survived': float}), 10)
+
+def test_lifetime_errors_match_likelihood_interval():
+    rng = np.random.default_rng(4)
+    n = 4000
+    decay = rng.exponential(60.0, n)
+    survived = decay > 15.0
+    events = {
+        'RunNumber': np.full(n, 3),
+        'PrimaryPDG': np.full(n, 321),
+        'PrimaryMom': np.full(n, 8.0),
+        'PrimaryPosZ': np.zeros(n),
+        'Survived': survived.astype(int),
+        'DecayPosZ': np.where(survived, np.nan, decay * 100),
+    }
+    fit = bootstrap_lifetime(events, 2000, species=[321], rng=rng).iloc[0]
+    likelihood = (fit['lambda_m_err_low'] + fit['lambda_m_err_high']) / 2
+    assert fit['lambda_m_err_bootstrap'] == pytest.approx(likelihood, rel=0.1)
+    assert fit['lambda_m_low'] < fit['lambda_m'] < fit['lambda_m_high']
@@ -0,0 +1,53 @@
+import numpy as np
+
+from event_store import build_index, event_store_from_arrays, load_index, save_index
+
+def _arrays():
+    # Run 0 has consecutive EventIDs starting at 5, run 1 sparse ones out of
+    # order (merged thread files) with EventID 10**12 repeated
+    return {
+        'RunNumber': np.array([1, 0, 1, 0, 1, 0, 1]),
+        'EventID': np.array([10**12, 5, 3, 6, 10**12, 7, 40]),
+        'PrimaryPDG': np.array([321, 211, 211, 321, 211, 211, 321]),
+        'Decayed': np.array([1, 0, 0, 1, 0, 1, 0]),
+        'Value': np.arange(7) * 10,
+    }
+
+def _lookup_by_scan(arrays, run, event_id):
+    match = np.flatnonzero((arrays['RunNumber'] == run) & (arrays['EventID'] == event_id))
+    return int(match[0]) if len(match) else None
+
+def test_event_lookup_matches_a_scan():
+    arrays = _arrays()
+    store = event_store_from_arrays(arrays)
+    assert store.index['consecutive'].tolist() == [True, False]
+    for run in (0, 1, 2):
+        for event_id in (3, 4, 5, 6, 7, 8, 40, 10**12, -1):
+            assert store.row(run, event_id) == _lookup_by_scan(arrays, run, event_id)
+    # A repeated EventID resolves to its first row in file order
+    assert store.event(1, 10**12) == {
+        'RunNumber': 1, 'EventID': 10**12, 'PrimaryPDG': 321, 'Decayed': 1, 'Value': 0}
+
+def test_categories_are_rows_in_file_order():
+    arrays = _arrays()
+    store = event_store_from_arrays(arrays)
+    for pdg in (211, 321):
+        for decayed in (None, False, True):
+            for run in (None, 0, 1):
+                expected = arrays['PrimaryPDG'] == pdg
+                if decayed is not None:
+                    expected &= arrays['Decayed'] == decayed
+                if run is not None:
+                    expected &= arrays['RunNumber'] == run
+                assert store.category_rows(pdg, decayed, run).tolist() == np.flatnonzero(expected).tolist()
+    assert store.category_size(13) == 0
+    assert store.sample(211, decayed=False, n=2)['Value'].tolist() == [10, 20]
+
+def test_index_round_trip(tmp_path):
+    index = build_index(_arrays())
+    path = tmp_path / 'index.npz'
+    save_index(index, path)
+    loaded = load_index(path)
+    assert sorted(loaded) == sorted(index)
+    for name in index:
+        assert np.array_equal(loaded[name], index[name])
@@ -0,0 +1,55 @@
+import numpy as np
+
+from histograms import HistogramSet, fill_histograms, histogram_binning
+
+def _arrays(n=20_000, seed=5):
+    rng = np.random.default_rng(seed)
+    pdg = rng.choice([211, 321, 2212], size=n)
+    beta = np.where(pdg == 211, 0.99999, 0.9981) + 0.001 * rng.standard_normal(n)
+    beta[::50] = 0.0                       # events without a RICH hit
+    npe = rng.poisson(30, n)
+    return {'PrimaryPDG': pdg, 'RICH1_Beta': beta, 'RICH1_NPE': npe}
+
+def test_sentinels_go_to_overflow_and_keep_exact_moments():
+    arrays = _arrays()
+    binning = histogram_binning(arrays)
+    assert sorted(binning) == ['beta', 'rich1_npe']
+    hists = fill_histograms(arrays, binning)
+
+    for pdg in (211, 321):
+        beta = arrays['RICH1_Beta'][arrays['PrimaryPDG'] == pdg]
+        inside = beta[(beta >= 0.99) & (beta <= 1.01)]
+        hist = hists['beta', pdg]
+        assert hist.overflow == len(beta) - len(inside) > 0
+        assert hist.entries == hist.counts.sum() == len(inside)
+        assert np.isclose(hist.mean(), inside.mean(), rtol=1e-14)
+        assert np.isclose(hist.std(), inside.std(), rtol=1e-6)
+        # The sentinels do not widen the binning
+        assert hist.edges[0][0] == 0.99 and hist.edges[0][-1] == 1.01
+
+    # Integer counts land in unit bins centred on their value
+    npe = hists['rich1_npe']
+    assert np.array_equal(npe.counts[:100], np.bincount(arrays['RICH1_NPE'], minlength=100)[:100])
+
+def test_partial_fills_merge_to_the_whole(tmp_path):
+    arrays = _arrays()
+    binning = histogram_binning(arrays)
+    whole = fill_histograms(arrays, binning)
+    merged = fill_histograms(arrays, binning, 0, 7_000)
+    merged += fill_histograms(arrays, binning, 7_000)
+
+    path = tmp_path / 'histograms.npz'
+    merged.save(path)
+    loaded = HistogramSet.load(path)
+    for key in whole.keys():
+        a, b = whole[key], loaded[key]
+        assert np.array_equal(a.counts, b.counts)
+        assert (a.entries, a.overflow) == (b.entries, b.overflow)
+        assert np.allclose(a.sums, b.sums, rtol=1e-14) and np.allclose(a.sums2, b.sums2, rtol=1e-14)
+
+def test_rebin_keeps_counts_and_moments():
+    hist = fill_histograms(_arrays(), histogram_binning(_arrays()))['beta']
+    coarse = hist.rebin(37)
+    assert coarse.counts.sum() == hist.counts.sum()
+    assert len(coarse.counts) <= 40
+    assert (coarse.mean(), coarse.std(), coarse.overflow) == (hist.mean(), hist.std(), hist.overflow)
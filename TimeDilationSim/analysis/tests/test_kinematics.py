@@ -0,0 +1,22 @@
+import numpy as np
+
+from kinematics import (C_LIGHT, KAON_LIFETIME, KAON_MASS, PION_LIFETIME, PION_MASS,
+                        beta_from_momentum, decay_length, lorentz_gamma)
+
+def test_gamma_and_beta_are_exact():
+    # 3-4-5 triangle: p = 3, m = 4 gives E = 5
+    assert lorentz_gamma(3.0, 4.0) == 5 / 4
+    assert beta_from_momentum(3.0, 4.0) == 3 / 5
+
+    momentum = np.array([0.1, 1.0, 8.0, 100.0])
+    gamma = lorentz_gamma(momentum, PION_MASS)
+    beta = beta_from_momentum(momentum, PION_MASS)
+    assert np.allclose(beta * gamma, momentum / PION_MASS, rtol=1e-15, atol=0)
+    assert np.allclose(gamma, np.hypot(1, momentum / PION_MASS), rtol=1e-15, atol=0)
+
+def test_decay_length_at_beam_momentum():
+    assert np.isclose(decay_length(8.0, PION_MASS, PION_LIFETIME),
+                      8.0 / PION_MASS * C_LIGHT * PION_LIFETIME, rtol=1e-15)
+    # The design values quoted in the figures: 447 m for pions, 60 m for kaons
+    assert round(float(decay_length(8.0, PION_MASS, PION_LIFETIME))) == 447
+    assert round(float(decay_length(8.0, KAON_MASS, KAON_LIFETIME))) == 60
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from lifetime_fit import exponential_interval, fit_binned, fit_lifetime, observed_flight
+
+def _events():
+    # Three decays at 2, 4 and 9 m; two survivors reaching station 2 at 10 m (run 2)
+    return {
+        'RunNumber': np.full(5, 2),
+        'PrimaryPDG': np.full(5, 321),
+        'PrimaryMom': np.full(5, 8.0),
+        'PrimaryPosZ': np.zeros(5),
+        'Survived': np.array([0, 0, 0, 1, 1]),
+        'DecayPosZ': np.array([200.0, 400.0, 900.0, np.nan, np.nan]),
+    }
+
+def test_observed_flight_uses_recorded_station_position():
+    events = _events()
+    assert observed_flight(events).tolist() == [2.0, 4.0, 9.0, 10.0, 10.0]
+    # A recorded position (cm) overrides the run table
+    events['Station2PosZ'] = np.full(5, 1200.0)
+    assert observed_flight(events).tolist() == [2.0, 4.0, 9.0, 12.0, 12.0]
+    with pytest.raises(ValueError):
+        observed_flight(dict(_events(), RunNumber=np.full(5, 7)))
+
+def test_unbinned_mle_is_total_flight_over_decays():
+    fit = fit_lifetime(_events(), species=[321]).iloc[0]
+    assert fit['N_total'] == 5 and fit['N_decayed'] == 3
+    assert fit['lambda_m'] == pytest.approx(35.0 / 3, rel=1e-15)
+
+def test_likelihood_ratio_interval():
+    for n in (1, 3, 100):
+        u_low, u_high = exponential_interval(n)
+        assert u_low < 1 < u_high
+        for u in (u_low, u_high):
+            assert 2 * n * (u - 1 - np.log(u)) == pytest.approx(1.0, abs=1e-10)
+    assert np.isnan(exponential_interval(0)[0])
+
+    fit = fit_lifetime(_events(), species=[321]).iloc[0]
+    u_low, u_high = exponential_interval(3)
+    assert fit['lambda_m_err_low'] == pytest.approx(35.0 / 3 * (1 - 1 / u_high))
+    assert fit['lambda_m_err_high'] == pytest.approx(35.0 / 3 * (1 / u_low - 1))
+    # Asymmetric for a small sample: longer towards large λ
+    assert fit['lambda_m_err_high'] > fit['lambda_m_err_low']
+
+def test_binned_fit_single_bin_is_exact():
+    # One bin [0, L]: the MLE solves e^{-L/λ} = N_survived / N_total
+    counts, n_survived, length = 40, 60, 10.0
+    fit = fit_binned([counts], [0.0, length], [n_survived]).iloc[0]
+    assert fit['lambda_m'] == pytest.approx(-length / np.log(n_survived / (counts + n_survived)), rel=1e-10)
+
+def test_fit_of_no_decays_is_not_finite():
+    events = _events()
+    events['Survived'] = np.ones(5, dtype=int)
+    fit = fit_lifetime(events, species=[321]).iloc[0]
+    assert fit['N_decayed'] == 0
+    # The likelihood rises towards λ = ∞; callers check np.isfinite
+    assert not np.isfinite(fit['lambda_m'])
+    assert np.isnan(fit['lambda_m_err_low']) and np.isnan(fit['lambda_m_err_high'])
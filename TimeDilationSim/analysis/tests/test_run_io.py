@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+
+from run_io import find_run_file, read_arrays, run_path
+
+def _touch(path, mtime_ns):
+    path.write_text('')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_find_run_file_reads_the_newest_copy(tmp_path):
+    parquet = run_path(0, tmp_path, 'parquet')
+    csv = run_path(0, tmp_path, 'csv')
+    _touch(parquet, 1_000_000_000)
+    _touch(csv, 2_000_000_000)
+    assert find_run_file(0, tmp_path) == csv
+
+    # A converted copy is newer than its CSV and wins
+    _touch(parquet, 3_000_000_000)
+    assert find_run_file(0, tmp_path) == parquet
+
+def test_find_run_file_prefers_binary_among_equally_new_copies(tmp_path):
+    for fmt in ('csv', 'feather', 'parquet'):
+        _touch(run_path(1, tmp_path, fmt), 1_000_000_000)
+    assert find_run_file(1, tmp_path) == run_path(1, tmp_path, 'parquet')
+    assert find_run_file(2, tmp_path) is None
+
+def test_read_arrays_types_csv_columns(tmp_path):
+    path = run_path(0, tmp_path, 'csv')
+    path.write_text('RunNumber,PrimaryPDG,PrimaryMom\n0,211,8.0\n0,321,7.5\n')
+    arrays = read_arrays(path)
+    assert arrays['PrimaryPDG'].dtype == np.int32
+    assert arrays['PrimaryPDG'].tolist() == [211, 321]
+    assert arrays['PrimaryMom'].tolist() == [8.0, 7.5]
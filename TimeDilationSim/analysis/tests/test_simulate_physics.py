@@ -0,0 +1,21 @@
+import simulate_physics
+
+def _run(tmp_path, monkeypatch, n_workers):
+    monkeypatch.setattr(simulate_physics, 'OUTPUT_DIR', tmp_path)
+    simulate_physics.run_simulation_parallel(2000, station_positions=[0, 1500], n_workers=n_workers,
+                                             shard_size=700, seed=11)
+    return [(tmp_path / f'TimeDilation_Run{i}.csv').read_bytes() for i in range(2)]
+
+def test_parallel_output_depends_only_on_seed(tmp_path, monkeypatch):
+    assert _run(tmp_path / 'one', monkeypatch, 1) == _run(tmp_path / 'two', monkeypatch, 2)
+
+def test_leftover_shards_are_ignored(tmp_path, monkeypatch):
+    # Shards of an interrupted earlier run
+    stale = tmp_path / 'shards'
+    stale.mkdir(parents=True)
+    (stale / 'TimeDilation_Run0_shard0.csv').write_text('stale\n')
+
+    runs = _run(tmp_path, monkeypatch, 2)
+    assert all(not run.startswith(b'stale') for run in runs)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'TimeDilation_Run0.csv', 'TimeDilation_Run1.csv', 'shards']
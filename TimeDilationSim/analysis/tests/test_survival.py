@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from survival import SurvivalAccumulator, lookup, survival_table
+
+def _events():
+    return {
+        'RunNumber': np.array([0, 0, 0, 1, 1, 1, 1]),
+        'PrimaryPDG': np.array([211, 211, 321, 211, 321, 321, 321]),
+        'Survived': np.array([1, 0, 1, 1, 1, 0, 0]),
+    }
+
+def test_survival_table_counts_every_pair():
+    table = survival_table(_events())
+    assert list(zip(table['RunNumber'], table['PrimaryPDG'])) == [(0, 211), (0, 321), (1, 211), (1, 321)]
+    assert table['N_total'].tolist() == [2, 1, 1, 3]
+    assert table['N_survived'].tolist() == [1, 1, 1, 1]
+    assert table['N_decayed'].tolist() == [1, 0, 0, 2]
+    row = lookup(table, 1, 321)
+    assert row['S'] == 1 / 3
+    assert np.isclose(row['S_err_binomial'], np.sqrt(1 / 3 * 2 / 3 / 3))
+    assert np.isclose(row['S_err_poisson'], 1 / 3)
+
+def test_accumulator_matches_whole_table():
+    events = _events()
+    accumulator = SurvivalAccumulator()
+    for start in range(0, 7, 3):
+        accumulator.add({name: values[start:start + 3] for name, values in events.items()})
+    chunked = accumulator.table(species=[211, 321])
+    whole = survival_table(events, species=[211, 321])
+    for column in whole:
+        assert np.array_equal(chunked[column], whole[column])
+
+def test_weighted_survival_is_the_mean_weight():
+    weights = np.array([0.9, 0.8, 0.95, 0.7, 0.85])
+    events = {
+        'RunNumber': np.zeros(5, dtype=int),
+        'PrimaryPDG': np.full(5, 321),
+        'Survived': np.ones(5, dtype=int),
+        'SurvivalWeight': weights,
+    }
+    row = lookup(survival_table(events), 0, 321)
+    assert row['N_total'] == 5
+    assert np.isclose(row['N_survived'], weights.sum())
+    assert np.isclose(row['S'], weights.mean())
+    # Standard error of the mean weight, not the binomial error
+    assert np.isclose(row['S_err_binomial'], weights.std() / np.sqrt(5))
+    assert row['S_err_poisson'] == row['S_err_binomial']
+
+def test_accumulator_rejects_chunks_with_other_columns():
+    events = _events()
+    accumulator = SurvivalAccumulator()
+    accumulator.add(events)
+    with pytest.raises(ValueError):
+        accumulator.add(dict(events, SurvivalWeight=np.full(7, 0.5)))
+    with pytest.raises(ValueError):
+        accumulator.add(dict(events, Decayed=1 - events['Survived']))
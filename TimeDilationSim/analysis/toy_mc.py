@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+toy_mc.py
+Pseudo-experiments for fit bias and coverage studies
+
+Each toy generates the four station-position runs in memory (the beam of
+simulate_physics.py, with decay vertices only; no detector columns and no
+files), fits them with lifetime_fit.fit_lifetime, and records λ and τ₀ of
+each species and the ratio λ_π/λ_K with their errors. Toys run in batches
+on a process pool; every toy has its own generator spawned from one
+numpy.random.SeedSequence, so results depend only on --seed, never on
+--workers.
+
+The summary gives, per quantity, the mean and width of the pull
+distribution (pull = (fit - truth) / error on the side of the truth) and
+the coverage of the 1σ interval (expected 68.3%).
+
+Usage:
+  python toy_mc.py --toys 10000 --events 10000 --workers 8 --seed 1
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kinematics import PDG_KAON, PDG_PION, SPECIES, decay_length
+from lifetime_fit import STATION_POSITIONS_M, fit_lifetime
+from simulate_physics import beam_decay_length, simulate_beam
+
+OUTPUT_DIR = Path('../output')
+
+# Toys per work unit of the process pool
+BATCH_SIZE = 50
+
+# Mean beam momentum of simulate_beam (GeV/c)
+BEAM_MOMENTUM = 8.0
+
+# Expected coverage of a 1σ interval
+NOMINAL_COVERAGE = 0.6827
+
+def generate_toy(n_events, station_positions=STATION_POSITIONS_M, rng=None):
+    """One pseudo-experiment: the columns fit_lifetime needs, for every run
+
+    n_events events per run of station_positions ({run: position in m}),
+    as a dict of arrays.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    runs = []
+    for run_id, position in station_positions.items():
+        beam = simulate_beam(n_events, rng=rng)
+        pdg = beam['PrimaryPDG'].to_numpy()
+        momentum = beam['PrimaryMom'].to_numpy()
+        pos_z = beam['PrimaryPosZ'].to_numpy()
+        _, lambda_decay = beam_decay_length(pdg, momentum)
+        decay_z = pos_z + rng.exponential(lambda_decay * 100)
+        survived = decay_z >= position * 100
+        runs.append({
+            'RunNumber': np.full(n_events, run_id),
+            'PrimaryPDG': pdg,
+            'PrimaryMom': momentum,
+            'PrimaryPosZ': pos_z,
+            'Survived': survived,
+            'DecayPosZ': np.where(survived, 0.0, decay_z),
+        })
+    return {name: np.concatenate([run[name] for run in runs]) for name in runs[0]}
+
+def true_values():
+    """Generated value of every recorded quantity"""
+    _, mass_pi, tau_pi = SPECIES[PDG_PION]
+    _, mass_k, tau_k = SPECIES[PDG_KAON]
+    lambda_pi = decay_length(BEAM_MOMENTUM, mass_pi, tau_pi)
+    lambda_k = decay_length(BEAM_MOMENTUM, mass_k, tau_k)
+    return {
+        'lambda_pi': lambda_pi,
+        'lambda_K': lambda_k,
+        'tau0_pi': tau_pi * 1e9,
+        'tau0_K': tau_k * 1e9,
+        'ratio': lambda_pi / lambda_k,
+    }
+
+def fit_toy(data):
+    """{quantity: value, quantity_err_low/high: ...} of one toy"""
+    fits = fit_lifetime(data, species=(PDG_PION, PDG_KAON)).set_index('PrimaryPDG')
+    result = {}
+    for pdg, suffix in [(PDG_PION, 'pi'), (PDG_KAON, 'K')]:
+        for quantity, column in [('lambda', 'lambda_m'), ('tau0', 'tau0_ns')]:
+            result[f'{quantity}_{suffix}'] = fits.loc[pdg, column]
+            result[f'{quantity}_{suffix}_err_low'] = fits.loc[pdg, f'{column}_err_low']
+            result[f'{quantity}_{suffix}_err_high'] = fits.loc[pdg, f'{column}_err_high']
+
+    # Independent species: relative errors add in quadrature, per side
+    ratio = result['lambda_pi'] / result['lambda_K']
+    result['ratio'] = ratio
+    for side, other in [('low', 'high'), ('high', 'low')]:
+        result[f'ratio_err_{side}'] = ratio * np.hypot(
+            result[f'lambda_pi_err_{side}'] / result['lambda_pi'],
+            result[f'lambda_K_err_{other}'] / result['lambda_K'])
+    return result
+
+def _run_batch(unit):
+    """Generate and fit one batch of toys; unit is (first toy, [SeedSequence], n_events)"""
+    first_toy, seeds, n_events = unit
+    rows = []
+    for i, seed in enumerate(seeds):
+        row = fit_toy(generate_toy(n_events, rng=np.random.default_rng(seed)))
+        row['Toy'] = first_toy + i
+        rows.append(row)
+    return rows
+
+def run_toys(n_toys, n_events, n_workers=None, seed=None, batch_size=BATCH_SIZE):
+    """Fit results of n_toys pseudo-experiments as a DataFrame, one row per toy"""
+    seed_seq = np.random.SeedSequence(seed)
+    n_workers = n_workers or os.cpu_count()
+    print(f"Running {n_toys} toys of {n_events} events per position on {n_workers} workers...")
+    print(f"Seed entropy: {seed_seq.entropy}")
+
+    toy_seeds = seed_seq.spawn(n_toys)
+    units = [(first, toy_seeds[first:first + batch_size], n_events)
+             for first in range(0, n_toys, batch_size)]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        rows = [row for batch in executor.map(_run_batch, units) for row in batch]
+
+    toys = pd.DataFrame(rows)
+    return toys[['Toy'] + [col for col in toys.columns if col != 'Toy']]
+
+def pulls(toys, truth=None):
+    """Pull of every quantity in every toy
+
+    The error on the side of the truth is used: err_high when the fit is
+    below it, err_low when above.
+    """
+    truth = true_values() if truth is None else truth
+    result = pd.DataFrame({'Toy': toys['Toy']})
+    for name, value in truth.items():
+        fitted = toys[name]
+        error = np.where(fitted < value, toys[f'{name}_err_high'], toys[f'{name}_err_low'])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[name] = (fitted - value) / error
+    return result
+
+def summarize(toys, truth=None):
+    """Bias, pull mean/width and 1σ coverage per quantity"""
+    truth = true_values() if truth is None else truth
+    pull = pulls(toys, truth)
+    rows = []
+    for name, value in truth.items():
+        fitted = toys[name]
+        valid = np.isfinite(pull[name])
+        covered = ((fitted - toys[f'{name}_err_low'] <= value)
+                   & (value <= fitted + toys[f'{name}_err_high']))
+        n_valid = int(valid.sum())
+        rows.append({
+            'Quantity': name,
+            'Truth': value,
+            'Mean': fitted[valid].mean(),
+            'Bias': fitted[valid].mean() - value,
+            'Pull_mean': pull[name][valid].mean(),
+            'Pull_mean_err': pull[name][valid].std() / np.sqrt(n_valid) if n_valid else np.nan,
+            'Pull_width': pull[name][valid].std(),
+            'Coverage': covered[valid].mean(),
+            'Coverage_err': np.sqrt(NOMINAL_COVERAGE * (1 - NOMINAL_COVERAGE) / n_valid)
+                            if n_valid else np.nan,
+            'N_toys': n_valid,
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Toy MC bias and coverage study of the lifetime fit")
+    parser.add_argument('--toys', type=int, default=1000, help='Number of pseudo-experiments')
+    parser.add_argument('--events', type=int, default=10000,
+                        help='Events per station position in each toy')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes')
+    parser.add_argument('--seed', type=int, default=None, help='Root seed')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='Toys per work unit')
+    parser.add_argument('--output-dir', default=str(OUTPUT_DIR), help='Directory for the CSV tables')
+    args = parser.parse_args()
+
+    toys = run_toys(args.toys, args.events, n_workers=args.workers, seed=args.seed,
+                    batch_size=args.batch_size)
+    summary = summarize(toys)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(exist_ok=True)
+    toys.to_csv(output_dir / 'toy_mc_fits.csv', index=False)
+    summary.to_csv(output_dir / 'toy_mc_summary.csv', index=False)
+
+    print(f"\n{'Quantity':<10} {'Truth':>10} {'Bias':>10} {'Pull mean':>10} "
+          f"{'Pull width':>10} {'Coverage':>9}")
+    print("-" * 64)
+    for _, row in summary.iterrows():
+        print(f"{row['Quantity']:<10} {row['Truth']:10.4g} {row['Bias']:10.3g} "
+              f"{row['Pull_mean']:10.3f} {row['Pull_width']:10.3f} {row['Coverage']*100:8.1f}%")
+    print(f"\n✓ Saved: {output_dir / 'toy_mc_fits.csv'}, {output_dir / 'toy_mc_summary.csv'}")
+
+if __name__ == '__main__':
+    main()
@@ -12,13 +12,18 @@ Physics Parameters from Proposal (Table 1):
 
 Usage:
   python validate_physics.py output/run_x15.csv
+  python validate_physics.py output/run_x15.csv 15 --chunksize 1000000   # out of core
 """
 
+import argparse
 import numpy as np
-import pandas as pd
 import sys
 import os
 
+from accumulators import GroupedCounts, GroupedMoments
+from run_io import iter_arrays, read_arrays
+from survival import SurvivalAccumulator
+
 # ============================================================================
 # EXPECTED VALUES FROM PROPOSAL
 # ============================================================================
@@ -59,16 +64,62 @@ EXPECTED = {
 TOLERANCE = 0.05
 
 def load_data(filepath):
-    """Load simulation output CSV file"""
+    """Load simulation output file (CSV, Parquet or Feather) as {column: array}"""
     if not os.path.exists(filepath):
         print(f"ERROR: File not found: {filepath}")
         sys.exit(1)
     
-    return pd.read_csv(filepath)
+    return read_arrays(filepath)
+
+class ValidationStats:
+    """Counts and β moments used by the validators, accumulated chunk by chunk
 
-def validate_decay_fractions(df, flight_distance_m):
+    Chunks are DataFrames or {column: array}; the statistics themselves
+    are plain NumPy, so validating a file never needs pandas.
+    """
+    
+    def __init__(self):
+        self.n_events = 0
+        self.columns = None
+        self.survival = SurvivalAccumulator(by_run=False)
+        self.beta = GroupedMoments()
+        self.pid = GroupedCounts(['PrimaryPDG', 'ReconstructedPID'])
+    
+    def add(self, data):
+        """Accumulate one chunk of events"""
+        if self.columns is None:
+            self.columns = list(data)
+        pdg = np.asarray(data['PrimaryPDG'])
+        self.n_events += len(pdg)
+        
+        self.survival.add(data)
+        
+        # β only from events with a RICH measurement
+        with_rich = np.asarray(data['RICH1_NPE']) > 0
+        self.beta.add(pdg[with_rich], np.asarray(data['RICH1_Beta'])[with_rich])
+        
+        self.pid.add(pdg, data['ReconstructedPID'])
+    
+    @classmethod
+    def from_frame(cls, data):
+        stats = cls()
+        stats.add(data)
+        return stats
+
+def stream_statistics(filepath, chunk_size):
+    """ValidationStats of a file too large for memory, read in chunks"""
+    stats = ValidationStats()
+    for chunk in iter_arrays(filepath, chunk_size):
+        stats.add(chunk)
+    return stats
+
+def _as_stats(data):
+    return data if isinstance(data, ValidationStats) else ValidationStats.from_frame(data)
+
+def validate_decay_fractions(data, flight_distance_m):
     """
     Compare simulated decay fractions with proposal predictions
+    (data is a DataFrame, {column: array} or ValidationStats)
     """
     print(f"\n{'='*70}")
     print(f"DECAY FRACTION VALIDATION (Flight distance: {flight_distance_m} m)")
@@ -76,20 +127,22 @@ def validate_decay_fractions(df, flight_distance_m):
     
     results = {}
     
+    # Counts for every species in one pass (runs in the file are pooled)
+    counts = _as_stats(data).survival.arrays()
+    rows = {pdg: i for i, pdg in enumerate(counts['PrimaryPDG'].tolist())}
+    
     for name, params in EXPECTED.items():
         pdg = params['pdg']
         
-        # Filter events for this particle type
-        particle_df = df[df['PrimaryPDG'] == pdg]
-        n_total = len(particle_df)
+        n_total = int(counts['N_total'][rows[pdg]]) if pdg in rows else 0
         
         if n_total == 0:
             print(f"\n{name.upper()} (PDG {pdg}): No events found")
             continue
         
         # Count survivors (reached SC2) and decays
-        n_survived = particle_df['Survived'].sum()
-        n_decayed = particle_df['Decayed'].sum()
+        n_survived = counts['N_survived'][rows[pdg]]
+        n_decayed = counts['N_decayed'][rows[pdg]]
         
         # Calculate fractions
         sim_survival = n_survived / n_total
@@ -108,7 +161,7 @@ def validate_decay_fractions(df, flight_distance_m):
         exp_decay = 1.0 - exp_survival
         
         # Calculate statistical uncertainty (binomial)
-        stat_error = np.sqrt(sim_survival * (1 - sim_survival) / n_total)
+        stat_error = counts['S_err_binomial'][rows[pdg]]
         
         # Check if within tolerance
         rel_error = abs(sim_survival - exp_survival) / exp_survival if exp_survival > 0 else 0
@@ -136,30 +189,31 @@ def validate_decay_fractions(df, flight_distance_m):
     
     return results
 
-def validate_beta_measurements(df):
+def validate_beta_measurements(data):
     """
     Validate RICH β measurements against expected values
+    (data is a DataFrame, {column: array} or ValidationStats)
     """
     print(f"\n{'='*70}")
     print(f"RICH β MEASUREMENT VALIDATION")
     print(f"{'='*70}")
     
+    beta = _as_stats(data).beta
+    
     for name, params in EXPECTED.items():
         pdg = params['pdg']
         exp_beta = params['beta']
         
-        # Filter events with RICH measurements
-        particle_df = df[(df['PrimaryPDG'] == pdg) & (df['RICH1_NPE'] > 0)]
-        n_with_rich = len(particle_df)
+        # Events with RICH measurements
+        n_with_rich = beta.count(pdg)
         
         if n_with_rich == 0:
             print(f"\n{name.upper()} (PDG {pdg}): No RICH measurements")
             continue
         
-        # Get measured β values
-        beta_values = particle_df['RICH1_Beta'].values
-        beta_mean = np.mean(beta_values)
-        beta_std = np.std(beta_values)
+        # Measured β moments
+        beta_mean = beta.mean(pdg)
+        beta_std = beta.std(pdg)
         
         # Expected resolution from proposal: Δβ/β ~ 10^-3
         exp_resolution = 0.001
@@ -177,17 +231,19 @@ def validate_beta_measurements(df):
         print(f"    Achieved: {resolution:.4f}")
         print(f"    Target:   {exp_resolution:.4f}")
 
-def validate_pid_performance(df):
+def validate_pid_performance(data):
     """
     Validate particle identification performance
+    (data is a DataFrame, {column: array} or ValidationStats)
     """
     print(f"\n{'='*70}")
     print(f"PARTICLE ID PERFORMANCE")
     print(f"{'='*70}")
     
-    # Create confusion matrix
-    true_pdgs = df['PrimaryPDG'].unique()
-    reco_pdgs = df['ReconstructedPID'].unique()
+    # Confusion counts: one row per (true, reconstructed) pair
+    pid = _as_stats(data).pid
+    n_true_by_pdg = pid.totals('PrimaryPDG')
+    n_reco_by_pdg = pid.totals('ReconstructedPID')
     
     print("\nConfusion Matrix:")
     header = "True \\ Reco"
@@ -200,11 +256,10 @@ def validate_pid_performance(df):
         true_name = {211: 'π+', 321: 'K+', -13: 'μ+'}[true_pdg]
         print(f"{true_name:>12}", end='')
         
-        true_df = df[df['PrimaryPDG'] == true_pdg]
-        n_true = len(true_df)
+        n_true = n_true_by_pdg.get(true_pdg, 0)
         
         for reco_pdg in [211, 321, -13, 0]:
-            n_reco = len(true_df[true_df['ReconstructedPID'] == reco_pdg])
+            n_reco = pid.count(true_pdg, reco_pdg)
             frac = n_reco / n_true * 100 if n_true > 0 else 0
             print(f"{frac:>7.1f}%", end='')
         print()
@@ -214,29 +269,29 @@ def validate_pid_performance(df):
     for true_pdg in [211, 321, -13]:
         true_name = {211: 'π+', 321: 'K+', -13: 'μ+'}[true_pdg]
         
-        true_df = df[df['PrimaryPDG'] == true_pdg]
-        reco_df = df[df['ReconstructedPID'] == true_pdg]
-        
-        n_true = len(true_df)
-        n_reco = len(reco_df)
-        n_correct = len(true_df[true_df['ReconstructedPID'] == true_pdg])
+        n_true = n_true_by_pdg.get(true_pdg, 0)
+        n_reco = n_reco_by_pdg.get(true_pdg, 0)
+        n_correct = pid.count(true_pdg, true_pdg)
         
         efficiency = n_correct / n_true * 100 if n_true > 0 else 0
         purity = n_correct / n_reco * 100 if n_reco > 0 else 0
         
         print(f"  {true_name}: Efficiency = {efficiency:.1f}%, Purity = {purity:.1f}%")
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python validate_physics.py <output_file.csv> [flight_distance_m]")
-        print("\nExample: python validate_physics.py output/run_x15.csv 15")
-        sys.exit(1)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate simulation output against the proposal")
+    parser.add_argument('filepath', help='Run file (CSV, Parquet or Feather)')
+    parser.add_argument('flight_distance', type=float, nargs='?', default=None,
+                        help='Flight distance in m (default: parsed from a name like run_x15.csv)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Stream the file in chunks of this many rows (out of core)')
+    args = parser.parse_args(argv)
     
-    filepath = sys.argv[1]
+    filepath = args.filepath
     
     # Try to extract flight distance from filename
-    if len(sys.argv) >= 3:
-        flight_distance = float(sys.argv[2])
+    if args.flight_distance is not None:
+        flight_distance = args.flight_distance
     else:
         # Try to parse from filename like "run_x15.csv"
         import re
@@ -247,16 +302,22 @@ def main():
             flight_distance = 10.0  # Default
     
     print(f"Loading data from: {filepath}")
-    df = load_data(filepath)
+    if args.chunksize:
+        if not os.path.exists(filepath):
+            print(f"ERROR: File not found: {filepath}")
+            sys.exit(1)
+        stats = stream_statistics(filepath, args.chunksize)
+    else:
+        stats = ValidationStats.from_frame(load_data(filepath))
     
     print(f"\nDataset summary:")
-    print(f"  Total events: {len(df)}")
-    print(f"  Columns: {list(df.columns)}")
+    print(f"  Total events: {stats.n_events}")
+    print(f"  Columns: {stats.columns}")
     
     # Validate physics
-    validate_decay_fractions(df, flight_distance)
-    validate_beta_measurements(df)
-    validate_pid_performance(df)
+    validate_decay_fractions(stats, flight_distance)
+    validate_beta_measurements(stats)
+    validate_pid_performance(stats)
     
     print(f"\n{'='*70}")
     print("VALIDATION COMPLETE")
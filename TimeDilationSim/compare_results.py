@@ -2,113 +2,126 @@
 """
 Compare simulation results with proposal predictions
 """
-import pandas as pd
+import argparse
 import numpy as np
-
-# Load all data
-df = pd.concat([pd.read_csv(f'output/TimeDilation_Run{i}.csv') for i in range(4)])
-
-print('='*60)
-print('SIMULATION vs PROPOSAL COMPARISON')
-print('='*60)
-
-# Proposal predictions
-proposal = {
-    'pion_decay_5m': 1.2,
-    'pion_decay_15m': 3.3,
-    'kaon_decay_5m': 8.0,
-    'kaon_decay_15m': 22.1,
-    'pion_beta': 0.99985,
-    'kaon_beta': 0.99810,
-    'muon_beta': 0.99991,
-    'pion_gamma': 57.3,
-    'kaon_gamma': 16.2,
-    'pion_lambda': 447,
-    'kaon_lambda': 60
-}
-
-print('\n1. SURVIVAL FRACTIONS AT 15m')
-print('-' * 60)
-pion_15 = df[(df['RunNumber']==3) & (df['PrimaryPDG']==211)]
-kaon_15 = df[(df['RunNumber']==3) & (df['PrimaryPDG']==321)]
-
-pion_surv = pion_15['Survived'].sum() / len(pion_15)
-kaon_surv = kaon_15['Survived'].sum() / len(kaon_15)
-
-pion_decay_sim = 100 * (1 - pion_surv)
-kaon_decay_sim = 100 * (1 - kaon_surv)
-
-print(f'  Pions:')
-print(f'    Simulation: {pion_decay_sim:.2f}% decay')
-print(f'    Proposal:   {proposal["pion_decay_15m"]:.2f}% decay')
-print(f'    Match: {"✅ YES" if abs(pion_decay_sim - proposal["pion_decay_15m"]) < 1.0 else "⚠️ Close"}')
-
-print(f'\n  Kaons:')
-print(f'    Simulation: {kaon_decay_sim:.2f}% decay')
-print(f'    Proposal:   {proposal["kaon_decay_15m"]:.2f}% decay')
-print(f'    Match: {"✅ YES" if abs(kaon_decay_sim - proposal["kaon_decay_15m"]) < 3.0 else "⚠️ Close"}')
-
-print('\n2. DECAY FRACTIONS AT ALL DISTANCES')
-print('-' * 60)
-print('Distance | Pions (Sim/Prop) | Kaons (Sim/Prop)')
-print('-' * 60)
-
-for run, dist in enumerate([5, 10, 15]):
-    pion_run = df[(df['RunNumber']==run+1) & (df['PrimaryPDG']==211)]
-    kaon_run = df[(df['RunNumber']==run+1) & (df['PrimaryPDG']==321)]
-    
-    pion_decay = 100 * (1 - pion_run['Survived'].sum() / len(pion_run))
-    kaon_decay = 100 * (1 - kaon_run['Survived'].sum() / len(kaon_run))
-    
-    if dist == 5:
-        pion_prop = proposal['pion_decay_5m']
-        kaon_prop = proposal['kaon_decay_5m']
-    elif dist == 15:
-        pion_prop = proposal['pion_decay_15m']
-        kaon_prop = proposal['kaon_decay_15m']
-    else:
-        # Calculate for 10m
-        pion_prop = 100 * (1 - np.exp(-10/proposal['pion_lambda']))
-        kaon_prop = 100 * (1 - np.exp(-10/proposal['kaon_lambda']))
-    
-    print(f'{dist:3d} m   | {pion_decay:4.1f}% / {pion_prop:4.1f}%  | {kaon_decay:4.1f}% / {kaon_prop:4.1f}%')
-
-print('\n3. BETA VALUES (VELOCITY)')
-print('-' * 60)
-pion_beta = df[df['PrimaryPDG']==211]['RICH1_Beta'].mean()
-kaon_beta = df[df['PrimaryPDG']==321]['RICH1_Beta'].mean()
-muon_beta = df[df['PrimaryPDG']==13]['RICH1_Beta'].mean()
-
-print(f'  Pions:  {pion_beta:.5f} (Proposal: {proposal["pion_beta"]:.5f}) {"✅" if abs(pion_beta-proposal["pion_beta"]) < 0.001 else "⚠️"}')
-print(f'  Kaons:  {kaon_beta:.5f} (Proposal: {proposal["kaon_beta"]:.5f}) {"✅" if abs(kaon_beta-proposal["kaon_beta"]) < 0.001 else "⚠️"}')
-print(f'  Muons:  {muon_beta:.5f} (Proposal: {proposal["muon_beta"]:.5f}) {"✅" if abs(muon_beta-proposal["muon_beta"]) < 0.001 else "⚠️"}')
-
-print('\n4. PARTICLE SEPARATION')
-print('-' * 60)
-beta_separation = pion_beta - kaon_beta
-print(f'  Δβ (π - K): {beta_separation:.5f}')
-print(f'  Separation: {beta_separation/0.0001:.1f} × 10⁻⁴')
-print(f'  RICH Resolution: ~0.001 → {"✅ Resolvable" if beta_separation > 0.001 else "⚠️ Difficult"}')
-
-print('\n5. PARTICLE ID EFFICIENCY')
-print('-' * 60)
-pion_total = len(df[df['PrimaryPDG']==211])
-pion_correct = len(df[(df['PrimaryPDG']==211) & (df['ReconstructedPID']==211)])
-kaon_total = len(df[df['PrimaryPDG']==321])
-kaon_correct = len(df[(df['PrimaryPDG']==321) & (df['ReconstructedPID']==321)])
-
-pion_eff = 100 * pion_correct / pion_total
-kaon_eff = 100 * kaon_correct / kaon_total
-
-print(f'  Pion ID: {pion_eff:.1f}% (Target: >90%) {"✅" if pion_eff > 90 else "⚠️"}')
-print(f'  Kaon ID: {kaon_eff:.1f}% (Target: >95%) {"✅" if kaon_eff > 95 else "⚠️"}')
-
-print('\n6. OVERALL ASSESSMENT')
-print('='*60)
-print('✅ Decay rates match proposal predictions (within errors)')
-print('✅ Beta values consistent with 8 GeV/c momentum')
-print('✅ Kaon/pion separation clearly demonstrated')
-print('✅ Survival curves follow exponential decay')
-print('⚠️ PID efficiency lower than target (simplified simulation)')
-print('\n🎯 CONCLUSION: Simulation validates proposal physics!')
-print('='*60)
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'analysis'))
+from dataset import load_dataset
+from survival import lookup, survival_table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare simulation results with proposal predictions")
+    parser.add_argument('--input-dir', default=os.path.join(ROOT_DIR, 'output'),
+                        help='Directory with run files')
+    args = parser.parse_args(argv)
+
+    # Load all data (served from the dataset cache)
+    df = load_dataset(args.input_dir)
+
+    # Survival counts for every (run, species) pair
+    survival = survival_table(df, species=[211, 321])
+
+    print('='*60)
+    print('SIMULATION vs PROPOSAL COMPARISON')
+    print('='*60)
+
+    # Proposal predictions
+    proposal = {
+        'pion_decay_5m': 1.2,
+        'pion_decay_15m': 3.3,
+        'kaon_decay_5m': 8.0,
+        'kaon_decay_15m': 22.1,
+        'pion_beta': 0.99985,
+        'kaon_beta': 0.99810,
+        'muon_beta': 0.99991,
+        'pion_gamma': 57.3,
+        'kaon_gamma': 16.2,
+        'pion_lambda': 447,
+        'kaon_lambda': 60
+    }
+
+    print('\n1. SURVIVAL FRACTIONS AT 15m')
+    print('-' * 60)
+    pion_surv = lookup(survival, 3, 211)['S']
+    kaon_surv = lookup(survival, 3, 321)['S']
+
+    pion_decay_sim = 100 * (1 - pion_surv)
+    kaon_decay_sim = 100 * (1 - kaon_surv)
+
+    print(f'  Pions:')
+    print(f'    Simulation: {pion_decay_sim:.2f}% decay')
+    print(f'    Proposal:   {proposal["pion_decay_15m"]:.2f}% decay')
+    print(f'    Match: {"✅ YES" if abs(pion_decay_sim - proposal["pion_decay_15m"]) < 1.0 else "⚠️ Close"}')
+
+    print(f'\n  Kaons:')
+    print(f'    Simulation: {kaon_decay_sim:.2f}% decay')
+    print(f'    Proposal:   {proposal["kaon_decay_15m"]:.2f}% decay')
+    print(f'    Match: {"✅ YES" if abs(kaon_decay_sim - proposal["kaon_decay_15m"]) < 3.0 else "⚠️ Close"}')
+
+    print('\n2. DECAY FRACTIONS AT ALL DISTANCES')
+    print('-' * 60)
+    print('Distance | Pions (Sim/Prop) | Kaons (Sim/Prop)')
+    print('-' * 60)
+
+    for run, dist in enumerate([5, 10, 15]):
+        pion_decay = 100 * (1 - lookup(survival, run+1, 211)['S'])
+        kaon_decay = 100 * (1 - lookup(survival, run+1, 321)['S'])
+
+        if dist == 5:
+            pion_prop = proposal['pion_decay_5m']
+            kaon_prop = proposal['kaon_decay_5m']
+        elif dist == 15:
+            pion_prop = proposal['pion_decay_15m']
+            kaon_prop = proposal['kaon_decay_15m']
+        else:
+            # Calculate for 10m
+            pion_prop = 100 * (1 - np.exp(-10/proposal['pion_lambda']))
+            kaon_prop = 100 * (1 - np.exp(-10/proposal['kaon_lambda']))
+
+        print(f'{dist:3d} m   | {pion_decay:4.1f}% / {pion_prop:4.1f}%  | {kaon_decay:4.1f}% / {kaon_prop:4.1f}%')
+
+    print('\n3. BETA VALUES (VELOCITY)')
+    print('-' * 60)
+    pion_beta = df[df['PrimaryPDG']==211]['RICH1_Beta'].mean()
+    kaon_beta = df[df['PrimaryPDG']==321]['RICH1_Beta'].mean()
+    muon_beta = df[df['PrimaryPDG']==13]['RICH1_Beta'].mean()
+
+    print(f'  Pions:  {pion_beta:.5f} (Proposal: {proposal["pion_beta"]:.5f}) {"✅" if abs(pion_beta-proposal["pion_beta"]) < 0.001 else "⚠️"}')
+    print(f'  Kaons:  {kaon_beta:.5f} (Proposal: {proposal["kaon_beta"]:.5f}) {"✅" if abs(kaon_beta-proposal["kaon_beta"]) < 0.001 else "⚠️"}')
+    print(f'  Muons:  {muon_beta:.5f} (Proposal: {proposal["muon_beta"]:.5f}) {"✅" if abs(muon_beta-proposal["muon_beta"]) < 0.001 else "⚠️"}')
+
+    print('\n4. PARTICLE SEPARATION')
+    print('-' * 60)
+    beta_separation = pion_beta - kaon_beta
+    print(f'  Δβ (π - K): {beta_separation:.5f}')
+    print(f'  Separation: {beta_separation/0.0001:.1f} × 10⁻⁴')
+    print(f'  RICH Resolution: ~0.001 → {"✅ Resolvable" if beta_separation > 0.001 else "⚠️ Difficult"}')
+
+    print('\n5. PARTICLE ID EFFICIENCY')
+    print('-' * 60)
+    pion_total = len(df[df['PrimaryPDG']==211])
+    pion_correct = len(df[(df['PrimaryPDG']==211) & (df['ReconstructedPID']==211)])
+    kaon_total = len(df[df['PrimaryPDG']==321])
+    kaon_correct = len(df[(df['PrimaryPDG']==321) & (df['ReconstructedPID']==321)])
+
+    pion_eff = 100 * pion_correct / pion_total
+    kaon_eff = 100 * kaon_correct / kaon_total
+
+    print(f'  Pion ID: {pion_eff:.1f}% (Target: >90%) {"✅" if pion_eff > 90 else "⚠️"}')
+    print(f'  Kaon ID: {kaon_eff:.1f}% (Target: >95%) {"✅" if kaon_eff > 95 else "⚠️"}')
+
+    print('\n6. OVERALL ASSESSMENT')
+    print('='*60)
+    print('✅ Decay rates match proposal predictions (within errors)')
+    print('✅ Beta values consistent with 8 GeV/c momentum')
+    print('✅ Kaon/pion separation clearly demonstrated')
+    print('✅ Survival curves follow exponential decay')
+    print('⚠️ PID efficiency lower than target (simplified simulation)')
+    print('\n🎯 CONCLUSION: Simulation validates proposal physics!')
+    print('='*60)
+
+if __name__ == '__main__':
+    main()